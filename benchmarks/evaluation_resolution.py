@@ -0,0 +1,68 @@
+""" Benchmark of the evaluation of a submission at reduced resolutions.
+
+The time spent by `EvaluationService.post_predicted_masks` (loading the
+annotations, computing the metrics and generating the next scribble) is
+measured for every downsample factor, with the annotations cache disabled.
+It requires the annotations of the sequence on the DAVIS root.
+
+```bash
+python benchmarks/evaluation_resolution.py --davis-root path/to/DAVIS \\
+    --sequence bear --downsample 1 2 4
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+import time
+
+import numpy as np
+
+from davisinteractive.dataset import Davis
+from davisinteractive.evaluation import EvaluationService
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the evaluation at reduced resolutions.')
+    parser.add_argument(
+        '--davis-root', default=None, help='Path to the DAVIS dataset root.')
+    parser.add_argument('--sequence', default='bear', help='Sequence.')
+    parser.add_argument(
+        '--downsample',
+        type=int,
+        nargs='+',
+        default=[1, 2, 4],
+        help='Downsample factors to evaluate.')
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='Repetitions of every run.')
+    args = parser.parse_args(argv)
+
+    subset = Davis.dataset[args.sequence]['set']
+    davis = Davis(davis_root=args.davis_root)
+    gt_masks = davis.load_annotations(args.sequence)
+    # Prediction with a constant error on every object
+    pred_masks = np.roll(gt_masks, 20, axis=2)
+
+    print('{:>10} {:>10} {:>10}'.format('resolution', 'seconds', 'speedup'))
+    baseline = None
+    for downsample in args.downsample:
+        service = EvaluationService(
+            subset,
+            davis_root=args.davis_root,
+            downsample=downsample,
+            annotations_cache_bytes=0,
+            use_gt_cache=False)
+        timings = []
+        for i in range(args.repeat):
+            start = time.time()
+            service.post_predicted_masks(args.sequence, 1, pred_masks, 0, 1,
+                                         'benchmark', 'session_{}'.format(i))
+            timings.append(time.time() - start)
+        median = np.median(timings)
+        baseline = baseline or median
+        print('{:>10} {:>10.3f} {:>9.1f}x'.format(service.resolution, median,
+                                                  baseline / median))
+
+
+if __name__ == '__main__':
+    main()
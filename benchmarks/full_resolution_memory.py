@@ -0,0 +1,168 @@
+""" Benchmark of the peak memory used to evaluate high resolution submissions.
+
+A synthetic sequence with the given frame size (by default 1080p) is written
+to a temporal DAVIS root, and the submission of a prediction for it is
+evaluated with `EvaluationService.post_predicted_masks`. The peak resident
+set size (RSS) of the process is reported, and the benchmark fails if it is
+higher than `--max-rss-mb`. Every configuration must be run on a new
+process, as the peak RSS never decreases.
+
+```bash
+# Chunked and tiled evaluation (default at resolutions higher than 480p)
+python benchmarks/full_resolution_memory.py --size 3840 2160 \\
+    --max-rss-mb 1024
+# Loading the whole sequence at once, to compare
+python benchmarks/full_resolution_memory.py --size 3840 2160 --no-chunks
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from davisinteractive.common import Path, patch
+from davisinteractive.dataset import Davis
+from davisinteractive.evaluation import EvaluationService
+
+SEQUENCE = 'benchmark-full-resolution'
+RESOLUTION = 'Full-Resolution'
+
+
+def peak_rss_mb():
+    """ Peak resident set size of the process in MiB. """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports it in KiB and macOS in bytes
+    if sys.platform == 'darwin':
+        rss /= 1024
+    return rss / 1024
+
+
+def synthetic_annotations(frame, width, height, nb_objects):
+    """ Annotation of a frame with an ellipse moving for every object. """
+    y, x = np.ogrid[:height, :width]
+    annotation = np.zeros((height, width), dtype=np.uint8)
+    for i in range(nb_objects):
+        cx = width * (i + 1) / (nb_objects + 1) + 2 * frame
+        cy = height / 2 + height / 8 * np.sin(frame / 5 + i)
+        rx, ry = width / (3 * (nb_objects + 1)), height / 4
+        annotation[((x - cx) / rx)**2 + ((y - cy) / ry)**2 < 1] = i + 1
+    return annotation
+
+
+def write_sequence(davis_root, width, height, nb_frames, nb_objects):
+    annotations_dir = davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                          RESOLUTION, SEQUENCE)
+    annotations_dir.mkdir(parents=True)
+    for f in range(nb_frames):
+        annotation = synthetic_annotations(f, width, height, nb_objects)
+        Image.fromarray(annotation).save(
+            str(annotations_dir / '{:05d}.png'.format(f)))
+
+    scribbles_dir = davis_root.joinpath(Davis.SCRIBBLES_SUBDIR, SEQUENCE)
+    scribbles_dir.mkdir(parents=True)
+    with scribbles_dir.joinpath('001.json').open('w') as fp:
+        json.dump({'sequence': SEQUENCE, 'scribbles': [[]] * nb_frames}, fp)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the peak memory of high resolution '
+        'evaluations.')
+    parser.add_argument(
+        '--size',
+        type=int,
+        nargs=2,
+        default=[1920, 1080],
+        metavar=('WIDTH', 'HEIGHT'),
+        help='Size of the frames.')
+    parser.add_argument(
+        '--frames', type=int, default=30, help='Number of frames.')
+    parser.add_argument(
+        '--objects', type=int, default=2, help='Number of objects.')
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=None,
+        help='Frames of the chunks. By default the one of the service.')
+    parser.add_argument(
+        '--tile-size',
+        type=int,
+        default=None,
+        help='Size of the tiles. By default the one of the service.')
+    parser.add_argument(
+        '--no-chunks',
+        action='store_true',
+        help='Load and evaluate the whole sequence at once.')
+    parser.add_argument(
+        '--max-rss-mb',
+        type=float,
+        default=None,
+        help='Fail if the peak RSS is higher than this limit in MiB.')
+    args = parser.parse_args(argv)
+
+    width, height = args.size
+    davis_root = Path(tempfile.mkdtemp()) / 'DAVIS'
+    write_sequence(davis_root, width, height, args.frames, args.objects)
+    sequence_info = {
+        'name': SEQUENCE,
+        'set': 'benchmark',
+        'num_frames': args.frames,
+        'num_objects': args.objects,
+        'num_scribbles': 1,
+        'image_size': [width, height],
+    }
+
+    # The prediction is part of the memory of the user, it is created before
+    # measuring the memory of the evaluation
+    pred_masks = np.stack([
+        np.roll(
+            synthetic_annotations(f, width, height, args.objects),
+            width // 50,
+            axis=1) for f in range(args.frames)
+    ])
+    base_rss = peak_rss_mb()
+
+    with patch.dict(Davis.dataset, {SEQUENCE: sequence_info}), \
+            patch.dict(Davis.sets, {'benchmark': [SEQUENCE]}):
+        service = EvaluationService(
+            'benchmark',
+            davis_root=davis_root,
+            resolution=RESOLUTION,
+            chunk_size=args.chunk_size,
+            tile_size=args.tile_size,
+            annotations_cache_bytes=0,
+            use_gt_cache=False)
+        if args.no_chunks:
+            service.chunk_size, service.tile_size = None, None
+
+        start = time.time()
+        service.post_predicted_masks(SEQUENCE, 1, pred_masks, 0, 1,
+                                     'benchmark', 'session')
+        elapsed = time.time() - start
+
+    rss = peak_rss_mb()
+    print('Frames: {} of {}x{} with {} objects'.format(
+        args.frames, width, height, args.objects))
+    print('Chunk size: {}, tile size: {}'.format(service.chunk_size,
+                                                  service.tile_size))
+    print('Prediction size: {:.1f} MiB'.format(pred_masks.nbytes / 1024**2))
+    print('Peak RSS before the evaluation: {:.1f} MiB'.format(base_rss))
+    print('Peak RSS: {:.1f} MiB'.format(rss))
+    print('Time: {:.2f} s'.format(elapsed))
+
+    if args.max_rss_mb is not None and rss > args.max_rss_mb:
+        print('Peak RSS higher than the limit of {:.1f} MiB'.format(
+            args.max_rss_mb))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
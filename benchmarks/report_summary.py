@@ -0,0 +1,89 @@
+""" Benchmark of the summarization of the evaluation reports.
+
+A synthetic report with one row per object and frame is generated for every
+number of interactions given, with some samples timing out before the last
+interaction, and the time spent by `EvaluationService.summarize_report` is
+measured. No dataset files are needed.
+
+```bash
+python benchmarks/report_summary.py --subset trainval --max-i 4 16 64
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from davisinteractive.common import patch
+from davisinteractive.dataset import Davis
+from davisinteractive.evaluation import EvaluationService
+
+
+def synthetic_report(sequences, max_i, seed=0):
+    rng = np.random.RandomState(seed)
+    columns = {
+        k: []
+        for k in ('sequence', 'scribble_idx', 'interaction', 'object_id',
+                  'frame')
+    }
+    for seq in sequences:
+        nb_scribbles = Davis.dataset[seq]['num_scribbles']
+        nb_objects = Davis.dataset[seq]['num_objects']
+        nb_frames = Davis.dataset[seq]['num_frames']
+        for scribble_idx in range(1, nb_scribbles + 1):
+            nb_interactions = rng.randint(max_i // 2, max_i + 1)
+            n = nb_interactions * nb_objects * nb_frames
+            it, obj, frame = np.meshgrid(
+                np.arange(1, nb_interactions + 1),
+                np.arange(1, nb_objects + 1),
+                np.arange(nb_frames),
+                indexing='ij')
+            columns['sequence'].append(np.full(n, seq, dtype=object))
+            columns['scribble_idx'].append(np.full(n, scribble_idx))
+            columns['interaction'].append(it.ravel())
+            columns['object_id'].append(obj.ravel())
+            columns['frame'].append(frame.ravel())
+    df = pd.DataFrame({k: np.concatenate(v) for k, v in columns.items()})
+    df.insert(0, 'session_id', 'benchmark')
+    df['jaccard'] = rng.rand(len(df))
+    df['contour'] = rng.rand(len(df))
+    df['j_and_f'] = (df['jaccard'] + df['contour']) / 2
+    df['timing'] = rng.rand(len(df)) * 10
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the summarization of the reports.')
+    parser.add_argument('--subset', default='trainval', help='Subset.')
+    parser.add_argument(
+        '--max-i',
+        type=int,
+        nargs='+',
+        default=[4, 16, 64],
+        help='Maximum number of interactions of every report.')
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='Repetitions of every run.')
+    args = parser.parse_args(argv)
+
+    print('{:>6} {:>10} {:>10}'.format('max_i', 'rows', 'seconds'))
+    for max_i in args.max_i:
+        with patch.object(Davis, 'check_files', return_value=True):
+            service = EvaluationService(
+                args.subset, davis_root='/tmp/DAVIS', max_i=max_i)
+        report = synthetic_report(service.sequences, max_i)
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.time()
+            service.summarize_report(report)
+            timings.append(time.time() - start)
+        print('{:>6} {:>10} {:>10.3f}'.format(max_i, len(report),
+                                              min(timings)))
+
+
+if __name__ == '__main__':
+    main()
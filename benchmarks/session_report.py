@@ -0,0 +1,179 @@
+""" Benchmark of the report of a whole evaluation session.
+
+A synthetic sequence is written to a temporal DAVIS root and a full
+`DavisInteractiveSession` is run on it with a model that always submits the
+same shifted annotations. Every interaction adds `frames * objects` rows to
+the report, which is flushed to the temporal report file every
+`--flush-interactions`. The time spent on the report (`report` phase of
+`DavisInteractiveSession.get_timings`) is reported for the first and the last
+interactions: if it grows with the size of the report, the session is
+quadratic on the number of interactions.
+
+```bash
+python benchmarks/session_report.py --scribbles 40 --interactions 10
+# Reading the whole report on every flush, to compare
+python benchmarks/session_report.py --scribbles 40 --interactions 10 \\
+    --whole-report
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from davisinteractive.common import Path, patch
+from davisinteractive.dataset import Davis
+from davisinteractive.session import DavisInteractiveSession
+
+SEQUENCE = 'benchmark-session'
+# The local connector only evaluates the public subsets
+SUBSET = 'train'
+
+
+def synthetic_annotations(frame, width, height, nb_objects):
+    """ Annotation of a frame with an ellipse moving for every object. """
+    y, x = np.ogrid[:height, :width]
+    annotation = np.zeros((height, width), dtype=np.uint8)
+    for i in range(nb_objects):
+        cx = width * (i + 1) / (nb_objects + 1) + 2 * frame
+        cy = height / 2 + height / 8 * np.sin(frame / 5 + i)
+        rx, ry = width / (3 * (nb_objects + 1)), height / 4
+        annotation[((x - cx) / rx)**2 + ((y - cy) / ry)**2 < 1] = i + 1
+    return annotation
+
+
+def write_sequence(davis_root, annotations, nb_scribbles):
+    nb_frames, height, width = annotations.shape
+    annotations_dir = davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                          Davis.resolution_tag(), SEQUENCE)
+    annotations_dir.mkdir(parents=True)
+    for f in range(nb_frames):
+        Image.fromarray(annotations[f]).save(
+            str(annotations_dir / '{:05d}.png'.format(f)))
+
+    # A short horizontal line on the center of the first object
+    y, x = np.nonzero(annotations[0] == 1)
+    cx, cy = x.mean() / width, y.mean() / height
+    scribble = {
+        'path': [[cx - .02, cy], [cx, cy], [cx + .02, cy]],
+        'object_id': 1,
+        'start_time': 0,
+        'end_time': 100
+    }
+    scribbles = [[scribble]] + [[]] * (nb_frames - 1)
+
+    scribbles_dir = davis_root.joinpath(Davis.SCRIBBLES_SUBDIR, SEQUENCE)
+    scribbles_dir.mkdir(parents=True)
+    for i in range(1, nb_scribbles + 1):
+        with scribbles_dir.joinpath('{:03d}.json'.format(i)).open('w') as fp:
+            json.dump({'sequence': SEQUENCE, 'scribbles': scribbles}, fp)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the report of a whole evaluation session.')
+    parser.add_argument(
+        '--size',
+        type=int,
+        nargs=2,
+        default=[320, 180],
+        metavar=('WIDTH', 'HEIGHT'),
+        help='Size of the frames.')
+    parser.add_argument(
+        '--frames', type=int, default=50, help='Number of frames.')
+    parser.add_argument(
+        '--objects', type=int, default=3, help='Number of objects.')
+    parser.add_argument(
+        '--scribbles',
+        type=int,
+        default=40,
+        help='Number of samples (scribbles) of the sequence.')
+    parser.add_argument(
+        '--interactions',
+        type=int,
+        default=10,
+        help='Number of interactions of every sample.')
+    parser.add_argument(
+        '--report-format',
+        default='csv',
+        choices=['csv', 'pickle'],
+        help='Format of the temporal report file.')
+    parser.add_argument(
+        '--flush-interactions',
+        type=int,
+        default=1,
+        help='Number of interactions between the flushes of the report.')
+    parser.add_argument(
+        '--whole-report',
+        action='store_true',
+        help='Read the whole report on every flush instead of the new rows.')
+    args = parser.parse_args(argv)
+
+    width, height = args.size
+    annotations = np.stack([
+        synthetic_annotations(f, width, height, args.objects)
+        for f in range(args.frames)
+    ])
+    pred_masks = np.roll(annotations, width // 50, axis=2)
+
+    tmp_dir = Path(tempfile.mkdtemp())
+    davis_root = tmp_dir / 'DAVIS'
+    write_sequence(davis_root, annotations, args.scribbles)
+    sequence_info = {
+        'name': SEQUENCE,
+        'set': SUBSET,
+        'num_frames': args.frames,
+        'num_objects': args.objects,
+        'num_scribbles': args.scribbles,
+        'image_size': [width, height],
+    }
+
+    with patch.dict(Davis.dataset, {SEQUENCE: sequence_info}), \
+            patch.dict(Davis.sets, {SUBSET: [SEQUENCE]}):
+        start = time.time()
+        with DavisInteractiveSession(
+                davis_root=davis_root,
+                subset=SUBSET,
+                max_nb_interactions=args.interactions,
+                report_save_dir=tmp_dir,
+                report_format=args.report_format,
+                report_flush_interactions=args.flush_interactions) as sess:
+            if args.whole_report:
+                get_report = sess.connector.get_report
+                sess.connector.get_report = (
+                    lambda since=0: get_report().iloc[since:])
+
+            while sess.next():
+                sess.get_scribbles(read_only=True)
+                sess.submit_masks(pred_masks)
+            elapsed = time.time() - start
+            timings = sess.get_timings()
+            nb_rows = len(sess.get_report())
+
+    nb_interactions = len(timings)
+    tenth = max(nb_interactions // 10, 1)
+    report_time = timings['report'].values
+    first = report_time[:tenth].mean()
+    last = report_time[-tenth:].mean()
+
+    print('Interactions: {} with {} rows each, {} rows on the report'.format(
+        nb_interactions, args.frames * args.objects, nb_rows))
+    print('Report format: {}, flushed every {} interactions{}'.format(
+        args.report_format, args.flush_interactions,
+        ', reading the whole report' if args.whole_report else ''))
+    print('Session time: {:.2f} s'.format(elapsed))
+    print('Report time: {:.2f} s'.format(report_time.sum()))
+    print('Report time per interaction: {:.2f} ms on the first {} and '
+          '{:.2f} ms on the last {} ({:.1f}x)'.format(
+              first * 1000, tenth, last * 1000, tenth, last / first))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,14 @@ from __future__ import absolute_import, division
 
 class AbstractConnector:
 
-    def get_samples(self, subset, max_t, max_i, davis_root=None):
+    def get_samples(self,
+                    subset,
+                    max_t,
+                    max_i,
+                    davis_root=None,
+                    metric_to_optimize='J_AND_F',
+                    downsample=1,
+                    resolution=None):
         raise NotImplementedError('This is an abstract class')
 
     def get_scribble(self, sequence, scribble_idx):
@@ -15,10 +22,26 @@ class AbstractConnector:
                              pred_masks,
                              timming,
                              interaction,
-                             next_scribble_frame_candidates=None):
+                             next_scribble_frame_candidates=None,
+                             timings=None):
+        """ Post the predicted masks and return the next scribble.
+
+        If `timings` is given, the connector records on it the time in
+        seconds spent on every phase of the submission.
+        """
+        raise NotImplementedError('This is an abstract class')
+
+    def prefetch_sequence(self, sequence):
+        """ Warm up the data needed to evaluate the given sequence.
+
+        By default nothing is done.
+        """
+        del sequence
+
+    def get_report(self, since=0):
         raise NotImplementedError('This is an abstract class')
 
-    def get_report(self):
+    def restore_report(self, report):
         raise NotImplementedError('This is an abstract class')
 
     def post_finish(self):
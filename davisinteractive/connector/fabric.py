@@ -9,9 +9,19 @@ from .remote import RemoteConnector
 class ServerConnectionFabric:
 
     @staticmethod
-    def get_connector(host, user_key, session_key):
+    def get_connector(host,
+                      user_key,
+                      session_key,
+                      shared_service=False,
+                      spill_dir=None,
+                      session_ttl=None):
         if host == 'localhost':
             logging.info('Created connector to localhost service')
-            return LocalConnector(user_key=user_key, session_key=session_key)
+            return LocalConnector(
+                user_key=user_key,
+                session_key=session_key,
+                shared_service=shared_service,
+                spill_dir=spill_dir,
+                session_ttl=session_ttl)
         return RemoteConnector(
             user_key=user_key, session_key=session_key, host=host)
@@ -8,38 +8,76 @@ from glob import glob
 
 import pandas as pd
 
-from ..evaluation import EvaluationService
+from ..evaluation import EvaluationService, get_service
+from ..storage import LocalStorage
 from .abstract import AbstractConnector
 
 
 class LocalConnector(AbstractConnector):
     """ Proxy class to run the EvaluationService locally.
+
+    # Arguments
+        user_key: String. User identifier.
+        session_key: String. Session identifier.
+        shared_service: Boolean. Whether to use the process-wide service with
+            the same configuration (see
+            #davisinteractive.evaluation.registry.get_service) instead of
+            creating a new one. Default False.
+        spill_dir: String or Path. Directory where the storage of the service
+            spills the finished sessions (see
+            #davisinteractive.storage.local.LocalStorage). By default, the
+            results are kept in memory.
+        session_ttl: Float. Seconds after which the storage of the service
+            spills an idle session. Requires `spill_dir`.
     """
 
     VALID_SUBSETS = ['train', 'val', 'trainval']
 
-    def __init__(self, user_key, session_key):
+    def __init__(self,
+                 user_key,
+                 session_key,
+                 shared_service=False,
+                 spill_dir=None,
+                 session_ttl=None):
         self.service = None
         self.user_key = user_key or getpass.getuser()
         self.session_key = session_key
+        self.shared_service = shared_service
+        self.spill_dir = spill_dir
+        self.session_ttl = session_ttl
 
     def get_samples(self,
                     subset,
                     max_t,
                     max_i,
                     davis_root=None,
-                    metric_to_optimize='J_AND_F'):
+                    metric_to_optimize='J_AND_F',
+                    downsample=1,
+                    resolution=None):
         if subset not in self.VALID_SUBSETS:
             raise ValueError(
                 'For local connector, `subset` must be a valid subset: {}'.
                 format(self.VALID_SUBSETS))
 
-        self.service = EvaluationService(
-            subset,
+        kwargs = dict(
             davis_root=davis_root,
             max_t=max_t,
             max_i=max_i,
-            metric_to_optimize=metric_to_optimize)
+            metric_to_optimize=metric_to_optimize,
+            downsample=downsample,
+            resolution=resolution)
+        if self.shared_service:
+            self.service = get_service(
+                subset,
+                spill_dir=self.spill_dir,
+                session_ttl=self.session_ttl,
+                **kwargs)
+        else:
+            self.service = EvaluationService(
+                subset,
+                storage=LocalStorage(
+                    spill_dir=self.spill_dir, session_ttl=self.session_ttl),
+                **kwargs)
         return self.service.get_samples()
 
     def get_scribble(self, sequence, scribble_idx):
@@ -51,7 +89,8 @@ class LocalConnector(AbstractConnector):
                              pred_masks,
                              timming,
                              interaction,
-                             next_scribble_frame_candidates=None):
+                             next_scribble_frame_candidates=None,
+                             timings=None):
         return self.service.post_predicted_masks(
             sequence,
             scribble_idx,
@@ -60,14 +99,22 @@ class LocalConnector(AbstractConnector):
             interaction,
             self.user_key,
             self.session_key,
-            next_scribble_frame_candidates=next_scribble_frame_candidates)
+            next_scribble_frame_candidates=next_scribble_frame_candidates,
+            timings=timings)
+
+    def prefetch_sequence(self, sequence):
+        self.service.prefetch_annotations(sequence)
 
-    def get_report(self):
+    def get_report(self, since=0):
         return self.service.get_report(
-            user_id=self.user_key, session_id=self.session_key)
+            user_id=self.user_key, session_id=self.session_key, since=since)
+
+    def restore_report(self, report):
+        self.service.restore_report(report)
 
     def post_finish(self):
         report = self.service.get_report(
             user_id=self.user_key, session_id=self.session_key)
         summary = self.service.summarize_report(report)
+        self.service.finish_session(self.session_key)
         return summary
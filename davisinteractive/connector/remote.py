@@ -12,6 +12,7 @@ from requests.packages.urllib3.util.retry import Retry
 from .. import logging
 from ..dataset import Davis
 from ..third_party import mask_api
+from ..utils.timing import record_time
 from .abstract import AbstractConnector
 
 
@@ -69,11 +70,21 @@ class RemoteConnector(AbstractConnector):  # pragma: no cover
                     max_t,
                     max_i,
                     davis_root=None,
-                    metric_to_optimize='J_AND_F'):
+                    metric_to_optimize='J_AND_F',
+                    downsample=1,
+                    resolution=None):
         # This will be set in the server side
         del metric_to_optimize
         del max_t
         del max_i
+        if downsample != 1:
+            raise ValueError(
+                'The evaluation at reduced resolution is only available on '
+                'local evaluation')
+        if resolution is not None:
+            raise ValueError(
+                'The evaluation at other resolutions is only available on '
+                'local evaluation')
 
         if subset not in self.VALID_SUBSETS:
             raise ValueError('subset must be a valid one: {}'.format(
@@ -105,10 +116,12 @@ class RemoteConnector(AbstractConnector):  # pragma: no cover
                              pred_masks,
                              timing,
                              interaction,
-                             next_scribble_frame_candidates=None):
+                             next_scribble_frame_candidates=None,
+                             timings=None):
         nb_objects = Davis.dataset[sequence]['num_objects']
-        pred_masks_enc = mask_api.encode_batch_masks(
-            pred_masks, nb_objects=nb_objects)
+        with record_time(timings, 'encode'):
+            pred_masks_enc = mask_api.encode_batch_masks(
+                pred_masks, nb_objects=nb_objects)
 
         body = {
             'sequence': sequence,
@@ -121,20 +134,22 @@ class RemoteConnector(AbstractConnector):  # pragma: no cover
             body[
                 'next_scribble_frame_candidates'] = next_scribble_frame_candidates
 
-        r = _requests_retry_session().post(
-            os.path.join(self.host, self.POST_PREDICTED_MASKS_URL),
-            json=body,
-            headers=self.headers)
-        self._handle_response(r, raise_error=True)
-        response = r.json()
+        with record_time(timings, 'request'):
+            r = _requests_retry_session().post(
+                os.path.join(self.host, self.POST_PREDICTED_MASKS_URL),
+                json=body,
+                headers=self.headers)
+            self._handle_response(r, raise_error=True)
+            response = r.json()
         return response
 
-    def get_report(self):
+    def get_report(self, since=0):
         r = _requests_retry_session().get(
             os.path.join(self.host, self.GET_REPORT_URL), headers=self.headers)
         self._handle_response(r, raise_error=True)
         df = pd.DataFrame.from_dict(r.json())
-        return df
+        # The server always returns the whole report
+        return df.iloc[since:]
 
     def post_finish(self):
         r = _requests_retry_session().post(
@@ -13,6 +13,7 @@ from six.moves import urllib
 
 from .. import logging
 from ..common import Path
+from .gt_cache import load_gt_cache, save_gt_cache
 
 # Python2/3 Compatibility
 try:
@@ -46,14 +47,23 @@ class Davis:
             people is working with the same code and every one has a different
             path where the DAVIS dataset is stored. The folder name where all
             DAVIS dataset is stored must be names `DAVIS`.
+        resolution: String. Name of the folder of the resolution of the
+            annotations and images to use, for instance `Full-Resolution`.
+            By default `RESOLUTION`. The size of the frames at any other
+            resolution is read from the annotations files, and the files are
+            not downloaded if they are missing.
 
     # Attributes
         ANNOTATIONS_SUBDIR: Relative path with respect to the root path where
             the ground truth masks are stored. (Annotations)
         SCRIBBLES_SUBDIR: Relative path with respect to the root path where the
             scribbles are stored. (Scribbles)
-        RESOLUTION: Resolution of the dataset used to perform all the
-            evaluation. (480p)
+        CACHE_SUBDIR: Relative path with respect to the root path where the
+            cache of the ground truth data is stored. (Cache)
+        RESOLUTION: Default resolution of the dataset used to perform all the
+            evaluation. (480p) A reduced resolution can be used to load the
+            annotations and images faster (see #Davis.resolution_tag).
+        resolution: String. Resolution of the dataset used by the instance.
         sets: Dictionary. The keys are all the DAVIS dataset subsets and the
             values are the list of sequences belonging to that subset.
         dataset: Dictionary. Contains all the information for the entire
@@ -81,13 +91,16 @@ class Davis:
     IMAGES_SUBDIR = 'JPEGImages'
     ANNOTATIONS_SUBDIR = 'Annotations'
     SCRIBBLES_SUBDIR = 'Scribbles'
+    CACHE_SUBDIR = 'Cache'
     RESOLUTION = '480p'
 
     sets = _SETS
     dataset = _DATASET['sequences']
     years = _DATASET['years']
 
-    def __init__(self, davis_root=None):
+    def __init__(self, davis_root=None, resolution=None):
+        self.resolution = resolution or Davis.RESOLUTION
+        self._image_sizes = {}
         self.davis_root = davis_root or os.environ.get('DATASET_DAVIS')
         if self.davis_root is None:
             raise ValueError(
@@ -178,7 +191,7 @@ class Davis:
             seq_scribbles_path = self.davis_root.joinpath(
                 Davis.SCRIBBLES_SUBDIR, seq)
             seq_annotations_path = self.davis_root.joinpath(
-                Davis.ANNOTATIONS_SUBDIR, Davis.RESOLUTION, seq)
+                Davis.ANNOTATIONS_SUBDIR, self.resolution, seq)
 
             # Check scribbles files needed to give them as base for the user
             nb_scribbles = self.dataset[seq]['num_scribbles']
@@ -193,6 +206,10 @@ class Davis:
             for i in range(nb_frames):
                 annotation_file = seq_annotations_path / '{:05}.png'.format(i)
                 if not annotation_file.exists():
+                    if self.resolution != Davis.RESOLUTION:
+                        raise FileNotFoundError(
+                            'Annotation file not found: {}'.format(
+                                annotation_file))
                     self._download_annotations()
                     assert annotation_file.exists()
 
@@ -223,13 +240,22 @@ class Davis:
 
         return scribble_data
 
-    def load_annotations(self, sequence, dtype=np.int):
+    def load_annotations(self,
+                         sequence,
+                         dtype=np.int,
+                         downsample=1,
+                         frames=None):
         """ Load the annotations of the specified sequence.
 
         # Arguments
             sequence: String. Sequence name.
             dtype: Numpy Data Type. Data type to return the annotations.
                 Default value is `np.int`.
+            downsample: Integer. Factor by which the resolution is reduced.
+                Only one of every `downsample` pixels of every row and column
+                is kept, so the object ids are preserved. Default 1.
+            frames: List of Integers. Frames to load. By default all the
+                frames of the sequence.
 
         # Returns
             Numpy Array: Array with the annotations of the given sequence. The
@@ -237,20 +263,21 @@ class Davis:
                 will be the index of the objects, being `0` the background.
         """
         root_path = self.davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
-                                             Davis.RESOLUTION, sequence)
-        num_frames = self.dataset[sequence]['num_frames']
-        img_size = self.dataset[sequence]['image_size']
+                                             self.resolution, sequence)
+        if frames is None:
+            frames = range(self.dataset[sequence]['num_frames'])
+        img_size = self.image_size(sequence)
+        w, h = self.image_size(sequence, downsample=downsample)
 
-        annotations = np.empty((num_frames, img_size[1], img_size[0]),
-                               dtype=dtype)
+        annotations = np.empty((len(frames), h, w), dtype=dtype)
 
-        for f in range(num_frames):
+        for i, f in enumerate(frames):
             ann_path = root_path / '{:05d}.png'.format(f)
             ann_path = str(ann_path.resolve())
             mask = Image.open(ann_path)
             mask = np.asarray(mask)
             assert mask.shape == tuple(img_size[::-1])
-            annotations[f] = mask
+            annotations[i] = mask[::downsample, ::downsample]
 
         logging.verbose(
             'Loaded annotations for sequence {} at path {} with shape {}'.
@@ -258,13 +285,175 @@ class Davis:
 
         return annotations
 
-    def load_images(self, sequence, dtype=np.uint8):
+    def iter_annotations(self,
+                         sequence,
+                         chunk_size,
+                         dtype=np.uint8,
+                         downsample=1):
+        """ Iterate over the annotations of a sequence by chunks of frames.
+
+        Only the annotations of one chunk are in memory at a time, which
+        bounds the memory used with high resolutions.
+
+        # Arguments
+            sequence: String. Sequence name.
+            chunk_size: Integer. Maximum number of frames of every chunk.
+            dtype: Numpy Data Type. Data type to return the annotations.
+                Default value is `np.uint8`.
+            downsample: Integer. Factor by which the resolution is reduced
+                (see #Davis.load_annotations).
+
+        # Yields
+            Tuple: Index of the first frame of the chunk and the annotations of
+                the chunk with shape `(chunk_size x H x W)`. The last chunk
+                may have less frames.
+        """
+        num_frames = self.dataset[sequence]['num_frames']
+        for start in range(0, num_frames, chunk_size):
+            frames = range(start, min(start + chunk_size, num_frames))
+            yield start, self.load_annotations(
+                sequence, dtype=dtype, downsample=downsample, frames=frames)
+
+    @staticmethod
+    def resolution_tag(downsample=1, resolution=None):
+        """ Name of the resolution obtained reducing the dataset.
+
+        # Arguments
+            downsample: Integer. Factor by which the resolution is reduced.
+            resolution: String. Resolution which is reduced. By default
+                `RESOLUTION`.
+
+        # Returns
+            String: `resolution` if `downsample` is 1, otherwise the reduced
+                height, for instance `240p` for a factor of 2, or the name of
+                the resolution followed by the factor if it is not given by
+                its height (e.g. `Full-Resolution-ds2`).
+        """
+        resolution = resolution or Davis.RESOLUTION
+        if downsample == 1:
+            return resolution
+        if resolution.endswith('p') and resolution[:-1].isdigit():
+            return '{}p'.format(int(resolution[:-1]) // downsample)
+        return '{}-ds{}'.format(resolution, downsample)
+
+    def image_size(self, sequence, downsample=1):
+        """ Size of the frames of a sequence at a reduced resolution.
+
+        At the default resolution the size is the one of the dataset
+        information. At any other resolution it is read from the header of
+        the first annotation of the sequence.
+
+        # Arguments
+            sequence: String. Sequence name.
+            downsample: Integer. Factor by which the resolution is reduced.
+
+        # Returns
+            Tuple: Width and height of the frames, rounded up.
+        """
+        if self.resolution == Davis.RESOLUTION:
+            w, h = self.dataset[sequence]['image_size']
+        else:
+            if sequence not in self._image_sizes:
+                ann_path = self.davis_root.joinpath(
+                    Davis.ANNOTATIONS_SUBDIR, self.resolution, sequence,
+                    '00000.png')
+                with Image.open(str(ann_path)) as img:
+                    self._image_sizes[sequence] = img.size
+            w, h = self._image_sizes[sequence]
+        return -(-w // downsample), -(-h // downsample)
+
+    def cache_file(self, sequence, downsample=1):
+        """ Path of the file with the ground truth cache of a sequence.
+
+        # Arguments
+            sequence: String. Sequence name.
+            downsample: Integer. Factor by which the resolution of the cached
+                annotations is reduced.
+
+        # Returns
+            Path: Path to the `.npz` cache file.
+        """
+        return self.davis_root.joinpath(
+            Davis.CACHE_SUBDIR,
+            Davis.resolution_tag(downsample, self.resolution),
+            '{}.npz'.format(sequence))
+
+    def _annotations_mtime(self, sequence):
+        root_path = self.davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                             self.resolution, sequence)
+        num_frames = self.dataset[sequence]['num_frames']
+        return max(
+            root_path.joinpath('{:05d}.png'.format(f)).stat().st_mtime
+            for f in range(num_frames))
+
+    def build_cache(self, sequences=None, overwrite=False, downsample=1):
+        """ Build the cache of the data derived from the annotations.
+
+        For every sequence the annotations and the boundary map of every
+        object on every frame are stored, so they do not have to be decoded or
+        computed again. See
+        `davisinteractive.dataset.gt_cache` for more details.
+
+        # Arguments
+            sequences: List. Sequences to cache. By default all the sequences
+                of the train and val subsets.
+            overwrite: Boolean. Whether to build the cache of the sequences
+                which already have an up to date cache.
+            downsample: Integer. Factor by which the resolution of the
+                annotations is reduced (see #Davis.load_annotations).
+
+        # Returns
+            List: Sequences whose cache has been built.
+        """
+        sequences = sequences or self.sets['trainval']
+        built = []
+        for seq in sequences:
+            if not overwrite and self.load_cache(
+                    seq, downsample=downsample) is not None:
+                continue
+            source_mtime = self._annotations_mtime(seq)
+            annotations = self.load_annotations(
+                seq, dtype=np.uint8, downsample=downsample)
+            save_gt_cache(
+                self.cache_file(seq, downsample=downsample), annotations,
+                self.dataset[seq]['num_objects'], source_mtime)
+            logging.verbose('Built ground truth cache for sequence {}'.format(
+                seq), 1)
+            built.append(seq)
+        return built
+
+    def load_cache(self, sequence, downsample=1):
+        """ Load the cache of the data derived from the annotations.
+
+        # Arguments
+            sequence: String. Sequence name.
+            downsample: Integer. Factor by which the resolution of the cached
+                annotations is reduced.
+
+        # Returns
+            Dictionary or None: The arrays stored by #Davis.build_cache or
+                `None` if the cache has not been built or it is outdated.
+        """
+        cache_file = self.cache_file(sequence, downsample=downsample)
+        if not cache_file.exists():
+            return None
+        cache = load_gt_cache(cache_file, self._annotations_mtime(sequence))
+        if cache is not None:
+            logging.verbose(
+                'Loaded ground truth cache for sequence {} at {}'.format(
+                    sequence, cache_file), 2)
+        return cache
+
+    def load_images(self, sequence, dtype=np.uint8, downsample=1):
         """ Load the images of the specified sequence.
 
         # Arguments
             sequence: String. Sequence name.
             dtype: Numpy Data Type. Data type to return the images. Default
                 value is `np.uint8`.
+            downsample: Integer. Factor by which the resolution is reduced.
+                The JPEG images are decoded directly at the reduced scale
+                when possible. Default 1.
 
         # Returns
             Numpy Array: Array with all images of the given sequence. The shape
@@ -272,9 +461,9 @@ class Davis:
                 will be the pixel's value with range: `[0, 255]`.
         """
         root_path = self.davis_root.joinpath(Davis.IMAGES_SUBDIR,
-                                             Davis.RESOLUTION, sequence)
+                                             self.resolution, sequence)
         num_frames = self.dataset[sequence]['num_frames']
-        img_size = self.dataset[sequence]['image_size']
+        img_size = self.image_size(sequence, downsample=downsample)
 
         images = np.empty((num_frames, img_size[1], img_size[0], 3),
                           dtype=dtype)
@@ -283,6 +472,10 @@ class Davis:
             img_path = root_path / '{:05d}.jpg'.format(f)
             img_path = str(img_path.resolve())
             img = Image.open(img_path)
+            if downsample > 1:
+                img.draft('RGB', img_size)
+                if img.size != img_size:
+                    img = img.resize(img_size, Image.BILINEAR)
             img = np.asarray(img)
             assert img.shape[:2] == tuple(img_size[::-1])
             assert img.shape[-1] == 3
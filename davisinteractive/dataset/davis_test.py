@@ -9,6 +9,7 @@ import pytest
 from davisinteractive.common import Path, patch
 from davisinteractive.dataset import Davis
 from davisinteractive.utils.scribbles import annotated_frames, is_empty
+from PIL import Image
 
 FIXTURE_DIR = os.path.join(tempfile.mkdtemp(), 'DAVIS')
 
@@ -73,6 +74,10 @@ class TestDavis(unittest.TestCase):
         assert np.all(np.unique(ann2) == np.asarray([0, 1]))
         assert np.all(ann2.astype(np.int) == ann)
 
+        ann4 = davis.load_annotations('bear', downsample=4)
+        assert ann4.shape == (1, 120, 214)
+        assert np.all(ann4 == ann[:, ::4, ::4])
+
         Davis.dataset['bear']['num_frames'] = num_frames
 
     def test_load_images(self):
@@ -96,4 +101,65 @@ class TestDavis(unittest.TestCase):
         assert img2.max() <= 255
         assert np.all(img.astype(np.int) == img2)
 
+        sizes = {2: (240, 427), 3: (160, 285), 4: (120, 214)}
+        for downsample, shape in sizes.items():
+            img3 = davis.load_images('bear', downsample=downsample)
+            assert img3.shape == (1,) + shape + (3,)
+            assert img3.dtype == np.uint8
+            # Close to the average of the full resolution pixels
+            assert abs(img3.mean() - img.mean()) < 2
+
         Davis.dataset['bear']['num_frames'] = num_frames
+
+    def test_resolution(self):
+        assert Davis.resolution_tag() == '480p'
+        assert Davis.resolution_tag(2) == '240p'
+        assert Davis.resolution_tag(4) == '120p'
+
+        davis = Davis('/tmp/DAVIS')
+        assert davis.image_size('bear') == (854, 480)
+        assert davis.image_size('bear', downsample=4) == (214, 120)
+        assert davis.cache_file('bear', downsample=2).parent.name == '240p'
+
+    def test_custom_resolution(self):
+        assert (Davis.resolution_tag(
+            resolution='Full-Resolution') == 'Full-Resolution')
+        assert (Davis.resolution_tag(
+            2, resolution='Full-Resolution') == 'Full-Resolution-ds2')
+        assert Davis.resolution_tag(2, resolution='1080p') == '540p'
+
+        davis_root = tempfile.mkdtemp()
+        root = Path(davis_root).joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                         'Full-Resolution', 'bear')
+        root.mkdir(parents=True)
+        annotations = np.zeros((5, 30, 40), dtype=np.uint8)
+        for f in range(len(annotations)):
+            annotations[f, f:f + 10, 5:15] = 1
+            Image.fromarray(annotations[f]).save(
+                str(root / '{:05d}.png'.format(f)))
+
+        davis = Davis(davis_root, resolution='Full-Resolution')
+        assert davis.resolution == 'Full-Resolution'
+        assert davis.image_size('bear') == (40, 30)
+        assert davis.image_size('bear', downsample=3) == (14, 10)
+        assert davis.cache_file('bear').parent.name == 'Full-Resolution'
+
+        with patch.dict(Davis.dataset['bear'], {
+                'num_frames': 5,
+                'num_scribbles': 0
+        }):
+            davis.check_files(['bear'])
+            ann = davis.load_annotations('bear', dtype=np.uint8)
+            assert np.all(ann == annotations)
+            ann = davis.load_annotations('bear', frames=[3, 1])
+            assert np.all(ann == annotations[[3, 1]])
+
+            chunks = list(davis.iter_annotations('bear', 2))
+            assert [start for start, _ in chunks] == [0, 2, 4]
+            assert [len(c) for _, c in chunks] == [2, 2, 1]
+            assert chunks[0][1].dtype == np.uint8
+            assert np.all(np.concatenate([c for _, c in chunks]) == annotations)
+
+            root.joinpath('00004.png').unlink()
+            with pytest.raises(FileNotFoundError):
+                davis.check_files(['bear'])
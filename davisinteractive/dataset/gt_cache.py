@@ -0,0 +1,158 @@
+""" Persistent cache of the ground truth data derived from the annotations.
+
+Decoding the PNG annotations of a sequence and deriving data from them (the
+boundary maps used by the F-measure) is done on every process that evaluates
+the sequence. This module precomputes all of it once and stores it at
+`<davis_root>/Cache/<resolution>/<sequence>.npz`, together with the version
+of the cache format and the modification time of the annotations, so the
+files are invalidated when any of them changes.
+
+The cache can be built with #Davis.build_cache or from the command line:
+
+```bash
+python -m davisinteractive.dataset.gt_cache --davis-root path/to/DAVIS \\
+    --subset trainval
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+
+import numpy as np
+
+from .. import logging
+from ..metrics.jaccard import _seg2bmap
+
+__all__ = [
+    'CACHE_VERSION', 'compute_derived_annotations', 'save_gt_cache',
+    'load_gt_cache', 'unpack_boundaries'
+]
+
+CACHE_VERSION = 2
+
+
+def compute_derived_annotations(annotations, nb_objects):
+    """ Compute the data derived from the annotations of a sequence.
+
+    # Arguments
+        annotations: Numpy Array. Annotations with shape (B x H x W).
+        nb_objects: Integer. Number of objects of the sequence.
+
+    # Returns
+        Dictionary: With the `boundaries`, the boundary maps of every object
+            (B x N x H x W), being N the number of objects, packed as bits
+            along the last axis (see #unpack_boundaries).
+    """
+    nb_frames, h, w = annotations.shape
+    boundaries = np.zeros((nb_frames, nb_objects, h, (w + 7) // 8),
+                          dtype=np.uint8)
+
+    for f in range(nb_frames):
+        for i in range(nb_objects):
+            mask = annotations[f] == i + 1
+            if mask.any():
+                boundaries[f, i] = np.packbits(_seg2bmap(mask), axis=-1)
+
+    return {'boundaries': boundaries}
+
+
+def unpack_boundaries(boundaries, width):
+    """ Unpack the boundary maps stored on the cache.
+
+    # Arguments
+        boundaries: Numpy Array. Packed boundary maps.
+        width: Integer. Width of the annotations.
+
+    # Returns
+        Numpy Array: Boolean boundary maps with the shape of the packed ones
+            but `width` on the last axis, e.g. (B x N x H x W).
+    """
+    return np.unpackbits(boundaries, axis=-1)[..., :width].astype(np.bool)
+
+
+def save_gt_cache(cache_file, annotations, nb_objects, source_mtime):
+    """ Compute and store the ground truth cache of a sequence.
+
+    The file is written to a temporal file first and then moved to its final
+    location, so a cache file is never partially written.
+
+    # Arguments
+        cache_file: Path. File where to store the cache.
+        annotations: Numpy Array. Annotations of the sequence (B x H x W).
+        nb_objects: Integer. Number of objects of the sequence.
+        source_mtime: Float. Modification time of the annotations.
+    """
+    data = compute_derived_annotations(annotations, nb_objects)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(cache_file.stem + '.tmp.npz')
+    with tmp_file.open('wb') as fp:
+        np.savez(
+            fp,
+            version=CACHE_VERSION,
+            source_mtime=source_mtime,
+            annotations=annotations.astype(np.uint8),
+            **data)
+    tmp_file.replace(cache_file)
+
+
+def load_gt_cache(cache_file, source_mtime):
+    """ Load the ground truth cache of a sequence if it is valid.
+
+    # Arguments
+        cache_file: Path. File where the cache is stored.
+        source_mtime: Float. Modification time of the annotations.
+
+    # Returns
+        Dictionary or None: The `annotations` and the arrays of
+            #compute_derived_annotations, or `None` if the cache does not
+            exist, has a different version or is older than the annotations.
+    """
+    if not cache_file.exists():
+        return None
+    with np.load(str(cache_file)) as data:
+        if int(data['version']) != CACHE_VERSION:
+            logging.verbose(
+                'Ignoring cache {} with a different version'.format(
+                    cache_file), 1)
+            return None
+        if float(data['source_mtime']) != source_mtime:
+            logging.verbose(
+                'Ignoring cache {} as the annotations have changed'.format(
+                    cache_file), 1)
+            return None
+        return {
+            k: data[k] for k in data.files
+            if k not in ('version', 'source_mtime')
+        }
+
+
+def main(argv=None):
+    from .davis import Davis
+
+    parser = argparse.ArgumentParser(
+        description='Build the cache of the ground truth data of DAVIS.')
+    parser.add_argument(
+        '--davis-root', default=None, help='Path to the DAVIS dataset root.')
+    parser.add_argument(
+        '--subset',
+        default='trainval',
+        choices=sorted(Davis.sets),
+        help='Subset of the sequences to cache.')
+    parser.add_argument(
+        '--sequences',
+        nargs='+',
+        default=None,
+        help='Sequences to cache. It overrides the subset.')
+    parser.add_argument(
+        '--overwrite',
+        action='store_true',
+        help='Build the cache even if it is up to date.')
+    args = parser.parse_args(argv)
+
+    davis = Davis(davis_root=args.davis_root)
+    sequences = args.sequences or Davis.sets[args.subset]
+    davis.build_cache(sequences, overwrite=args.overwrite)
+
+
+if __name__ == '__main__':
+    main()
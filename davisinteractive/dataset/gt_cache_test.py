@@ -0,0 +1,108 @@
+from __future__ import absolute_import, division
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from davisinteractive.common import Path, patch
+from davisinteractive.dataset import Davis
+from davisinteractive.dataset.gt_cache import (compute_derived_annotations,
+                                               main, unpack_boundaries)
+from davisinteractive.metrics import batched_f_measure
+from davisinteractive.metrics.jaccard import _seg2bmap
+from PIL import Image
+
+SEQUENCE = {
+    'name': 'bear',
+    'num_frames': 3,
+    'num_objects': 2,
+    'num_scribbles': 1,
+    'image_size': [20, 10]
+}
+
+
+def _annotations():
+    annotations = np.zeros((3, 10, 20), dtype=np.uint8)
+    annotations[0, 2:6, 3:9] = 1
+    annotations[0, 5:9, 10:18] = 2
+    annotations[1, 1:4, 1:4] = 1
+    annotations[2, :, 15:] = 2
+    return annotations
+
+
+def _write_annotations(davis_root, annotations):
+    root = Path(davis_root).joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                     Davis.RESOLUTION, 'bear')
+    root.mkdir(parents=True, exist_ok=True)
+    for f, ann in enumerate(annotations):
+        Image.fromarray(ann).save(str(root / '{:05d}.png'.format(f)))
+
+
+@patch.dict(Davis.dataset, {'bear': SEQUENCE})
+class TestGroundTruthCache(unittest.TestCase):
+
+    def test_derived_annotations(self):
+        annotations = _annotations()
+        data = compute_derived_annotations(annotations, 2)
+
+        assert list(data) == ['boundaries']
+        assert data['boundaries'].shape == (3, 2, 10, 3)
+
+        boundaries = unpack_boundaries(data['boundaries'], 20)
+        assert boundaries.shape == (3, 2, 10, 20)
+        assert boundaries.dtype == np.bool
+        assert not boundaries[1, 1].any()
+        assert np.all(boundaries[0, 0] == _seg2bmap(annotations[0] == 1))
+        assert np.all(boundaries[2, 1] == _seg2bmap(annotations[2] == 2))
+
+        # Same F-measure using the cached boundaries
+        pred = np.roll(annotations, 1, axis=2)
+        expected = batched_f_measure(
+            annotations, pred, average_over_objects=False, nb_objects=2)
+        result = batched_f_measure(
+            annotations,
+            pred,
+            average_over_objects=False,
+            nb_objects=2,
+            gt_boundaries=data['boundaries'])
+        assert np.all(result == expected)
+
+    def test_build_and_load(self):
+        davis_root = tempfile.mkdtemp()
+        annotations = _annotations()
+        _write_annotations(davis_root, annotations)
+        davis = Davis(davis_root=davis_root)
+
+        assert davis.load_cache('bear') is None
+        assert davis.build_cache(['bear']) == ['bear']
+        assert davis.cache_file('bear').exists()
+        assert davis.build_cache(['bear']) == []
+        assert davis.build_cache(['bear'], overwrite=True) == ['bear']
+
+        cache = davis.load_cache('bear')
+        assert cache['annotations'].dtype == np.uint8
+        assert np.all(cache['annotations'] == annotations)
+        expected = compute_derived_annotations(annotations, 2)
+        for k, v in expected.items():
+            assert np.all(cache[k] == v)
+
+        # Modifying the annotations invalidates the cache
+        ann_file = davis.davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                             Davis.RESOLUTION, 'bear',
+                                             '00001.png')
+        mtime = ann_file.stat().st_mtime + 10
+        os.utime(str(ann_file), (mtime, mtime))
+        assert davis.load_cache('bear') is None
+
+        main(['--davis-root', davis_root, '--sequences', 'bear'])
+        assert davis.load_cache('bear') is not None
+
+    def test_version(self):
+        davis_root = tempfile.mkdtemp()
+        _write_annotations(davis_root, _annotations())
+        davis = Davis(davis_root=davis_root)
+        davis.build_cache(['bear'])
+
+        with patch('davisinteractive.dataset.gt_cache.CACHE_VERSION', 3):
+            assert davis.load_cache('bear') is None
@@ -1,3 +1,4 @@
 from __future__ import absolute_import
 
 from .service import EvaluationService
+from .registry import clear_services, get_service
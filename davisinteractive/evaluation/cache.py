@@ -0,0 +1,157 @@
+from __future__ import absolute_import, division
+
+import threading
+from collections import OrderedDict
+
+from .. import logging
+
+__all__ = ['AnnotationsCache']
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(v.nbytes for v in value if v is not None)
+    return value.nbytes
+
+
+def _set_read_only(value):
+    for v in (value if isinstance(value, tuple) else (value,)):
+        if v is not None:
+            v.flags.writeable = False
+
+
+class AnnotationsCache:
+    """ Thread-safe LRU cache of Numpy arrays with a budget in bytes.
+
+    The arrays are stored as read-only, as they are shared by all the users of
+    the cache. When the total size of the arrays exceeds the budget, the least
+    recently used ones are evicted. Arrays bigger than the budget are never
+    cached. A tuple of arrays (or `None`) can be stored as a single entry, so
+    the arrays are always evicted together.
+
+    # Arguments
+        max_bytes: Integer. Maximum number of bytes of all the arrays cached.
+            A value of 0 disables the cache.
+
+    # Raises
+        ValueError: if `max_bytes` is negative.
+    """
+
+    def __init__(self, max_bytes):
+        if max_bytes < 0:
+            raise ValueError('max_bytes must be positive or 0')
+        self.max_bytes = max_bytes
+        self.nb_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def keys(self):
+        """ Keys cached, from the least to the most recently used. """
+        with self._lock:
+            return list(self._items)
+
+    def get(self, key, load_fn):
+        """ Get an array from the cache, loading it if it is not cached.
+
+        # Arguments
+            key: Hashable. Key of the array.
+            load_fn: Callable. Function without arguments called to load the
+                array when it is not cached.
+
+        # Returns
+            Numpy Array: The read-only cached array.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        value = load_fn()
+        self.put(key, value)
+        return value
+
+    def peek(self, key):
+        """ Get an array from the cache without loading it.
+
+        It does not count as a hit or miss on the statistics.
+
+        # Arguments
+            key: Hashable. Key of the array.
+
+        # Returns
+            Numpy Array or None: The read-only cached array or `None` if it is
+                not cached.
+        """
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        """ Store an array in the cache, evicting the least recently used ones
+        if the budget is exceeded.
+
+        # Arguments
+            key: Hashable. Key of the array.
+            value: Numpy Array or tuple of them. Array to cache. It is set as
+                read-only.
+        """
+        _set_read_only(value)
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            logging.verbose(
+                'Array {} of {} bytes does not fit in the cache'.format(
+                    key, size), 2)
+            return
+
+        with self._lock:
+            if key in self._items:
+                self.nb_bytes -= _nbytes(self._items.pop(key))
+            self._items[key] = value
+            self.nb_bytes += size
+            while self.nb_bytes > self.max_bytes:
+                evicted_key, evicted = self._items.popitem(last=False)
+                self.nb_bytes -= _nbytes(evicted)
+                self.evictions += 1
+                logging.verbose('Evicted {} from the cache'.format(evicted_key),
+                                2)
+
+    def clear(self):
+        """ Remove all the arrays from the cache. """
+        with self._lock:
+            self._items.clear()
+            self.nb_bytes = 0
+
+    def stats(self):
+        """ Statistics of the usage of the cache.
+
+        # Returns
+            Dictionary: Number of `hits`, `misses` and `evictions`, the
+                `hit_ratio`, the number of arrays cached (`nb_items`) and the
+                bytes used (`nb_bytes`) and available (`max_bytes`).
+        """
+        with self._lock:
+            nb_requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / nb_requests if nb_requests else 0.,
+                'nb_items': len(self._items),
+                'nb_bytes': self.nb_bytes,
+                'max_bytes': self.max_bytes,
+            }
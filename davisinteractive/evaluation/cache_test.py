@@ -0,0 +1,79 @@
+from __future__ import absolute_import, division
+
+import unittest
+
+import numpy as np
+import pytest
+
+from davisinteractive.evaluation.cache import AnnotationsCache
+
+
+class TestAnnotationsCache(unittest.TestCase):
+
+    def test_lru(self):
+        cache = AnnotationsCache(max_bytes=300)
+        arrays = {
+            k: np.full(100, i, dtype=np.uint8) for i, k in enumerate('abcd')
+        }
+
+        for k in 'abc':
+            assert cache.get(k, lambda: arrays[k]) is arrays[k]
+        assert cache.nb_bytes == 300
+        # Use `a` so `b` is the least recently used
+        assert cache.get('a', lambda: None) is arrays['a']
+        cache.get('d', lambda: arrays['d'])
+        assert cache.keys() == ['c', 'a', 'd']
+        assert 'b' not in cache
+        assert len(cache) == 3
+
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 4
+        assert stats['evictions'] == 1
+        assert stats['hit_ratio'] == .2
+        assert stats['nb_bytes'] == 300
+
+    def test_read_only(self):
+        cache = AnnotationsCache(max_bytes=1000)
+        value = cache.get('a', lambda: np.zeros(10))
+        with pytest.raises(ValueError):
+            value[0] = 1
+
+    def test_too_big(self):
+        cache = AnnotationsCache(max_bytes=10)
+        value = cache.get('a', lambda: np.zeros(100, dtype=np.uint8))
+        assert len(value) == 100
+        assert 'a' not in cache
+        assert cache.nb_bytes == 0
+
+        disabled = AnnotationsCache(max_bytes=0)
+        disabled.get('a', lambda: np.zeros(1, dtype=np.uint8))
+        assert len(disabled) == 0
+
+    def test_replace(self):
+        cache = AnnotationsCache(max_bytes=1000)
+        cache.put('a', np.zeros(100, dtype=np.uint8))
+        cache.put('a', np.zeros(200, dtype=np.uint8))
+        assert cache.nb_bytes == 200
+        cache.clear()
+        assert cache.nb_bytes == 0
+        assert len(cache) == 0
+
+    def test_tuple(self):
+        cache = AnnotationsCache(max_bytes=300)
+        cache.put('a', (np.zeros(100, dtype=np.uint8), None))
+        value = (np.zeros(100, dtype=np.uint8), np.zeros(50, dtype=np.uint8))
+        cache.put('b', value)
+        assert cache.nb_bytes == 250
+        assert not any(v.flags.writeable for v in value)
+        # Both arrays of an entry are evicted together
+        cache.put('c', np.zeros(100, dtype=np.uint8))
+        assert cache.keys() == ['b', 'c']
+        assert cache.nb_bytes == 250
+        cache.put('d', np.zeros(100, dtype=np.uint8))
+        assert cache.keys() == ['c', 'd']
+        assert cache.nb_bytes == 200
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            AnnotationsCache(max_bytes=-1)
@@ -0,0 +1,169 @@
+""" Merge of the reports of a sharded evaluation.
+
+When the samples of a subset are evaluated by several workers (see the
+`shard` and `num_shards` arguments of `DavisInteractiveSession`), every worker
+stores the report of its own shard. This module combines them into a single
+report and computes the global summary of the whole subset, which is the same
+as the one obtained evaluating all the samples in a single session. All the
+shards must have been evaluated at the same resolution.
+
+It can also be run from the command line:
+
+```bash
+python -m davisinteractive.evaluation.merge --subset val \\
+    --davis-root path/to/DAVIS --max-nb-interactions 5 \\
+    --output merged.csv --summary summary.json shard_*.csv
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+import json
+
+import pandas as pd
+
+from .. import logging
+from ..dataset import Davis
+from .service import EvaluationService
+
+__all__ = ['merge_reports', 'summarize_reports']
+
+_ENTRY_KEY = ['sequence', 'scribble_idx', 'interaction', 'object_id', 'frame']
+
+
+def merge_reports(reports):
+    """ Merge the reports of several shards of an evaluation.
+
+    # Arguments
+        reports: List of Pandas DataFrames, Strings or Paths. Reports to merge
+            or paths to the CSV files where they are stored.
+
+    # Returns
+        Pandas DataFrame: Merged report, sorted by sample, interaction,
+            object and frame. The reports without the `resolution` column are
+            taken as evaluated at the default resolution (480p). The column
+            is only kept if any of the reports has it.
+
+    # Raises
+        ValueError: if no reports are given, the reports were evaluated at
+            different resolutions or the same entry appears on more than one
+            report.
+    """
+    dfs = []
+    for report in reports:
+        if not isinstance(report, pd.DataFrame):
+            report = pd.read_csv(
+                str(report), index_col=0, float_precision='round_trip')
+        dfs.append(report)
+    if not dfs:
+        raise ValueError('At least one report must be given')
+
+    if any('resolution' in df for df in dfs):
+        dfs = [
+            df if 'resolution' in df else df.assign(
+                resolution=Davis.resolution_tag()) for df in dfs
+        ]
+        resolutions = sorted(
+            set().union(*(df.resolution.unique() for df in dfs)))
+        if len(resolutions) > 1:
+            raise ValueError('The reports were evaluated at different '
+                             'resolutions: {}'.format(resolutions))
+
+    df = pd.concat(dfs, ignore_index=True)
+    duplicated = df.duplicated(subset=_ENTRY_KEY)
+    if duplicated.any():
+        samples = sorted(
+            set(zip(df.loc[duplicated, 'sequence'],
+                    df.loc[duplicated, 'scribble_idx'])))
+        raise ValueError('The following samples appear on more than one '
+                         'report: {}'.format(samples))
+    df = df.sort_values(_ENTRY_KEY).reset_index(drop=True)
+    logging.verbose(
+        'Merged {} reports with {} entries'.format(len(dfs), len(df)), 1)
+    return df
+
+
+def summarize_reports(reports,
+                      subset,
+                      davis_root=None,
+                      max_t=None,
+                      max_i=None,
+                      metric_to_optimize='J_AND_F',
+                      time_threshold=None):
+    """ Compute the global summary of the reports of a sharded evaluation.
+
+    The parameters must be the same used for the evaluation of the shards
+    (after the limits applied by `DavisInteractiveSession`), as the summary
+    depends on them.
+
+    # Arguments
+        reports: List of Pandas DataFrames, Strings or Paths. See
+            #merge_reports.
+        subset: String. Subset evaluated.
+        davis_root: String or Path. Path to the DAVIS dataset root directory.
+        max_t: Integer. Maximum time per object evaluating a sample.
+        max_i: Integer. Maximum number of interactions per sample.
+        metric_to_optimize: String. Metric optimized: `J`, `F` or `J_AND_F`.
+        time_threshold: Integer. Time in seconds to compute the metric at.
+
+    # Returns
+        Dictionary: Global summary, as returned by
+            `EvaluationService.summarize_report`.
+    """
+    service = EvaluationService(
+        subset,
+        davis_root=davis_root,
+        max_t=max_t,
+        max_i=max_i,
+        metric_to_optimize=metric_to_optimize,
+        time_threshold=time_threshold)
+    return service.summarize_report(merge_reports(reports))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Merge the reports of a sharded evaluation and compute '
+        'its global summary.')
+    parser.add_argument('reports', nargs='+', help='CSV reports to merge.')
+    parser.add_argument(
+        '--subset', required=True, help='Subset evaluated by the shards.')
+    parser.add_argument(
+        '--davis-root', default=None, help='Path to the DAVIS dataset root.')
+    parser.add_argument(
+        '--max-time',
+        type=int,
+        default=None,
+        help='Maximum time per object evaluating a sample.')
+    parser.add_argument(
+        '--max-nb-interactions',
+        type=int,
+        default=None,
+        help='Maximum number of interactions per sample.')
+    parser.add_argument(
+        '--metric-to-optimize',
+        default='J_AND_F',
+        choices=EvaluationService._AVAILABLE_METRICS,
+        help='Metric optimized.')
+    parser.add_argument(
+        '--output', default=None, help='Path to store the merged report.')
+    parser.add_argument(
+        '--summary', default=None, help='Path to store the global summary.')
+    args = parser.parse_args(argv)
+
+    report = merge_reports(args.reports)
+    if args.output:
+        report.to_csv(args.output)
+    summary = summarize_reports([report],
+                                args.subset,
+                                davis_root=args.davis_root,
+                                max_t=args.max_time,
+                                max_i=args.max_nb_interactions,
+                                metric_to_optimize=args.metric_to_optimize)
+    if args.summary:
+        with open(args.summary, 'w') as fp:
+            json.dump(summary, fp)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+from __future__ import absolute_import, division
+
+import json
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+from davisinteractive.common import Path, patch
+from davisinteractive.dataset import Davis
+from davisinteractive.evaluation.merge import (main, merge_reports,
+                                               summarize_reports)
+from davisinteractive.session import DavisInteractiveSession
+from davisinteractive.session.session_test import dataset
+
+DAVIS_ROOT = Path(__file__).parents[1].joinpath('session', 'test_data',
+                                                'DAVIS')
+
+
+def _evaluate(**kwargs):
+    with DavisInteractiveSession(
+            davis_root=DAVIS_ROOT,
+            subset='train',
+            max_nb_interactions=2,
+            report_save_dir=tempfile.mkdtemp(),
+            max_time=None,
+            **kwargs) as session:
+        for _ in session.scribbles_iterator():
+            session.submit_masks(np.ones((2, 480, 854)))
+    return session
+
+
+class TestMergeReports(unittest.TestCase):
+
+    def test_overlap(self):
+        report = pd.DataFrame({
+            'sequence': ['bear', 'bear'],
+            'scribble_idx': [1, 1],
+            'interaction': [1, 1],
+            'object_id': [1, 1],
+            'frame': [0, 1],
+        })
+        assert len(merge_reports([report])) == 2
+        with pytest.raises(ValueError):
+            merge_reports([report, report.iloc[1:]])
+        with pytest.raises(ValueError):
+            merge_reports([])
+
+    def test_resolution(self):
+        report = pd.DataFrame({
+            'sequence': ['bear', 'bear'],
+            'scribble_idx': [1, 1],
+            'interaction': [1, 1],
+            'object_id': [1, 1],
+            'frame': [0, 1],
+        })
+        shards = [report.iloc[:1], report.iloc[1:].assign(resolution='480p')]
+        merged = merge_reports(shards)
+        assert merged.resolution.tolist() == ['480p', '480p']
+
+        shards[0] = shards[0].assign(resolution='240p')
+        with pytest.raises(ValueError):
+            merge_reports(shards)
+
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_sharded_evaluation(self, mock_davis):
+        with pytest.raises(ValueError):
+            DavisInteractiveSession(shard=0)
+        with pytest.raises(ValueError):
+            DavisInteractiveSession(shard=2, num_shards=2)
+        with pytest.raises(ValueError):
+            DavisInteractiveSession(
+                host='https://example.com',
+                user_key='user',
+                shard=0,
+                num_shards=2)
+
+        shards = [_evaluate(shard=i, num_shards=2) for i in range(2)]
+        samples = [s.samples for s in shards]
+        assert samples == [[('bear', 1)], [('bear', 2), ('tennis', 1)]]
+
+        report_files = [s.report_writer.filename for s in shards]
+        merged = merge_reports(report_files)
+        assert merged.shape == (2 * 2 * 2 * 1 + 2 * 2 * 2, 10)
+        assert 'resolution' not in merged
+        assert set(merged.session_id) == {s.session_key for s in shards}
+        summary = summarize_reports(
+            report_files, 'train', davis_root=DAVIS_ROOT, max_i=2)
+        assert summary['curve']['J_AND_F'][-1] > 0
+        assert summary['resolution'] == '480p'
+
+        # The shards of a reduced resolution evaluation keep its resolution
+        reduced = [_evaluate(shard=i, num_shards=2, downsample=2)
+                   for i in range(2)]
+        reduced_files = [s.report_writer.filename for s in reduced]
+        summary = summarize_reports(
+            reduced_files, 'train', davis_root=DAVIS_ROOT, max_i=2)
+        assert summary['resolution'] == '240p'
+        with pytest.raises(ValueError):
+            merge_reports([report_files[0], reduced_files[1]])
+
+        # The summary of the merged shards is the one of the whole evaluation
+        session = _evaluate()
+        report = session.get_report()
+        reports = [
+            report.loc[report.sequence == 'tennis'],
+            report.loc[report.sequence == 'bear'],
+        ]
+        summary = summarize_reports(
+            reports, 'train', davis_root=DAVIS_ROOT, max_i=2)
+        assert summary == session.get_global_summary()
+
+        summary_file = Path(tempfile.mkdtemp()) / 'summary.json'
+        main([
+            str(report_files[0]),
+            str(report_files[1]), '--subset', 'train', '--davis-root',
+            str(DAVIS_ROOT), '--max-nb-interactions', '2', '--summary',
+            str(summary_file)
+        ])
+        with summary_file.open() as fp:
+            assert 'auc' in json.load(fp)
+
+        assert mock_davis.call_count == 0
@@ -0,0 +1,94 @@
+""" Process-wide registry of evaluation services.
+
+Creating an `EvaluationService` checks all the files of the subset and
+creates a new robot and storage. When many sessions are run in the same
+process, they can share a single service with the same configuration (and
+its warm caches) with #get_service. The results of every session are kept
+apart by the storage, which is indexed by session, and the finished sessions
+can be spilled to disk to bound the memory of the process.
+"""
+from __future__ import absolute_import, division
+
+import os
+import threading
+
+from .. import logging
+from ..common import Path
+from ..storage import LocalStorage
+from .service import EvaluationService
+
+__all__ = ['get_service', 'clear_services']
+
+_SERVICES = {}
+_LOCK = threading.Lock()
+
+
+def _absolute_path(path):
+    if path is None:
+        return None
+    return str(Path(path).expanduser().absolute())
+
+
+def _service_key(subset, davis_root, robot_parameters, max_t, max_i,
+                 metric_to_optimize, downsample, resolution, spill_dir,
+                 session_ttl):
+    davis_root = _absolute_path(davis_root or os.environ.get('DATASET_DAVIS'))
+    robot_parameters = tuple(sorted((robot_parameters or {}).items()))
+    return (subset, davis_root, robot_parameters, max_t, max_i,
+            metric_to_optimize, downsample, resolution,
+            _absolute_path(spill_dir), session_ttl)
+
+
+def get_service(subset,
+                davis_root=None,
+                robot_parameters=None,
+                max_t=None,
+                max_i=None,
+                metric_to_optimize='J_AND_F',
+                downsample=1,
+                resolution=None,
+                spill_dir=None,
+                session_ttl=None):
+    """ Get the shared evaluation service with the given configuration.
+
+    The service is created the first time it is requested and the same
+    instance is returned afterwards. See #EvaluationService for the
+    description of the arguments.
+
+    # Arguments
+        spill_dir: String or Path. Directory where the storage of the
+            service spills the finished sessions. See #LocalStorage.
+        session_ttl: Float. Seconds after which the storage spills an idle
+            session. See #LocalStorage.
+
+    # Returns
+        EvaluationService: Shared service.
+    """
+    key = _service_key(subset, davis_root, robot_parameters, max_t, max_i,
+                       metric_to_optimize, downsample, resolution, spill_dir,
+                       session_ttl)
+    with _LOCK:
+        service = _SERVICES.get(key)
+        if service is None:
+            logging.verbose('Creating shared evaluation service', 1)
+            service = EvaluationService(
+                subset,
+                davis_root=davis_root,
+                robot_parameters=robot_parameters,
+                max_t=max_t,
+                max_i=max_i,
+                metric_to_optimize=metric_to_optimize,
+                downsample=downsample,
+                resolution=resolution,
+                storage=LocalStorage(
+                    spill_dir=spill_dir, session_ttl=session_ttl))
+            _SERVICES[key] = service
+        else:
+            logging.verbose('Reusing shared evaluation service', 1)
+    return service
+
+
+def clear_services():
+    """ Remove all the shared services from the registry. """
+    with _LOCK:
+        _SERVICES.clear()
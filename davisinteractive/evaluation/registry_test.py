@@ -0,0 +1,52 @@
+import tempfile
+import unittest
+
+from davisinteractive.common import patch
+from davisinteractive.dataset import Davis
+from davisinteractive.evaluation import (EvaluationService, clear_services,
+                                         get_service)
+
+
+class TestServiceRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        clear_services()
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_get_service(self, mock_davis):
+        service = get_service('train', davis_root='/tmp/DAVIS', max_i=5)
+        assert isinstance(service, EvaluationService)
+        assert get_service(
+            'train', davis_root='/tmp/DAVIS/', max_i=5) is service
+        with patch.dict('os.environ', {'DATASET_DAVIS': '/tmp/DAVIS'}):
+            assert get_service('train', max_i=5) is service
+        assert mock_davis.call_count == 1
+
+        assert get_service('val', davis_root='/tmp/DAVIS', max_i=5) is not \
+            service
+        assert get_service('train', davis_root='/tmp/DAVIS') is not service
+        assert get_service(
+            'train',
+            davis_root='/tmp/DAVIS',
+            max_i=5,
+            robot_parameters={'kernel_size': .3}) is not service
+        assert mock_davis.call_count == 4
+
+        spill_dir = tempfile.mkdtemp()
+        spilling = get_service(
+            'train', davis_root='/tmp/DAVIS', max_i=5, spill_dir=spill_dir)
+        assert spilling is not service
+        assert str(spilling.storage.spill_dir) == spill_dir
+        assert get_service(
+            'train', davis_root='/tmp/DAVIS', max_i=5,
+            spill_dir=spill_dir) is spilling
+        assert get_service(
+            'train',
+            davis_root='/tmp/DAVIS',
+            max_i=5,
+            spill_dir=spill_dir,
+            session_ttl=60) is not spilling
+
+        clear_services()
+        assert get_service(
+            'train', davis_root='/tmp/DAVIS', max_i=5) is not service
@@ -1,5 +1,7 @@
 from __future__ import absolute_import, division
 
+import threading
+
 import numpy as np
 import pandas as pd
 
@@ -8,14 +10,23 @@ from ..dataset.davis import Davis
 from ..metrics import batched_f_measure, batched_jaccard
 from ..robot import InteractiveScribblesRobot
 from ..storage import LocalStorage
+from ..utils.timing import record_time
+from .cache import AnnotationsCache
 
 ROBOT_DEFAULT_PARAMETERS = {
     'kernel_size': .2,
     'max_kernel_radius': 16,
     'min_nb_nodes': 4,
-    'nb_points': 1000
+    'nb_points': 1000,
+    'path_tolerance': None
 }
 
+ANNOTATIONS_CACHE_BYTES = 256 * 1024**2
+
+# Defaults to bound the memory used at resolutions higher than 480p
+HIGH_RESOLUTION_CHUNK_SIZE = 8
+HIGH_RESOLUTION_TILE_SIZE = 1024
+
 
 class EvaluationService:
     """ Class responsible of the evaluation.
@@ -30,7 +41,9 @@ class EvaluationService:
         davis_root: String or Path. Path to the DAVIS dataset root directory,
             where the scribbles and the masks are stored.
         robot_parameters: Dictionary. Dictionary of parameters to initialize
-            the scribbles robot.
+            the scribbles robot. The parameters not given take the value from
+            `ROBOT_DEFAULT_PARAMETERS`. Set `path_tolerance` to simplify the
+            paths of the returned scribbles.
         max_t: Integer. Number of seconds maximum to evaluate a single sample.
             This value will overwrite the specified from the user at
             `DavisInteractiveSession` class.
@@ -41,9 +54,44 @@ class EvaluationService:
             J, F or J_AND_F.
         time_threshold: Integer. Time in seconds to use it as threshold to
             compute the jaccard and compare the evaluation of different methods.
+        annotations_cache_bytes: Integer. Memory budget in bytes to keep the
+            annotations of the sequences evaluated, which are stored as
+            `np.uint8`. The least recently used ones are evicted when the
+            budget is exceeded. The usage statistics are available with
+            `EvaluationService.annotations_cache.stats()`. Default 256 MiB.
+        use_gt_cache: Boolean. Whether to load the annotations and the
+            boundary maps of the objects from the ground truth cache built
+            with `Davis.build_cache`, when it is up to date.
+        downsample: Integer. Factor by which the resolution of the evaluation
+            is reduced, to evaluate faster during development. The metrics are
+            computed on the annotations and the predicted masks subsampled by
+            this factor, and the pixel parameters of the robot
+            (`max_kernel_radius`, `path_tolerance` and `min_nb_nodes`, as
+            the nodes of the skeleton are pixels) are scaled accordingly. The results are only approximations of the ones at
+            full resolution. Default 1.
+        resolution: String. Resolution of the DAVIS dataset to evaluate, for
+            instance `Full-Resolution`. By default `Davis.RESOLUTION` (480p).
+            At any other resolution the annotations are loaded and evaluated
+            by chunks of frames and tiles (see `chunk_size` and `tile_size`)
+            to bound the memory used.
+        chunk_size: Integer. If given, the annotations are not loaded for the
+            whole sequence: the metrics are computed by chunks of this number
+            of frames and the robot only loads and processes the region with
+            errors of the frame to annotate. The annotations cache and the
+            ground truth cache are not used. Default 8 frames at resolutions
+            higher than 480p, otherwise `None`.
+        tile_size: Integer. If given, the F-measure of every frame is computed
+            by square tiles of this size (see
+            `davisinteractive.metrics.tiled_f_measure`). Default 1024 pixels
+            at resolutions higher than 480p, otherwise `None`.
+
+    # Raises
+        ValueError: if the subset, the metric or the downsample factor are not
+            valid.
     """
 
     _AVAILABLE_METRICS = ('J', 'F', 'J_AND_F')
+    _METRIC_COLUMNS = {'J': 'jaccard', 'F': 'contour', 'J_AND_F': 'j_and_f'}
 
     def __init__(self,
                  subset,
@@ -53,14 +101,46 @@ class EvaluationService:
                  max_t=None,
                  max_i=None,
                  metric_to_optimize='J_AND_F',
-                 time_threshold=None):
+                 time_threshold=None,
+                 annotations_cache_bytes=ANNOTATIONS_CACHE_BYTES,
+                 use_gt_cache=True,
+                 downsample=1,
+                 resolution=None,
+                 chunk_size=None,
+                 tile_size=None):
         if subset not in Davis.sets:
             raise ValueError('Subset must be a valid subset: {}'.format(
                 Davis.sets.keys()))
-
-        self.davis = Davis(davis_root=davis_root)
-
-        robot_parameters = robot_parameters or ROBOT_DEFAULT_PARAMETERS
+        if downsample < 1 or int(downsample) != downsample:
+            raise ValueError('downsample must be a positive integer')
+        self.downsample = int(downsample)
+        self.davis = Davis(davis_root=davis_root, resolution=resolution)
+        self.resolution = Davis.resolution_tag(self.downsample,
+                                               self.davis.resolution)
+        # Only the reports of a non default resolution are tagged with it, so
+        # the default reports keep their columns
+        self._tag_reports = self.downsample != 1 or resolution is not None
+        if self.downsample > 1:
+            logging.warning(
+                'Evaluating at reduced resolution {}. The results are not '
+                'comparable with the ones at {}'.format(
+                    self.resolution, self.davis.resolution))
+
+        high_resolution = self.davis.resolution != Davis.RESOLUTION
+        self.chunk_size = chunk_size or (HIGH_RESOLUTION_CHUNK_SIZE
+                                         if high_resolution else None)
+        self.tile_size = tile_size or (HIGH_RESOLUTION_TILE_SIZE
+                                       if high_resolution else None)
+
+        robot_parameters = dict(ROBOT_DEFAULT_PARAMETERS,
+                                **(robot_parameters or {}))
+        # The scribbles are normalized by the size of the frames, only the
+        # parameters in pixels depend on the resolution
+        robot_parameters['max_kernel_radius'] /= self.downsample
+        robot_parameters['min_nb_nodes'] = max(
+            1, int(round(robot_parameters['min_nb_nodes'] / self.downsample)))
+        if robot_parameters['path_tolerance'] is not None:
+            robot_parameters['path_tolerance'] /= self.downsample
         self.robot = InteractiveScribblesRobot(**robot_parameters)
 
         # Get the list of sequences to evaluate and also from all the scribbles
@@ -105,6 +185,15 @@ class EvaluationService:
         if self.max_i is not None:
             self.num_entries *= self.max_i
 
+        # Annotations of the last sequences used or prefetched
+        self.annotations_cache = AnnotationsCache(annotations_cache_bytes)
+        self.use_gt_cache = use_gt_cache
+
+        # The submissions of every session are serialized, while different
+        # sessions can be evaluated concurrently
+        self._session_locks = {}
+        self._session_locks_lock = threading.Lock()
+
     def get_samples(self):
         """ Get the list of samples.
 
@@ -114,7 +203,7 @@ class EvaluationService:
         """
 
         logging.info('Getting samples')
-        return self.sequences_scribble_idx, self.max_t, self.max_i
+        return list(self.sequences_scribble_idx), self.max_t, self.max_i
 
     def get_scribble(self, sequence, scribble_idx):
         """ Get a scribble.
@@ -136,6 +225,99 @@ class EvaluationService:
 
         return scribble
 
+    def _load_annotations(self, sequence):
+        """ Load the annotations of a sequence keeping the last ones used. """
+        return self._load_ground_truth(sequence)[0]
+
+    def _load_ground_truth(self, sequence):
+        """ Load the annotations of a sequence and the packed boundary maps
+        of its objects, or `None` if they are not in the ground truth cache.
+
+        Both are kept as a single entry of the annotations cache, so the
+        boundaries are always the ones of the cached annotations.
+        """
+        return self.annotations_cache.get(
+            sequence, lambda: self._read_ground_truth(sequence))
+
+    def _read_ground_truth(self, sequence):
+        if self.use_gt_cache:
+            gt_cache = self.davis.load_cache(
+                sequence, downsample=self.downsample)
+            if gt_cache is not None:
+                # The boundaries are kept packed, as they are 8 times smaller
+                return gt_cache['annotations'], gt_cache['boundaries']
+        annotations = self.davis.load_annotations(
+            sequence, dtype=np.uint8, downsample=self.downsample)
+        return annotations, None
+
+    def prefetch_annotations(self, sequence):
+        """ Load the annotations of a sequence before they are needed.
+
+        The annotations of the last sequences used or prefetched are kept in
+        memory (see `annotations_cache_bytes`), so the next submission of
+        masks for the sequence does not have to load them. When the
+        annotations are loaded by chunks (see `chunk_size`), nothing is
+        prefetched.
+
+        # Arguments
+            sequence: String. Sequence name.
+
+        # Raises
+            ValueError: when the sequence is invalid.
+        """
+        if sequence not in self.sequences:
+            raise ValueError('Invalid sequence: %s' % sequence)
+        if self.chunk_size:
+            return
+        self._load_annotations(sequence)
+
+    def _match_resolution(self, pred_masks, shape):
+        """ Subsample the predicted masks given at full resolution to the
+        `shape` of the annotations evaluated. """
+        pred_masks = np.asarray(pred_masks)
+        if self.downsample > 1 and pred_masks.shape[-2:] != tuple(shape[-2:]):
+            step = self.downsample
+            pred_masks = pred_masks[..., ::step, ::step]
+        return pred_masks
+
+    def _chunked_metrics(self, sequence, pred_masks, nb_objects, timings):
+        """ Compute the metrics loading the annotations by chunks of frames.
+        """
+        pred_masks = np.asarray(pred_masks)
+        chunks = self.davis.iter_annotations(
+            sequence,
+            self.chunk_size,
+            dtype=np.uint8,
+            downsample=self.downsample)
+        jaccard, contour = [], []
+        while True:
+            with record_time(timings, 'load_annotations'):
+                start, gt_chunk = next(chunks, (None, None))
+            if gt_chunk is None:
+                break
+            pred_chunk = self._match_resolution(
+                pred_masks[start:start + len(gt_chunk)], gt_chunk.shape)
+            with record_time(timings, 'metrics'):
+                jaccard.append(
+                    batched_jaccard(
+                        gt_chunk,
+                        pred_chunk,
+                        average_over_objects=False,
+                        nb_objects=nb_objects))
+                contour.append(
+                    batched_f_measure(
+                        gt_chunk,
+                        pred_chunk,
+                        average_over_objects=False,
+                        nb_objects=nb_objects,
+                        tile_size=self.tile_size))
+        return np.concatenate(jaccard), np.concatenate(contour)
+
+    def _session_lock(self, session_key):
+        with self._session_locks_lock:
+            return self._session_locks.setdefault(session_key,
+                                                  threading.Lock())
+
     def post_predicted_masks(self,
                              sequence,
                              scribble_idx,
@@ -144,16 +326,21 @@ class EvaluationService:
                              interaction,
                              user_key,
                              session_key,
-                             next_scribble_frame_candidates=None):
+                             next_scribble_frame_candidates=None,
+                             timings=None):
         """ Post the predicted masks and return new scribble.
 
         When the predicted masks are given, the metrics are computed and
-        stored.
+        stored. It can be called concurrently from several threads: the
+        metrics of different sessions are computed in parallel and the
+        submissions of the same session are stored one after the other.
 
         # Arguments
             sequence: String. Sequence name of the predicted masks.
             scribble_idx: Integer. Scribble index of the sample evaluating.
             pred_masks: Numpy Array. Predicted masks for the given sequence.
+                When evaluating at a reduced resolution, they can be given
+                either at full or at the reduced resolution.
             timing: Float. Timing in seconds of this interaction.
             interaction: Integer. Interaction number.
             user_key: String. User identifier.
@@ -163,6 +350,9 @@ class EvaluationService:
                 scribble. If values given, the next scribble will be performed
                 in the frame where the evaluation metric scores the least on
                 the list of given frames. Invalid frames indexes are ignored.
+            timings: Dictionary. If given, the time in seconds spent on every
+                phase is recorded on it: `load_annotations`, `metrics`,
+                `storage` and `robot`.
 
         # Returns
             Dictionary: Scribble returned by the scribble robot
@@ -185,20 +375,28 @@ class EvaluationService:
                 'Sequence: {} and scribble index: {} invalid'.format(
                     sequence, scribble_idx))
 
-        # Load ground truth masks and compute jaccard metric
-        gt_masks = self.davis.load_annotations(sequence)
         nb_objects = Davis.dataset[sequence]['num_objects']
-
-        jaccard = batched_jaccard(
-            gt_masks,
-            pred_masks,
-            average_over_objects=False,
-            nb_objects=nb_objects)
-        contour = batched_f_measure(
-            gt_masks,
-            pred_masks,
-            average_over_objects=False,
-            nb_objects=nb_objects)
+        if self.chunk_size:
+            jaccard, contour = self._chunked_metrics(sequence, pred_masks,
+                                                     nb_objects, timings)
+        else:
+            # Load ground truth masks and compute jaccard metric
+            with record_time(timings, 'load_annotations'):
+                gt_masks, gt_boundaries = self._load_ground_truth(sequence)
+            pred_masks = self._match_resolution(pred_masks, gt_masks.shape)
+
+            with record_time(timings, 'metrics'):
+                jaccard = batched_jaccard(
+                    gt_masks,
+                    pred_masks,
+                    average_over_objects=False,
+                    nb_objects=nb_objects)
+                contour = batched_f_measure(
+                    gt_masks,
+                    pred_masks,
+                    average_over_objects=False,
+                    nb_objects=nb_objects,
+                    gt_boundaries=gt_boundaries)
         nb_frames, _ = jaccard.shape
 
         frames_idx = np.arange(nb_frames)
@@ -206,13 +404,56 @@ class EvaluationService:
 
         objects_idx, frames_idx = np.meshgrid(objects_idx, frames_idx)
 
+        with self._session_lock(session_key):
+            next_frame = self._store_results(
+                sequence, scribble_idx, timing, interaction, user_key,
+                session_key, jaccard, contour, objects_idx, frames_idx,
+                next_scribble_frame_candidates, timings)
+
+        # Generate next scribble
+        if self.chunk_size:
+            # Only the annotation of the frame to annotate is loaded
+            with record_time(timings, 'load_annotations'):
+                gt_mask = self.davis.load_annotations(
+                    sequence,
+                    dtype=np.uint8,
+                    downsample=self.downsample,
+                    frames=[next_frame])[0]
+            pred_mask = self._match_resolution(
+                np.asarray(pred_masks)[next_frame], gt_mask.shape)
+            with record_time(timings, 'robot'):
+                next_scribble = self.robot.interact_frame(
+                    sequence,
+                    pred_mask,
+                    gt_mask,
+                    next_frame,
+                    nb_frames,
+                    nb_objects=nb_objects,
+                    crop=True)
+        else:
+            with record_time(timings, 'robot'):
+                next_scribble = self.robot.interact(
+                    sequence,
+                    pred_masks,
+                    gt_masks,
+                    nb_objects=nb_objects,
+                    frame=next_frame)
+
+        return next_scribble
+
+    def _store_results(self, sequence, scribble_idx, timing, interaction,
+                       user_key, session_key, jaccard, contour, objects_idx,
+                       frames_idx, next_scribble_frame_candidates, timings):
+        """ Store the results of an interaction and the frame of the next
+        scribble, which is returned. """
+        nb_frames = len(jaccard)
+
         # Save the results on storage
-        self.storage.store_interactions_results(
-            user_key, session_key, sequence, scribble_idx, interaction, timing,
-            objects_idx.ravel().tolist(),
-            frames_idx.ravel().tolist(),
-            jaccard.ravel().tolist(),
-            contour.ravel().tolist())
+        with record_time(timings, 'storage'):
+            self.storage.store_interactions_results(
+                user_key, session_key, sequence, scribble_idx, interaction,
+                timing, objects_idx.ravel(), frames_idx.ravel(),
+                jaccard.ravel(), contour.ravel())
 
         if self.metric_to_optimize == 'J':
             metric = jaccard.mean(axis=1)
@@ -225,8 +466,9 @@ class EvaluationService:
             raise ValueError('Invalid metric_to_optimize: {}'.format(
                 self.metric_to_optimize))
 
-        prev_frames_used = self.storage.get_annotated_frames(
-            session_key, sequence, scribble_idx)
+        with record_time(timings, 'storage'):
+            prev_frames_used = self.storage.get_annotated_frames(
+                session_key, sequence, scribble_idx)
         prev_frames_used = set(prev_frames_used)
 
         override = next_scribble_frame_candidates is not None
@@ -249,18 +491,11 @@ class EvaluationService:
             i += 1
 
         next_frame = metric_idx[i]
-        self.storage.store_annotated_frame(session_key, sequence, scribble_idx,
-                                           next_frame, override)
-
-        # Generate next scribble
-        next_scribble = self.robot.interact(
-            sequence,
-            pred_masks,
-            gt_masks,
-            nb_objects=nb_objects,
-            frame=next_frame)
-
-        return next_scribble
+        with record_time(timings, 'storage'):
+            self.storage.store_annotated_frame(session_key, sequence,
+                                               scribble_idx, next_frame,
+                                               override)
+        return next_frame
 
     def get_report(self, **kwargs):
         """ Get report for a session.
@@ -268,11 +503,42 @@ class EvaluationService:
         # Arguments
             user_key: String. User identifier.
             session_key: String. Session identifier.
+            since: Integer. Only return the rows of the report from this
+                position on. See #LocalStorage.get_report.
 
         # Returns
-            Pandas DataFrame: Report.
+            Pandas DataFrame: Report. If the service has been created with a
+                `downsample` factor or a `resolution`, the `resolution`
+                column has the resolution evaluated (see
+                #Davis.resolution_tag).
         """
-        return self.storage.get_report(**kwargs)
+        report = self.storage.get_report(**kwargs)
+        if self._tag_reports:
+            # The report may be a slice of the one stored
+            report = report.copy()
+            report['resolution'] = self.resolution
+        return report
+
+    def restore_report(self, report):
+        """ Restore the results of a previous evaluation on the storage.
+
+        # Arguments
+            report: Pandas DataFrame. Report with the results to restore.
+        """
+        self.storage.restore_report(report)
+
+    def finish_session(self, session_key):
+        """ Release the resources of a finished session.
+
+        The storage may move the results of the session out of memory, but
+        they are still available with #EvaluationService.get_report.
+
+        # Arguments
+            session_key: String. Session identifier.
+        """
+        with self._session_locks_lock:
+            self._session_locks.pop(session_key, None)
+        self.storage.finish_session(session_key)
 
     def summarize_report(self, df):
         """ Given a report it will reconstruct the missing entries and compute
@@ -282,8 +548,77 @@ class EvaluationService:
             df: Pandas DataFrame. The report to summarize.
 
         # Returns
-            Dictionary: with different scores computed and the curve values
+            Dictionary: with different scores computed, the curve values and
+                the resolution evaluated.
+
+        # Raises
+            ValueError: if the report has results of several resolutions.
+        """
+        summary = self.summarize_report_multi(
+            df,
+            metrics=[self.metric_to_optimize],
+            time_thresholds=[self.time_threshold])
+        return {
+            'resolution': summary['resolution'],
+            'auc': summary['auc'][self.metric_to_optimize],
+            'metric_at_threshold': {
+                'threshold': self.time_threshold,
+                self.metric_to_optimize:
+                    summary['metric_at_threshold'][self.metric_to_optimize][0]
+            },
+            'curve': {
+                'time': summary['curve']['time'],
+                self.metric_to_optimize:
+                    summary['curve'][self.metric_to_optimize]
+            }
+        }
+
+    def summarize_report_multi(self, df, metrics=None, time_thresholds=None):
+        """ Summarize a report for several metrics and time thresholds.
+
+        The report is reconstructed only once and the curve, the AUC and the
+        value at every threshold are computed for all the metrics.
+        #EvaluationService.summarize_report returns the values for
+        `metric_to_optimize` and `time_threshold` of this summary.
+
+        # Arguments
+            df: Pandas DataFrame. The report to summarize.
+            metrics: List of Strings. Metrics to summarize: `J`, `F` and/or
+                `J_AND_F`. By default all of them.
+            time_thresholds: List of Integers. Times in seconds to compute the
+                metrics at. By default only `time_threshold`.
+
+        # Returns
+            Dictionary: with the `curve` (the `time` and the values of every
+                metric), the `auc` of every metric and the
+                `metric_at_threshold`, with the list of `thresholds` and the
+                list of values at them for every metric. The `resolution` is
+                the one of the report if it has the `resolution` column,
+                otherwise the one of the service.
+
+        # Raises
+            ValueError: if any metric is not valid or the report has results
+                of several resolutions.
         """
+        metrics = list(metrics or self._AVAILABLE_METRICS)
+        for m in metrics:
+            if m not in self._AVAILABLE_METRICS:
+                raise ValueError('Invalid metric: {}'.format(m))
+        time_thresholds = list(time_thresholds or [self.time_threshold])
+
+        resolution = self.resolution
+        if 'resolution' in df:
+            resolutions = df['resolution'].unique()
+            if len(resolutions) > 1:
+                raise ValueError('The report has results of several '
+                                 'resolutions: {}'.format(list(resolutions)))
+            if len(resolutions) == 1:
+                resolution = resolutions[0]
+            df = df.drop(columns='resolution')
+        if 'frame' in df:
+            df = df.drop(columns='frame')
+        if 'session_id' in df:
+            df = df.drop(columns='session_id')
         if len(df) == 0:
             df = df.set_index(
                 ['interaction', 'sequence', 'scribble_idx', 'object_id'])
@@ -291,10 +626,6 @@ class EvaluationService:
             df = df.groupby(
                 ['interaction', 'sequence', 'scribble_idx',
                  'object_id']).mean()
-        if 'frame' in df:
-            df = df.drop(columns='frame')
-        if 'session_id' in df:
-            df = df.drop(columns='session_id')
 
         dfr = self._reconstruct_report(df)
         df_average = dfr.groupby(['interaction']).mean()
@@ -311,17 +642,6 @@ class EvaluationService:
         df_time.loc[0] = [0]
         df_time = df_time.sort_index()
 
-        time = df_time['timing'].values
-        if self.metric_to_optimize == 'J':
-            metric = df_average['jaccard'].values
-        elif self.metric_to_optimize == 'F':
-            metric = df_average['contour'].values
-        elif self.metric_to_optimize == 'J_AND_F':
-            metric = df_average['j_and_f'].values
-        else:
-            raise ValueError('Invalid metric_to_optimize: {}'.format(
-                self.metric_to_optimize))
-
         if self.max_t:
             global_timeout = self.avg_nb_objects * self.max_t
         else:
@@ -329,28 +649,33 @@ class EvaluationService:
             )['interaction'].max()
             global_timeout = max_interactions * df['timing'].max()
 
+        time = df_time['timing'].values
         time = np.concatenate((time, [global_timeout]))
-        metric = np.concatenate((metric, metric[-1:]))
-
-        metric_th = np.interp(self.time_threshold, time, metric)
-        if time.max() == 0.:
-            auc = 0.
-        else:
-            auc = np.trapz(metric, x=time) / time.max()
 
-        return {
-            'auc': auc,
+        summary = {
+            'resolution': resolution,
+            'auc': {},
             'metric_at_threshold': {
-                'threshold': self.time_threshold,
-                # 'metric': metric_th
-                self.metric_to_optimize: metric_th
+                'thresholds': time_thresholds
             },
             'curve': {
-                'time': time.tolist(),
-                # 'metric': metric.tolist()
-                self.metric_to_optimize: metric.tolist()
-            }
+                'time': time.tolist()
+            },
         }
+        for m in metrics:
+            metric = df_average[self._METRIC_COLUMNS[m]].values
+            metric = np.concatenate((metric, metric[-1:]))
+
+            if time.max() == 0.:
+                auc = 0.
+            else:
+                auc = np.trapz(metric, x=time) / time.max()
+            summary['auc'][m] = auc
+            summary['metric_at_threshold'][m] = [
+                np.interp(th, time, metric) for th in time_thresholds
+            ]
+            summary['curve'][m] = metric.tolist()
+        return summary
 
     def _reconstruct_report(self, df):
         """ Reconstruct the report with missing entries.
@@ -360,34 +685,41 @@ class EvaluationService:
         interaction putting the jaccard of the previous evaluated interaction
         with a timing cost of 0.
         """
-        index = []
         max_i = self.max_i or df.reset_index()['interaction'].max()
         if np.isnan(max_i):
             max_i = 1
-        for i in range(max_i):
-            for seq in self.sequences:
-                nb_scribbles = Davis.dataset[seq]['num_scribbles']
-                nb_objects = Davis.dataset[seq]['num_objects']
-                for j in range(nb_scribbles):
-                    for k in range(nb_objects):
-                        index.append((i + 1, seq, j + 1, k + 1))
-
-        index = pd.MultiIndex.from_tuples(
-            index,
-            names=['interaction', 'sequence', 'scribble_idx', 'object_id'])
-        df = df.reindex(index)
+        max_i = int(max_i)
 
+        sequences, scribbles, objects = [], [], []
         for seq in self.sequences:
             nb_scribbles = Davis.dataset[seq]['num_scribbles']
             nb_objects = Davis.dataset[seq]['num_objects']
+            sequences.append(np.full(nb_scribbles * nb_objects, seq,
+                                     dtype=object))
+            scribbles.append(
+                np.repeat(np.arange(1, nb_scribbles + 1), nb_objects))
+            objects.append(np.tile(np.arange(1, nb_objects + 1), nb_scribbles))
+        nb_entries = sum(len(s) for s in sequences)
+
+        index = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(np.arange(1, max_i + 1), nb_entries),
+                np.tile(np.concatenate(sequences), max_i),
+                np.tile(np.concatenate(scribbles), max_i),
+                np.tile(np.concatenate(objects), max_i),
+            ],
+            names=['interaction', 'sequence', 'scribble_idx', 'object_id'])
+        df = df.reindex(index)
 
-            for scribble_idx in range(1, nb_scribbles + 1):
-                prev_result = np.zeros((nb_objects, 4), dtype=np.float)
-                for it in range(1, max_i + 1):
-                    result_iter = df.loc[it, seq, scribble_idx, :]
-                    if np.any(pd.isna(result_iter)):
-                        prev_result[:, -1] = 0
-                        df.loc[it, seq, scribble_idx, :] = prev_result
-                    else:
-                        prev_result = result_iter.values
+        # An interaction of a sample is missing if any of its objects is
+        # missing, in which case the results of all the objects are taken from
+        # the last interaction evaluated (or 0 if none has been evaluated)
+        sample_levels = ['sequence', 'scribble_idx', 'interaction']
+        missing = df.isna().any(axis=1).groupby(
+            level=sample_levels, sort=False).transform('any')
+        df.loc[missing.values, :] = np.nan
+        df = df.groupby(
+            level=['sequence', 'scribble_idx', 'object_id'],
+            sort=False).ffill().fillna(0)
+        df.loc[missing.values, 'timing'] = 0
         return df
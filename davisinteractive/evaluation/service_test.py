@@ -1,11 +1,67 @@
+import tempfile
 import unittest
 
+import numpy as np
 import pandas as pd
 
 from davisinteractive.common import Path, patch
 from davisinteractive.dataset import Davis
+from davisinteractive.dataset.gt_cache import compute_derived_annotations
 from davisinteractive.evaluation import EvaluationService
 from davisinteractive.utils.scribbles import annotated_frames, is_empty
+from PIL import Image
+
+
+def _reconstruct_report_loop(service, df, max_i):
+    """ Reference implementation of the report reconstruction. """
+    index = []
+    for i in range(max_i):
+        for seq in service.sequences:
+            nb_scribbles = Davis.dataset[seq]['num_scribbles']
+            nb_objects = Davis.dataset[seq]['num_objects']
+            for j in range(nb_scribbles):
+                for k in range(nb_objects):
+                    index.append((i + 1, seq, j + 1, k + 1))
+    index = pd.MultiIndex.from_tuples(
+        index, names=['interaction', 'sequence', 'scribble_idx', 'object_id'])
+    df = df.reindex(index)
+
+    for seq in service.sequences:
+        nb_scribbles = Davis.dataset[seq]['num_scribbles']
+        nb_objects = Davis.dataset[seq]['num_objects']
+        for scribble_idx in range(1, nb_scribbles + 1):
+            prev_result = np.zeros((nb_objects, 4), dtype=np.float)
+            for it in range(1, max_i + 1):
+                result_iter = df.loc[it, seq, scribble_idx, :]
+                if np.any(pd.isna(result_iter)):
+                    prev_result[:, -1] = 0
+                    df.loc[it, seq, scribble_idx, :] = prev_result
+                else:
+                    prev_result = result_iter.values
+    return df
+
+
+def _synthetic_report(service, max_i, seed=0):
+    """ Report where some samples time out before the last interactions. """
+    rng = np.random.RandomState(seed)
+    rows = []
+    for seq in service.sequences:
+        nb_scribbles = Davis.dataset[seq]['num_scribbles']
+        nb_objects = Davis.dataset[seq]['num_objects']
+        for scribble_idx in range(1, nb_scribbles + 1):
+            nb_interactions = rng.randint(max_i + 1)
+            for it in range(1, nb_interactions + 1):
+                for obj_id in range(1, nb_objects + 1):
+                    jaccard, contour = rng.rand(2)
+                    rows.append((it, seq, scribble_idx, obj_id, jaccard,
+                                 contour, (jaccard + contour) / 2,
+                                 rng.rand() * 10))
+    return pd.DataFrame(
+        rows,
+        columns=[
+            'interaction', 'sequence', 'scribble_idx', 'object_id', 'jaccard',
+            'contour', 'j_and_f', 'timing'
+        ])
 
 
 class TestEvaluationService(unittest.TestCase):
@@ -40,6 +96,20 @@ class TestEvaluationService(unittest.TestCase):
             for i in range(nb_scribbles):
                 assert (seq, i + 1) in samples
 
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_robot_parameters(self, _):
+        service = EvaluationService('val', davis_root='/tmp/DAVIS')
+        assert service.robot.kernel_size == .2
+        assert service.robot.path_tolerance is None
+
+        service = EvaluationService(
+            'val',
+            davis_root='/tmp/DAVIS',
+            robot_parameters={'path_tolerance': 1.})
+        assert service.robot.kernel_size == .2
+        assert service.robot.nb_points == 1000
+        assert service.robot.path_tolerance == 1.
+
     @patch.object(Davis, 'check_files', return_value=True)
     def test_num_entries(self, mock_davis):
         assert mock_davis.call_count == 0
@@ -81,3 +151,230 @@ class TestEvaluationService(unittest.TestCase):
                                          None)
         with self.assertRaises(ValueError):
             service.post_predicted_masks('bear', 4, None, 0, 1, None, None)
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_prefetch_annotations(self, _):
+        dataset_dir = Path(__file__).parent.parent.joinpath(
+            'dataset', 'test_data', 'DAVIS')
+
+        annotations = np.zeros((1, 480, 854), dtype=np.uint8)
+        service = EvaluationService(
+            'train',
+            davis_root=dataset_dir,
+            annotations_cache_bytes=2 * annotations.nbytes)
+        with self.assertRaises(ValueError):
+            service.prefetch_annotations('novalidsequence')
+
+        with patch.object(
+                Davis, 'load_annotations',
+                return_value=annotations) as mock_load:
+            service.prefetch_annotations('bear')
+            service.prefetch_annotations('bear')
+            assert mock_load.call_count == 1
+            assert service._load_annotations('bear') is annotations
+            assert mock_load.call_count == 1
+            service.prefetch_annotations('boat')
+            service.prefetch_annotations('bus')
+            assert service.annotations_cache.keys() == ['boat', 'bus']
+            service.prefetch_annotations('bear')
+            assert mock_load.call_count == 4
+            mock_load.assert_called_with('bear', dtype=np.uint8, downsample=1)
+
+        stats = service.annotations_cache.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 4
+        assert stats['evictions'] == 2
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_gt_cache(self, _):
+        annotations = np.zeros((2, 480, 854), dtype=np.uint8)
+        annotations[:, 100:300, 200:500] = 1
+        gt_cache = dict(
+            compute_derived_annotations(annotations, 1),
+            annotations=annotations)
+        pred_masks = np.zeros((2, 480, 854), dtype=np.uint8)
+        pred_masks[:, 120:310, 210:480] = 1
+
+        reports = []
+        for use_gt_cache in (True, False):
+            service = EvaluationService(
+                'train', davis_root='/tmp/DAVIS', use_gt_cache=use_gt_cache)
+            with patch.object(Davis, 'load_cache', return_value=gt_cache), \
+                    patch.object(Davis, 'load_annotations',
+                                 return_value=annotations) as mock_load:
+                service.post_predicted_masks('bear', 1, pred_masks, 0, 1,
+                                             'user', 'session')
+                assert mock_load.call_count == int(not use_gt_cache)
+            _, boundaries = service.annotations_cache.peek('bear')
+            assert (boundaries is not None) == use_gt_cache
+            reports.append(service.storage.get_report())
+        pd.testing.assert_frame_equal(reports[0][['jaccard', 'contour']],
+                                      reports[1][['jaccard', 'contour']])
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_reconstruct_report(self, _):
+        max_i = 4
+        service = EvaluationService(
+            'train', davis_root='/tmp/DAVIS', max_i=max_i)
+        df = _synthetic_report(service, max_i)
+        # A sample with only some of the objects of an interaction
+        multi_object = [
+            s for s in service.sequences if Davis.dataset[s]['num_objects'] > 1
+        ][0]
+        df = df.loc[~((df.sequence == multi_object) & (df.interaction == 2) &
+                      (df.object_id == 1))]
+        df = df.set_index(
+            ['interaction', 'sequence', 'scribble_idx', 'object_id'])
+
+        expected = _reconstruct_report_loop(service, df.copy(), max_i)
+        result = service._reconstruct_report(df.copy())
+        pd.testing.assert_frame_equal(result, expected)
+
+        summary = service.summarize_report(df.reset_index())
+        assert len(summary['curve']['time']) == max_i + 2
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_summarize_report_multi(self, _):
+        service = EvaluationService('train', davis_root='/tmp/DAVIS', max_i=4)
+        df = _synthetic_report(service, 4)
+        thresholds = [10, 20, 60]
+        summary = service.summarize_report_multi(
+            df, time_thresholds=thresholds)
+
+        assert sorted(summary['auc']) == ['F', 'J', 'J_AND_F']
+        assert summary['metric_at_threshold']['thresholds'] == thresholds
+        for metric in ('J', 'F', 'J_AND_F'):
+            assert len(summary['metric_at_threshold'][metric]) == 3
+            assert len(summary['curve'][metric]) == len(
+                summary['curve']['time'])
+
+            # The single metric summary is a projection of it
+            service_metric = EvaluationService(
+                'train',
+                davis_root='/tmp/DAVIS',
+                max_i=4,
+                metric_to_optimize=metric,
+                time_threshold=20)
+            single = service_metric.summarize_report(df)
+            assert single['auc'] == summary['auc'][metric]
+            assert single['metric_at_threshold'] == {
+                'threshold': 20,
+                metric: summary['metric_at_threshold'][metric][1]
+            }
+            assert single['curve'] == {
+                'time': summary['curve']['time'],
+                metric: summary['curve'][metric]
+            }
+
+        summary = service.summarize_report_multi(df, metrics=['J'])
+        assert list(summary['auc']) == ['J']
+        assert summary['metric_at_threshold']['thresholds'] == [60]
+        with self.assertRaises(ValueError):
+            service.summarize_report_multi(df, metrics=['X'])
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_downsample(self, _):
+        with self.assertRaises(ValueError):
+            EvaluationService('train', davis_root='/tmp/DAVIS', downsample=0)
+        with self.assertRaises(ValueError):
+            EvaluationService('train', davis_root='/tmp/DAVIS', downsample=1.5)
+
+        dataset_dir = Path(__file__).parent.parent.joinpath(
+            'session', 'test_data', 'DAVIS')
+        service = EvaluationService(
+            'train',
+            davis_root=dataset_dir,
+            downsample=2,
+            robot_parameters={'path_tolerance': 1.})
+        assert service.resolution == '240p'
+        assert service.robot.max_kernel_radius == 8
+        assert service.robot.min_nb_nodes == 2
+        assert service.robot.path_tolerance == .5
+
+        pred_masks = np.zeros((2, 480, 854), dtype=np.uint8)
+        pred_masks[:, 100:300, 200:500] = 1
+        with patch.dict(Davis.dataset['bear'], {'num_frames': 2}):
+            gt_masks = service._load_annotations('bear')
+            assert gt_masks.shape == (2, 240, 427)
+            scribble = service.post_predicted_masks(
+                'bear', 1, pred_masks, 0, 1, 'user', 'session1')
+            # The masks can also be given at the reduced resolution
+            service.post_predicted_masks('bear', 1, pred_masks[:, ::2, ::2],
+                                         0, 1, 'user', 'session2')
+
+        assert len(scribble['scribbles']) == 2
+        for frame in scribble['scribbles']:
+            for path in frame:
+                assert np.all((np.asarray(path['path']) >= 0) &
+                              (np.asarray(path['path']) <= 1))
+        reports = [
+            service.get_report(session_id=s)
+            for s in ('session1', 'session2')
+        ]
+        assert len(reports[0]) == 2
+        assert reports[0].jaccard.tolist() == reports[1].jaccard.tolist()
+        assert reports[0].jaccard.min() > 0
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_chunked(self, _):
+        dataset_dir = Path(__file__).parent.parent.joinpath(
+            'session', 'test_data', 'DAVIS')
+        service = EvaluationService('train', davis_root=dataset_dir)
+        chunked = EvaluationService(
+            'train', davis_root=dataset_dir, chunk_size=1, tile_size=100)
+        assert service.chunk_size is None and service.tile_size is None
+
+        pred_masks = np.zeros((2, 480, 854), dtype=np.uint8)
+        pred_masks[:, 100:300, 200:500] = 1
+        pred_masks[1, 50:150, 50:250] = 2
+        with patch.dict(Davis.dataset['bear'], {'num_frames': 2}):
+            service.post_predicted_masks('bear', 1, pred_masks, 0, 1, 'user',
+                                         'session')
+            with patch.object(chunked, '_load_annotations') as load:
+                scribble = chunked.post_predicted_masks(
+                    'bear', 1, pred_masks, 0, 1, 'user', 'session')
+                load.assert_not_called()
+
+        assert len(scribble['scribbles']) == 2
+        assert len(annotated_frames(scribble)) == 1
+        for frame in scribble['scribbles']:
+            for path in frame:
+                assert np.all((np.asarray(path['path']) >= 0) &
+                              (np.asarray(path['path']) <= 1))
+        expected = service.get_report(session_id='session')
+        report = chunked.get_report(session_id='session')
+        for c in ('frame', 'object_id', 'jaccard', 'contour'):
+            assert report[c].tolist() == expected[c].tolist()
+        assert (service.storage.annotated_frames.frame.tolist() ==
+                chunked.storage.annotated_frames.frame.tolist())
+
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_full_resolution(self, _):
+        davis_root = tempfile.mkdtemp()
+        root = Path(davis_root).joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                         'Full-Resolution', 'bear')
+        root.mkdir(parents=True)
+        annotations = np.zeros((3, 200, 300), dtype=np.uint8)
+        annotations[:, 50:150, 100:200] = 1
+        for f, ann in enumerate(annotations):
+            Image.fromarray(ann).save(str(root / '{:05d}.png'.format(f)))
+
+        service = EvaluationService(
+            'train', davis_root=davis_root, resolution='Full-Resolution')
+        assert service.resolution == 'Full-Resolution'
+        assert service.chunk_size == 8
+        assert service.tile_size == 1024
+
+        pred_masks = np.zeros_like(annotations)
+        pred_masks[:, 50:150, 100:150] = 1
+        with patch.dict(Davis.dataset['bear'], {'num_frames': 3}):
+            scribble = service.post_predicted_masks('bear', 1, pred_masks, 0,
+                                                    1, 'user', 'session')
+        report = service.get_report(session_id='session')
+        assert len(report) == 3
+        assert np.allclose(report.jaccard, .5)
+        frame = annotated_frames(scribble)[0]
+        for path in scribble['scribbles'][frame]:
+            x, y = np.asarray(path['path']).T
+            assert np.all((x >= .5) & (x <= 2 / 3))
+            assert np.all((y >= .25) & (y <= .75))
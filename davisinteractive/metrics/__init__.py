@@ -1,3 +1,3 @@
 from __future__ import absolute_import
 
-from .jaccard import batched_f_measure, batched_jaccard
+from .jaccard import batched_f_measure, batched_jaccard, tiled_f_measure
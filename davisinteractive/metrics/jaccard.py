@@ -4,7 +4,16 @@ import cv2
 import numpy as np
 from skimage.morphology import disk
 
-__all__ = ['batched_jaccard', 'batched_f_measure']
+__all__ = ['batched_jaccard', 'batched_f_measure', 'tiled_f_measure']
+
+
+def _as_labels(y):
+    """ Masks as an integer array, copying them only if they are not
+    integers so big volumes are not converted to `np.int`. """
+    y = np.asarray(y)
+    if not np.issubdtype(y.dtype, np.integer):
+        y = y.astype(np.int)
+    return y
 
 
 def batched_jaccard(y_true, y_pred, average_over_objects=True, nb_objects=None):
@@ -33,8 +42,8 @@ def batched_jaccard(y_true, y_pred, average_over_objects=True, nb_objects=None):
             `average_over_objects=False` returns an array of shape (B x nObj)
             with nObj being the number of objects on `y_true`.
     """
-    y_true = np.asarray(y_true, dtype=np.int)
-    y_pred = np.asarray(y_pred, dtype=np.int)
+    y_true = _as_labels(y_true)
+    y_pred = _as_labels(y_pred)
     if y_true.ndim != 3:
         raise ValueError('y_true array must have 3 dimensions.')
     if y_pred.ndim != 3:
@@ -133,7 +142,7 @@ def _seg2bmap(seg, width=None, height=None):
     return bmap
 
 
-def f_measure(true_mask, pred_mask, bound_th=0.008):
+def f_measure(true_mask, pred_mask, bound_th=0.008, true_boundary=None):
     """F-measure for two 2D masks.
 
     # Arguments
@@ -143,6 +152,8 @@ def f_measure(true_mask, pred_mask, bound_th=0.008):
             predicted mask.
         bound_th: Float. Optional parameter to compute the F-measure. Default is
             0.008.
+        true_boundary: Numpy Array. Precomputed boundary map of `true_mask`
+            with shape (H x W). If `None` it is computed from `true_mask`.
 
     # Returns
         float: F-measure.
@@ -156,7 +167,10 @@ def f_measure(true_mask, pred_mask, bound_th=0.008):
         bound_th * np.linalg.norm(true_mask.shape)))
 
     fg_boundary = _seg2bmap(pred_mask)
-    gt_boundary = _seg2bmap(true_mask)
+    if true_boundary is None:
+        gt_boundary = _seg2bmap(true_mask)
+    else:
+        gt_boundary = np.asarray(true_boundary, dtype=np.bool)
 
     fg_dil = cv2.dilate(
         fg_boundary.astype(np.uint8),
@@ -173,6 +187,13 @@ def f_measure(true_mask, pred_mask, bound_th=0.008):
     n_fg = np.sum(fg_boundary)
     n_gt = np.sum(gt_boundary)
 
+    return _f_measure_from_counts(n_fg, n_gt, np.sum(fg_match),
+                                  np.sum(gt_match))
+
+
+def _f_measure_from_counts(n_fg, n_gt, n_fg_match, n_gt_match):
+    """ F-measure given the number of boundary pixels of the prediction and
+    the ground truth and how many of them are matched. """
     # Compute precision and recall
     if n_fg == 0 and n_gt > 0:
         precision = 1
@@ -184,8 +205,8 @@ def f_measure(true_mask, pred_mask, bound_th=0.008):
         precision = 1
         recall = 1
     else:
-        precision = np.sum(fg_match) / float(n_fg)
-        recall = np.sum(gt_match) / float(n_gt)
+        precision = n_fg_match / float(n_fg)
+        recall = n_gt_match / float(n_gt)
 
     # Compute F measure
     if precision + recall == 0:
@@ -196,11 +217,70 @@ def f_measure(true_mask, pred_mask, bound_th=0.008):
     return F
 
 
+def tiled_f_measure(true_mask, pred_mask, bound_th=0.008, tile_size=1024):
+    """ F-measure for two 2D masks computed tile by tile.
+
+    It gives the same result as #f_measure, but the boundary maps and their
+    dilations are only computed for one tile at a time, so the memory needed
+    is bounded by the size of the tiles instead of the size of the frame.
+    Every tile is extended with a margin of `bound_th` pixels plus one, which
+    is enough for the boundaries and the matches of the pixels of the tile to
+    be the same as on the whole frame.
+
+    # Arguments
+        true_mask: Numpy Array, Binary array of shape (H x W) representing the
+            ground truth mask.
+        pred_mask: Numpy Array. Binary array of shape (H x W) representing the
+            predicted mask.
+        bound_th: Float. Optional parameter to compute the F-measure. Default is
+            0.008. When it is a fraction, it is relative to the diagonal of
+            the whole frame.
+        tile_size: Integer. Size in pixels of the side of the tiles.
+
+    # Returns
+        float: F-measure.
+    """
+    assert true_mask.shape == pred_mask.shape
+    h, w = true_mask.shape
+
+    bound_pix = bound_th if bound_th >= 1 else (np.ceil(
+        bound_th * np.linalg.norm(true_mask.shape)))
+    kernel = disk(bound_pix).astype(np.uint8)
+    margin = int(np.ceil(bound_pix)) + 1
+
+    n_fg, n_gt, n_fg_match, n_gt_match = 0, 0, 0, 0
+    for y0 in range(0, h, tile_size):
+        for x0 in range(0, w, tile_size):
+            y1, x1 = min(y0 + tile_size, h), min(x0 + tile_size, w)
+            ty0, tx0 = max(y0 - margin, 0), max(x0 - margin, 0)
+            ty1, tx1 = min(y1 + margin, h), min(x1 + margin, w)
+
+            true_tile = np.asarray(true_mask[ty0:ty1, tx0:tx1], dtype=np.bool)
+            pred_tile = np.asarray(pred_mask[ty0:ty1, tx0:tx1], dtype=np.bool)
+            fg_boundary = _seg2bmap(pred_tile)
+            gt_boundary = _seg2bmap(true_tile)
+            fg_dil = cv2.dilate(fg_boundary.astype(np.uint8), kernel)
+            gt_dil = cv2.dilate(gt_boundary.astype(np.uint8), kernel)
+
+            # Only the pixels of the tile are counted, the ones on the margin
+            # are counted by the neighbouring tiles
+            core = (slice(y0 - ty0, y1 - ty0), slice(x0 - tx0, x1 - tx0))
+            fg_boundary, gt_boundary = fg_boundary[core], gt_boundary[core]
+            n_fg += np.sum(fg_boundary)
+            n_gt += np.sum(gt_boundary)
+            n_fg_match += np.sum(fg_boundary * gt_dil[core])
+            n_gt_match += np.sum(gt_boundary * fg_dil[core])
+
+    return _f_measure_from_counts(n_fg, n_gt, n_fg_match, n_gt_match)
+
+
 def batched_f_measure(y_true,
                       y_pred,
                       average_over_objects=True,
                       nb_objects=None,
-                      bound_th=0.008):
+                      bound_th=0.008,
+                      gt_boundaries=None,
+                      tile_size=None):
     """ Batch F-measure for multiple instance segmentation.
 
     # Arguments
@@ -214,6 +294,17 @@ def batched_f_measure(y_true,
         nb_objects: Integer. Number of objects in the ground truth mask. If
             `None` the value will be infered from `y_true`. Setting this value
             will speed up the computation.
+        gt_boundaries: Numpy Array. Precomputed boundary maps of the objects
+            of `y_true` packed as bits along the last axis, with shape
+            (B x nObj x H x ceil(W / 8)), as stored by the ground truth cache
+            (see #davisinteractive.dataset.gt_cache). Only the map of the
+            frame and object being evaluated is unpacked. It requires
+            `nb_objects` to be given. If `None` they are computed from
+            `y_true`.
+        tile_size: Integer. If given, the F-measure of every frame is computed
+            by tiles of this size (see #tiled_f_measure) to bound the memory
+            used with high resolution frames. It is ignored if
+            `gt_boundaries` are given.
 
     # Returns
         ndarray: Returns an array of shape (B) with the average F-measure for
@@ -221,8 +312,8 @@ def batched_f_measure(y_true,
             `average_over_objects=False` returns an array of shape (B x nObj)
             with nObj being the number of objects on `y_true`.
     """
-    y_true = np.asarray(y_true, dtype=np.int)
-    y_pred = np.asarray(y_pred, dtype=np.int)
+    y_true = _as_labels(y_true)
+    y_pred = _as_labels(y_pred)
     if y_true.ndim != 3:
         raise ValueError('y_true array must have 3 dimensions.')
     if y_pred.ndim != 3:
@@ -238,7 +329,7 @@ def batched_f_measure(y_true,
         objects_ids = np.asarray(objects_ids, dtype=np.int)
     if nb_objects == 0:
         raise ValueError('Number of objects in y_true should be higher than 0.')
-    nb_frames = len(y_true)
+    nb_frames, _, width = y_true.shape
 
     f_measure_result = np.empty((nb_frames, nb_objects), dtype=np.float)
 
@@ -246,8 +337,19 @@ def batched_f_measure(y_true,
         for frame_id in range(nb_frames):
             gt_mask = y_true[frame_id, :, :] == obj_id
             pred_mask = y_pred[frame_id, :, :] == obj_id
+            if tile_size is not None and gt_boundaries is None:
+                f_measure_result[frame_id, i] = tiled_f_measure(
+                    gt_mask, pred_mask, bound_th=bound_th, tile_size=tile_size)
+                continue
+            true_boundary = None
+            if gt_boundaries is not None:
+                true_boundary = np.unpackbits(
+                    gt_boundaries[frame_id, i], axis=-1)[:, :width]
             f_measure_result[frame_id, i] = f_measure(
-                gt_mask, pred_mask, bound_th=bound_th)
+                gt_mask,
+                pred_mask,
+                bound_th=bound_th,
+                true_boundary=true_boundary)
 
     if average_over_objects:
         f_measure_result = f_measure_result.mean(axis=1)
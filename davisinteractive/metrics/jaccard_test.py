@@ -3,7 +3,7 @@ from __future__ import absolute_import, division
 import numpy as np
 import pytest
 
-from .jaccard import batched_f_measure, batched_jaccard
+from .jaccard import batched_f_measure, batched_jaccard, tiled_f_measure
 
 
 class TestJaccard:
@@ -104,3 +104,27 @@ class TestFMeasure:
         assert np.all(f_measure_objects[frame, :] == 1.)
         assert not np.any(np.isnan(f_measure_objects))
         assert np.isnan(f_measure_objects).sum() == 0
+
+    @pytest.mark.parametrize('tile_size,bound_th', [(16, .008), (33, .008),
+                                                     (50, .03), (64, 3)])
+    def test_tiled_f_measure(self, tile_size, bound_th):
+        height, width = 100, 150
+        y, x = np.mgrid[:height, :width]
+        y_true = np.zeros((2, height, width), dtype=np.uint8)
+        y_true[:, (y - 40)**2 + (x - 60)**2 < 30**2] = 1
+        y_true[:, 70:95, 90:140] = 2
+        y_pred = np.roll(y_true, (3, -2), axis=(1, 2))
+        y_pred[1, (y - 20)**2 + (x - 120)**2 < 10**2] = 1
+
+        expected = batched_f_measure(
+            y_true, y_pred, average_over_objects=False, bound_th=bound_th)
+        result = batched_f_measure(
+            y_true,
+            y_pred,
+            average_over_objects=False,
+            bound_th=bound_th,
+            tile_size=tile_size)
+        assert np.all(result == expected)
+        assert tiled_f_measure(
+            y_true[1] == 1, y_pred[1] == 1, bound_th,
+            tile_size) == expected[1, 0]
@@ -0,0 +1,305 @@
+""" Bulk generation of initial scribbles for new datasets.
+
+The evaluation starts every sample from a set of scribbles annotated by a
+human. For datasets without them, this module generates initial scribbles with
+the `InteractiveScribblesRobot` simulating the first interaction over an empty
+prediction, and stores them with the same layout as the DAVIS scribbles:
+`<davis_root>/Scribbles/<sequence>/<scribble_idx>.json`.
+
+It can also be run from the command line:
+
+```bash
+python -m davisinteractive.robot.initial_scribbles --davis-root path/to/DAVIS \\
+    --nb-scribbles 3 --processes 8
+```
+"""
+from __future__ import absolute_import, division
+
+import argparse
+import json
+import multiprocessing
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from .. import logging
+from ..common import Path
+from ..dataset import Davis
+from ..evaluation.service import ROBOT_DEFAULT_PARAMETERS
+from ..utils.scribbles import annotated_frames
+from .interactive_robot import InteractiveScribblesRobot
+
+__all__ = ['generate_initial_scribbles']
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def _load_sequence_annotations(annotations_dir):
+    """ Load all the annotations found on a sequence directory.
+
+    # Arguments
+        annotations_dir: Path. Directory with the PNG annotations of the
+            sequence, one per frame.
+
+    # Returns
+        Numpy Array: Array with the annotations with shape (B x H x W).
+    """
+    frames = sorted(annotations_dir.glob('*.png'))
+    if not frames:
+        raise ValueError('No annotations found at {}'.format(annotations_dir))
+    annotations = [np.asarray(Image.open(str(f))) for f in frames]
+    return np.stack(annotations).astype(np.uint8)
+
+
+def _select_frames(annotations, nb_objects, nb_scribbles, random_state):
+    """ Select the frames to annotate for every initial scribble.
+
+    The candidates are the frames where the highest number of objects is
+    visible. Among them, `nb_scribbles` distinct frames are randomly chosen
+    (frames are repeated only if there are not enough candidates).
+    """
+    obj_ids = np.arange(1, nb_objects + 1).reshape(1, -1, 1, 1)
+    visible = (annotations[:, None] == obj_ids).any(axis=(2, 3))
+    nb_visible = visible.sum(axis=1)
+    candidates = np.flatnonzero(nb_visible == nb_visible.max())
+
+    nb_selected = min(nb_scribbles, len(candidates))
+    frames = random_state.choice(candidates, nb_selected, replace=False)
+    frames = frames.tolist()
+    while len(frames) < nb_scribbles:
+        frames.append(int(random_state.choice(candidates)))
+    return frames
+
+
+def _generate_sequence_scribbles(args):
+    """ Generate and store the initial scribbles for a single sequence.
+
+    This function runs in a worker process, so it receives all its arguments
+    in a single tuple and returns the manifest entry of the sequence. The
+    frame recorded for a scribble file kept because of `overwrite=False` is
+    the one annotated on the file.
+    """
+    (davis_root, sequence, nb_scribbles, robot_parameters, seed,
+     overwrite) = args
+    start_time = time.time()
+
+    davis_root = Path(davis_root)
+    annotations_dir = davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                          Davis.RESOLUTION, sequence)
+    scribbles_dir = davis_root.joinpath(Davis.SCRIBBLES_SUBDIR, sequence)
+
+    annotations = _load_sequence_annotations(annotations_dir)
+    nb_frames, h, w = annotations.shape
+    obj_ids = np.unique(annotations)
+    nb_objects = int(obj_ids[(obj_ids > 0) & (obj_ids < 255)].max(initial=0))
+
+    entry = {
+        'name': sequence,
+        'num_frames': nb_frames,
+        'num_objects': nb_objects,
+        'num_scribbles': nb_scribbles,
+        'image_size': [w, h],
+        'robot_parameters': robot_parameters,
+        'seed': seed,
+        'frames': []
+    }
+    if nb_objects == 0:
+        logging.warning(
+            'Sequence {} has no objects. Skip sequence.'.format(sequence))
+        entry['num_scribbles'] = 0
+        return entry
+
+    # Seed per sequence so the result does not depend on the scheduling
+    sequence_seed = (seed + zlib.crc32(sequence.encode())) % 2**32
+    random_state = np.random.RandomState(sequence_seed)
+
+    robot = InteractiveScribblesRobot(**robot_parameters)
+    empty_prediction = np.zeros_like(annotations)
+    frames = _select_frames(annotations, nb_objects, nb_scribbles,
+                            random_state)
+
+    scribbles_dir.mkdir(parents=True, exist_ok=True)
+    for scribble_idx, frame in enumerate(frames, 1):
+        scribble_file = scribbles_dir / '{:03d}.json'.format(scribble_idx)
+        if scribble_file.exists() and not overwrite:
+            with scribble_file.open() as fp:
+                kept_frames = annotated_frames(json.load(fp))
+            entry['frames'].append(kept_frames[0] if kept_frames else None)
+            continue
+        entry['frames'].append(frame)
+        scribble = robot.interact(
+            sequence,
+            empty_prediction,
+            annotations,
+            nb_objects=nb_objects,
+            frame=frame)
+        with scribble_file.open('w') as fp:
+            json.dump(scribble, fp)
+
+    logging.verbose(
+        'Generated {} scribbles for sequence {} in {:.3f} s'.format(
+            nb_scribbles, sequence,
+            time.time() - start_time), 1)
+    return entry
+
+
+def _check_existing_scribbles(davis_root, manifest, sequences,
+                              robot_parameters, seed):
+    """ Check that the existing scribbles of the sequences, which are kept,
+    were generated with the same parameters. """
+    # JSON round trip to compare with the parameters read from the manifest
+    robot_parameters = json.loads(json.dumps(robot_parameters))
+    for seq in sequences:
+        entry = manifest['sequences'].get(seq)
+        if entry is None or not any(
+                davis_root.joinpath(Davis.SCRIBBLES_SUBDIR, seq).glob(
+                    '*.json')):
+            continue
+        # Manifests without parameters per sequence have them at the top
+        previous = (entry.get('robot_parameters',
+                              manifest.get('robot_parameters')),
+                    entry.get('seed', manifest.get('seed')))
+        if previous != (robot_parameters, seed):
+            raise ValueError(
+                'The scribbles of sequence {} were generated with robot '
+                'parameters {} and seed {}. Use overwrite to generate them '
+                'again.'.format(seq, *previous))
+
+
+def generate_initial_scribbles(davis_root,
+                               sequences=None,
+                               nb_scribbles=3,
+                               robot_parameters=None,
+                               processes=None,
+                               seed=0,
+                               overwrite=False):
+    """ Generate the initial scribbles for all the sequences of a dataset.
+
+    The robot is run over an empty prediction, so it generates a scribble for
+    every object on a frame where the highest number of objects is visible.
+    The scribbles are stored at `<davis_root>/Scribbles/<sequence>/` and a
+    manifest file, `<davis_root>/Scribbles/manifest.json`, is written with the
+    information of every sequence using the same fields as the DAVIS dataset
+    description, plus the frames annotated and the robot parameters and seed
+    used to generate them.
+
+    # Arguments
+        davis_root: String or Path. Path to the dataset root directory. The
+            annotations must be stored with the same layout as DAVIS:
+            `<davis_root>/Annotations/480p/<sequence>/<frame>.png`.
+        sequences: List of Strings. Sequences to generate the scribbles for.
+            By default, all the sequences found on the annotations directory.
+        nb_scribbles: Integer. Number of initial scribbles per sequence.
+        robot_parameters: Dictionary. Parameters to initialize the scribbles
+            robot. The parameters not given take the value of
+            `ROBOT_DEFAULT_PARAMETERS`, the ones of the robot of the
+            evaluation.
+        processes: Integer. Number of worker processes. By default, the number
+            of CPUs available.
+        seed: Integer. Seed to select the annotated frames.
+        overwrite: Boolean. Whether to overwrite the existing scribbles files.
+            Without it, the existing files of a sequence must have been
+            generated with the same `robot_parameters` and `seed`.
+
+    # Returns
+        Dictionary: Manifest with the information of every sequence.
+
+    # Raises
+        ValueError: if `nb_scribbles` is lower than 1, the annotations
+            directory is not found or the existing scribbles of a sequence
+            were generated with other `robot_parameters` or `seed` and
+            `overwrite` is not set.
+    """
+    if nb_scribbles < 1:
+        raise ValueError('nb_scribbles must be higher than 0.')
+    davis_root = Path(davis_root).expanduser()
+    annotations_root = davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                           Davis.RESOLUTION)
+    if not annotations_root.exists():
+        raise ValueError(
+            'Annotations directory not found: {}'.format(annotations_root))
+    if sequences is None:
+        sequences = sorted(
+            p.name for p in annotations_root.iterdir() if p.is_dir())
+    robot_parameters = dict(ROBOT_DEFAULT_PARAMETERS,
+                            **(robot_parameters or {}))
+
+    manifest_file = davis_root.joinpath(Davis.SCRIBBLES_SUBDIR,
+                                        MANIFEST_FILENAME)
+    manifest = {'sequences': {}}
+    if manifest_file.exists():
+        with manifest_file.open() as fp:
+            manifest = json.load(fp)
+    if not overwrite:
+        _check_existing_scribbles(davis_root, manifest, sequences,
+                                  robot_parameters, seed)
+
+    jobs = [(str(davis_root), seq, nb_scribbles, robot_parameters, seed,
+             overwrite) for seq in sequences]
+
+    logging.info('Generating {} initial scribbles for {} sequences'.format(
+        nb_scribbles, len(sequences)))
+    start_time = time.time()
+    if processes == 1:
+        entries = [_generate_sequence_scribbles(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            entries = list(pool.imap_unordered(_generate_sequence_scribbles,
+                                               jobs))
+        finally:
+            pool.close()
+            pool.join()
+    logging.info('Generated initial scribbles in {:.1f} s'.format(time.time() -
+                                                                  start_time))
+
+    # Update the manifest keeping the sequences generated previously
+    for entry in entries:
+        manifest['sequences'][entry['name']] = entry
+
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    with manifest_file.open('w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Generate the initial scribbles of a dataset with the '
+        'scribbles robot.')
+    parser.add_argument(
+        '--davis-root', required=True, help='Path to the dataset root.')
+    parser.add_argument(
+        '--sequences',
+        nargs='+',
+        default=None,
+        help='Sequences to generate. By default, all of them.')
+    parser.add_argument(
+        '--nb-scribbles',
+        type=int,
+        default=3,
+        help='Number of initial scribbles per sequence.')
+    parser.add_argument(
+        '--processes', type=int, default=None, help='Number of processes.')
+    parser.add_argument(
+        '--seed', type=int, default=0, help='Seed to select the frames.')
+    parser.add_argument(
+        '--overwrite',
+        action='store_true',
+        help='Overwrite the existing scribbles.')
+    args = parser.parse_args(argv)
+
+    generate_initial_scribbles(
+        args.davis_root,
+        sequences=args.sequences,
+        nb_scribbles=args.nb_scribbles,
+        processes=args.processes,
+        seed=args.seed,
+        overwrite=args.overwrite)
+
+
+if __name__ == '__main__':
+    main()
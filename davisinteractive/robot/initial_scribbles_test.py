@@ -0,0 +1,107 @@
+from __future__ import absolute_import, division
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from davisinteractive.common import Path
+from davisinteractive.dataset import Davis
+from davisinteractive.evaluation.service import ROBOT_DEFAULT_PARAMETERS
+from davisinteractive.robot.initial_scribbles import generate_initial_scribbles
+from davisinteractive.utils.scribbles import annotated_frames, is_empty
+
+ANNOTATIONS_DIR = Path(__file__).parent.parent.joinpath(
+    'session', 'test_data', 'DAVIS', 'Annotations')
+
+
+class TestInitialScribbles(unittest.TestCase):
+
+    def setUp(self):
+        self.davis_root = Path(tempfile.mkdtemp()) / 'DAVIS'
+        shutil.copytree(
+            str(ANNOTATIONS_DIR),
+            str(self.davis_root / Davis.ANNOTATIONS_SUBDIR))
+
+    def tearDown(self):
+        shutil.rmtree(str(self.davis_root.parent))
+
+    def test_generate(self):
+        manifest = generate_initial_scribbles(
+            self.davis_root, nb_scribbles=2, processes=1)
+
+        assert sorted(manifest['sequences']) == ['bear', 'blackswan', 'tennis']
+        scribbles_dir = self.davis_root / Davis.SCRIBBLES_SUBDIR
+        assert (scribbles_dir / 'manifest.json').exists()
+
+        for seq, entry in manifest['sequences'].items():
+            assert entry['num_scribbles'] == 2
+            assert entry['image_size'] == [854, 480]
+            assert len(entry['frames']) == 2
+            for i, frame in enumerate(entry['frames'], 1):
+                scribble_file = scribbles_dir / seq / '{:03d}.json'.format(i)
+                with scribble_file.open() as fp:
+                    scribble = json.load(fp)
+                assert scribble['sequence'] == seq
+                assert len(scribble['scribbles']) == entry['num_frames']
+                assert not is_empty(scribble)
+                assert annotated_frames(scribble) == [frame]
+
+        blackswan = manifest['sequences']['blackswan']
+        assert blackswan['num_frames'] == 6
+        assert len(set(blackswan['frames'])) == 2
+
+    def test_generate_processes(self):
+        manifest = generate_initial_scribbles(
+            self.davis_root,
+            sequences=['blackswan'],
+            nb_scribbles=3,
+            processes=2,
+            robot_parameters={'path_tolerance': 1.})
+        assert list(manifest['sequences']) == ['blackswan']
+
+        # Running it again only updates the manifest with new sequences
+        manifest = generate_initial_scribbles(
+            self.davis_root, sequences=['bear'], nb_scribbles=1, processes=1)
+        assert sorted(manifest['sequences']) == ['bear', 'blackswan']
+
+    def test_rerun(self):
+        manifest = generate_initial_scribbles(
+            self.davis_root, sequences=['blackswan'], nb_scribbles=2,
+            processes=1)
+        entry = manifest['sequences']['blackswan']
+        assert entry['robot_parameters'] == ROBOT_DEFAULT_PARAMETERS
+        assert entry['seed'] == 0
+
+        # The frame of a kept scribble is the one annotated on its file
+        scribble_file = (self.davis_root / Davis.SCRIBBLES_SUBDIR /
+                         'blackswan' / '001.json')
+        with scribble_file.open() as fp:
+            scribble = json.load(fp)
+        frame = entry['frames'][0]
+        new_frame = (frame + 1) % entry['num_frames']
+        scribble['scribbles'][new_frame] = scribble['scribbles'][frame]
+        scribble['scribbles'][frame] = []
+        with scribble_file.open('w') as fp:
+            json.dump(scribble, fp)
+        manifest = generate_initial_scribbles(
+            self.davis_root, sequences=['blackswan'], nb_scribbles=2,
+            processes=1)
+        frames = manifest['sequences']['blackswan']['frames']
+        assert frames == [new_frame, entry['frames'][1]]
+
+        # Keeping the scribbles generated with other parameters is refused
+        with self.assertRaises(ValueError):
+            generate_initial_scribbles(
+                self.davis_root, sequences=['blackswan'], nb_scribbles=2,
+                processes=1, seed=1)
+        manifest = generate_initial_scribbles(
+            self.davis_root, sequences=['blackswan'], nb_scribbles=2,
+            processes=1, seed=1, overwrite=True)
+        assert manifest['sequences']['blackswan']['seed'] == 1
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            generate_initial_scribbles(self.davis_root, nb_scribbles=0)
+        with self.assertRaises(ValueError):
+            generate_initial_scribbles(self.davis_root.parent / 'unknown')
@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division
 
+import multiprocessing
 import time
 
 import networkx as nx
@@ -12,11 +13,17 @@ from sklearn.neighbors import radius_neighbors_graph
 
 from .. import logging
 from ..metrics import batched_jaccard
-from ..utils.operations import bezier_curve
+from ..utils.operations import bezier_curve, simplify_path
 
 __all__ = ['InteractiveScribblesRobot']
 
 
+def _interact_frame_job(args):
+    """ Generate the scribbles of a frame in a worker process. """
+    robot, pred, gt, nb_objects = args
+    return robot._interact_frame(pred, gt, nb_objects)
+
+
 class InteractiveScribblesRobot(object):
     """ Robot that generates realistic scribbles simulating human interaction.
 
@@ -30,22 +37,47 @@ class InteractiveScribblesRobot(object):
             graph and convert it into a scribble.
         nb_points: Integer. Number of points to sample the bezier curve
             when converting the final paths into curves.
+        path_tolerance: Float. Maximum distance in pixels between the sampled
+            bezier curve and the path returned. If given, the paths are
+            simplified with the Ramer-Douglas-Peucker algorithm to reduce the
+            number of points of every line. If `None`, the paths are not
+            simplified.
     """
 
     def __init__(self,
                  kernel_size=.15,
                  max_kernel_radius=16,
                  min_nb_nodes=4,
-                 nb_points=1000):
+                 nb_points=1000,
+                 path_tolerance=None):
         """ Robot constructor
         """
         if kernel_size >= 1. or kernel_size < 0:
             raise ValueError('kernel_size must be a value between [0, 1).')
+        if path_tolerance is not None and path_tolerance < 0:
+            raise ValueError('path_tolerance must be a non negative value.')
 
         self.kernel_size = kernel_size
         self.max_kernel_radius = max_kernel_radius
         self.min_nb_nodes = min_nb_nodes
         self.nb_points = nb_points
+        self.path_tolerance = path_tolerance
+
+    def kernel_radius(self, mask):
+        """ Initial kernel radius used to erode and dilate an error mask.
+
+        The radius is proportional to the square root of the area of the mask
+        and limited by `max_kernel_radius`.
+
+        # Arguments
+            mask: Numpy Array. Error mask
+
+        # Returns
+            float: Kernel radius in pixels.
+        """
+        side = np.sqrt(np.sum(np.asarray(mask) > 0))
+        kernel_radius = self.kernel_size * side * .5
+        return min(kernel_radius, self.max_kernel_radius)
 
     def _generate_scribble_mask(self, mask):
         """ Generate the skeleton from a mask
@@ -61,12 +93,9 @@ class InteractiveScribblesRobot(object):
             skel: Numpy Array. Skeleton mask
         """
         mask = np.asarray(mask, dtype=np.uint8)
-        side = np.sqrt(np.sum(mask > 0))
 
         mask_ = mask
-        # kernel_size = int(self.kernel_size * side)
-        kernel_radius = self.kernel_size * side * .5
-        kernel_radius = min(kernel_radius, self.max_kernel_radius)
+        kernel_radius = self.kernel_radius(mask)
         logging.verbose(
             'Erosion and dilation with kernel radius: {:.1f}'.format(
                 kernel_radius), 2)
@@ -121,7 +150,7 @@ class InteractiveScribblesRobot(object):
 
         return T, points
 
-    def _acyclics_subgraphs(self, G):
+    def _acyclics_subgraphs(self, G, min_nb_nodes=None):
         """ Divide a graph into connected components subgraphs
         Divide a graph into connected components subgraphs and remove its
         cycles removing the edge with higher weight inside the cycle. Also
@@ -130,6 +159,8 @@ class InteractiveScribblesRobot(object):
 
         Args:
             G (nx.Graph): Graph
+            min_nb_nodes (int): Minimum number of nodes of the subgraphs. By
+                default `min_nb_nodes` of the robot.
 
         Returns:
             list(nx.Graph): Returns a list of graphs which are subgraphs of G
@@ -137,6 +168,8 @@ class InteractiveScribblesRobot(object):
         """
         if not isinstance(G, nx.Graph):
             raise TypeError('G must be a nx.Graph instance')
+        if min_nb_nodes is None:
+            min_nb_nodes = self.min_nb_nodes
         S = []  # List of subgraphs of G
 
         for c in nx.connected_components(G):
@@ -154,7 +187,7 @@ class InteractiveScribblesRobot(object):
                 except nx.NetworkXNoCycle:
                     has_cycles = False
 
-            if len(g) < self.min_nb_nodes:
+            if len(g) < min_nb_nodes:
                 # Prune small subgraphs
                 logging.verbose('Remove a small line with {} nodes'.format(
                     len(g)), 1)
@@ -196,6 +229,165 @@ class InteractiveScribblesRobot(object):
 
         return list(longest_path)
 
+    def skeleton_trees(self, error_mask):
+        """ Trees of the skeleton of an error mask and their longest paths.
+
+        This is the first stage of the generation of the scribbles of an
+        object. The trees are not pruned by `min_nb_nodes` and they only
+        depend on the kernel radius of the mask (see
+        #InteractiveScribblesRobot.kernel_radius), so they can be reused by
+        robots with other `min_nb_nodes`, `nb_points` or `path_tolerance`.
+
+        # Arguments
+            error_mask: Numpy Array. Error mask of an object (H x W).
+
+        # Returns
+            list: List of tuples `(nb_nodes, path)` for every tree, with the
+                number of nodes of the tree and its longest path as an array
+                of (x, y) pixel coordinates.
+        """
+        start_time = time.time()
+        skel_mask = self._generate_scribble_mask(error_mask)
+        skel_time = time.time() - start_time
+        logging.verbose(
+            'Time to compute the skeleton mask: {:.3f} ms'.format(
+                skel_time * 1000), 2)
+        if skel_mask.sum() == 0:
+            return []
+
+        G, P = self._mask2graph(skel_mask)
+        mask2graph_time = time.time() - start_time - skel_time
+        logging.verbose(
+            'Time to transform the skeleton mask into a graph: ' +
+            '{:.3f} ms'.format(mask2graph_time * 1000), 2)
+
+        t_start = time.time()
+        S = self._acyclics_subgraphs(G, min_nb_nodes=0)
+        t = (time.time() - t_start) * 1000
+        logging.verbose(
+            'Time to split into connected components subgraphs ' +
+            'and remove the cycles: {:.3f} ms'.format(t), 2)
+
+        t_start = time.time()
+        trees = [(len(s), P[self._longest_path_in_tree(s)]) for s in S]
+        t = (time.time() - t_start) * 1000
+        logging.verbose(
+            'Time to compute the longest path on the trees: {:.3f} ms'.format(
+                t), 2)
+        return trees
+
+    def scribble_curves(self, paths):
+        """ Convert the longest paths of the trees into the curves of the
+        scribbles.
+
+        The paths are sampled with a bezier curve of `nb_points` and, if
+        `path_tolerance` is given, simplified.
+
+        # Arguments
+            paths: List of Numpy Arrays. Paths in pixel coordinates, as
+                returned by #InteractiveScribblesRobot.skeleton_trees.
+
+        # Returns
+            list: List of the curves in pixel coordinates.
+        """
+        t_start = time.time()
+        curves = [bezier_curve(p, self.nb_points) for p in paths]
+        t = (time.time() - t_start) * 1000
+        logging.verbose(
+            'Time to compute the bezier curves: {:.3f} ms'.format(t), 2)
+
+        if self.path_tolerance is not None:
+            t_start = time.time()
+            curves = [simplify_path(c, self.path_tolerance) for c in curves]
+            t = (time.time() - t_start) * 1000
+            logging.verbose('Time to simplify the paths: {:.3f} ms'.format(t),
+                            2)
+        return curves
+
+    def _prepare_masks(self, pred_masks, gt_masks, nb_objects):
+        """ Convert the masks to integer arrays and infer the number of objects.
+        """
+        predictions = np.asarray(pred_masks, dtype=np.int)
+        annotations = np.asarray(gt_masks, dtype=np.int)
+
+        if nb_objects is None:
+            obj_ids = np.unique(annotations)
+            obj_ids = obj_ids[(obj_ids > 0) & (obj_ids < 255)]
+            nb_objects = len(obj_ids)
+
+        return predictions, annotations, nb_objects
+
+    def _interact_frame(self,
+                        pred,
+                        gt,
+                        nb_objects,
+                        offset=(0, 0),
+                        frame_shape=None):
+        """ Generate the scribbles of a single frame.
+
+        # Arguments
+            pred: Numpy Array. Prediction mask of the frame with shape (H x W).
+            gt: Numpy Array. Ground truth mask of the frame with shape (H x W).
+            nb_objects: Integer. Number of objects in the ground truth mask.
+            offset: Tuple. Position `(x, y)` of the masks in the frame, when
+                they are a crop of it.
+            frame_shape: Tuple. Height and width of the frame, when the masks
+                are a crop of it. By default the shape of the masks.
+
+        # Returns
+            list: List of the paths generated for the frame in the default
+                scribble representation.
+        """
+        obj_ids = [i for i in range(nb_objects + 1)]
+        # Infer height and width of the sequence
+        h, w = frame_shape or gt.shape[:2]
+        img_shape = np.asarray([w, h], dtype=np.float)
+        offset = np.asarray(offset, dtype=np.float)
+
+        frame_scribbles = []
+
+        for obj_id in obj_ids:
+            logging.verbose(
+                'Creating scribbles from error mask at object_id={}'.format(
+                    obj_id), 2)
+            start_time = time.time()
+            error_mask = (gt == obj_id) & (pred != obj_id)
+            if error_mask.sum() == 0:
+                logging.info(
+                    'Error mask of object ID {} is empty. Skip object ID.'.
+                    format(obj_id))
+                continue
+
+            # Generate scribbles
+            paths = []
+            for nb_nodes, path in self.skeleton_trees(error_mask):
+                if nb_nodes < self.min_nb_nodes:
+                    # Prune small subgraphs
+                    logging.verbose(
+                        'Remove a small line with {} nodes'.format(nb_nodes),
+                        1)
+                    continue
+                paths.append(path)
+            scribbles_paths = self.scribble_curves(paths)
+
+            end_time = time.time()
+            logging.verbose(
+                'Generating the scribble for object id {} '.format(obj_id) +
+                'took {:.3f} ms'.format((end_time - start_time) * 1000), 2)
+            # Generate scribbles data file
+            for p in scribbles_paths:
+                p += offset
+                p /= img_shape
+                path_data = {
+                    'path': p.tolist(),
+                    'object_id': int(obj_id),
+                    'start_time': start_time,
+                    'end_time': end_time
+                }
+                frame_scribbles.append(path_data)
+
+        return frame_scribbles
+
     def interact(self,
                  sequence,
                  pred_masks,
@@ -224,19 +416,9 @@ class InteractiveScribblesRobot(object):
         """
         robot_start = time.time()
 
-        predictions = np.asarray(pred_masks, dtype=np.int)
-        annotations = np.asarray(gt_masks, dtype=np.int)
-
+        predictions, annotations, nb_objects = self._prepare_masks(
+            pred_masks, gt_masks, nb_objects)
         nb_frames = len(annotations)
-        if nb_objects is None:
-            obj_ids = np.unique(annotations)
-            obj_ids = obj_ids[(obj_ids > 0) & (obj_ids < 255)]
-            nb_objects = len(obj_ids)
-
-        obj_ids = [i for i in range(nb_objects + 1)]
-        # Infer height and width of the sequence
-        h, w = annotations.shape[1:3]
-        img_shape = np.asarray([w, h], dtype=np.float)
 
         if frame is None:
             jac = batched_jaccard(
@@ -247,74 +429,82 @@ class InteractiveScribblesRobot(object):
                 format(sequence, worst_frame, jac.min()), 2)
         else:
             worst_frame = frame
-        pred, gt = predictions[worst_frame], annotations[worst_frame]
 
         scribbles = [[] for _ in range(nb_frames)]
+        scribbles[worst_frame] = self._interact_frame(
+            predictions[worst_frame], annotations[worst_frame], nb_objects)
 
-        for obj_id in obj_ids:
-            logging.verbose(
-                'Creating scribbles from error mask at object_id={}'.format(
-                    obj_id), 2)
-            start_time = time.time()
-            error_mask = (gt == obj_id) & (pred != obj_id)
-            if error_mask.sum() == 0:
-                logging.info(
-                    'Error mask of object ID {} is empty. Skip object ID.'.
-                    format(obj_id))
-                continue
+        scribbles_data = {'scribbles': scribbles, 'sequence': sequence}
 
-            # Generate scribbles
-            skel_mask = self._generate_scribble_mask(error_mask)
-            skel_time = time.time() - start_time
-            logging.verbose(
-                'Time to compute the skeleton mask: {:.3f} ms'.format(
-                    skel_time * 1000), 2)
-            if skel_mask.sum() == 0:
-                continue
+        t = time.time() - robot_start
+        logging.info(('The robot took {:.3f} s to generate all the '
+                      'scribbles for {} objects. Sequence {}.').format(
+                          t, nb_objects, sequence))
+        return scribbles_data
 
-            G, P = self._mask2graph(skel_mask)
-            mask2graph_time = time.time() - start_time - skel_time
-            logging.verbose(
-                'Time to transform the skeleton mask into a graph: ' +
-                '{:.3f} ms'.format(mask2graph_time * 1000), 2)
+    def interact_frame(self,
+                       sequence,
+                       pred_mask,
+                       gt_mask,
+                       frame,
+                       nb_frames,
+                       nb_objects=None,
+                       crop=False):
+        """ Interaction of the Scribble robot on a single given frame.
 
-            t_start = time.time()
-            S = self._acyclics_subgraphs(G)
-            t = (time.time() - t_start) * 1000
-            logging.verbose(
-                'Time to split into connected components subgraphs ' +
-                'and remove the cycles: {:.3f} ms'.format(t), 2)
+        Unlike #InteractiveScribblesRobot.interact, only the masks of the
+        frame to annotate are needed, so the masks of the whole sequence do
+        not have to be in memory, which is useful with high resolutions.
 
-            t_start = time.time()
-            longest_paths_idx = [self._longest_path_in_tree(s) for s in S]
-            longest_paths = [P[idx] for idx in longest_paths_idx]
-            t = (time.time() - t_start) * 1000
-            logging.verbose(
-                'Time to compute the longest path on the trees: {:.3f} ms'.
-                format(t), 2)
+        # Arguments
+            sequence: String. Name of the sequence to interact with.
+            pred_mask: Numpy Array. Prediction mask of the frame with shape
+                (H x W).
+            gt_mask: Numpy Array. Ground truth mask of the frame with the
+                same shape as `pred_mask`.
+            frame: Integer. Index of the frame on the sequence.
+            nb_frames: Integer. Number of frames of the sequence.
+            nb_objects: Integer. Number of objects in the ground truth mask. If
+                `None` the value will be infered from `gt_mask`.
+            crop: Boolean. Whether to process only the region of the frame
+                with errors (plus a margin larger than the kernel used to
+                generate the scribbles), instead of the whole frame. The
+                scribbles are still given relative to the whole frame.
 
-            t_start = time.time()
-            scribbles_paths = [
-                bezier_curve(p, self.nb_points) for p in longest_paths
-            ]
-            t = (time.time() - t_start) * 1000
-            logging.verbose(
-                'Time to compute the bezier curves: {:.3f} ms'.format(t), 2)
+        # Returns
+            dict: Return a scribble (default representation).
+        """
+        robot_start = time.time()
 
-            end_time = time.time()
-            logging.verbose(
-                'Generating the scribble for object id {} '.format(obj_id) +
-                'took {:.3f} ms'.format((end_time - start_time) * 1000), 2)
-            # Generate scribbles data file
-            for p in scribbles_paths:
-                p /= img_shape
-                path_data = {
-                    'path': p.tolist(),
-                    'object_id': int(obj_id),
-                    'start_time': start_time,
-                    'end_time': end_time
-                }
-                scribbles[worst_frame].append(path_data)
+        pred_mask, gt_mask = np.asarray(pred_mask), np.asarray(gt_mask)
+        if nb_objects is None:
+            obj_ids = np.unique(gt_mask)
+            nb_objects = int(np.sum((obj_ids > 0) & (obj_ids < 255)))
+        frame_shape = gt_mask.shape[:2]
+        offset = (0, 0)
+
+        if crop:
+            ys, xs = np.nonzero(pred_mask != gt_mask)
+            if len(ys) > 0:
+                margin = int(np.ceil(self.max_kernel_radius)) + 2
+                h, w = frame_shape
+                y0, x0 = max(ys.min() - margin, 0), max(xs.min() - margin, 0)
+                y1 = min(ys.max() + margin + 1, h)
+                x1 = min(xs.max() + margin + 1, w)
+                pred_mask = pred_mask[y0:y1, x0:x1]
+                gt_mask = gt_mask[y0:y1, x0:x1]
+                offset = (x0, y0)
+                logging.verbose(
+                    'Cropping frame #{} to ({}, {}, {}, {})'.format(
+                        frame, x0, y0, x1, y1), 2)
+
+        scribbles = [[] for _ in range(nb_frames)]
+        scribbles[frame] = self._interact_frame(
+            np.asarray(pred_mask, dtype=np.int),
+            np.asarray(gt_mask, dtype=np.int),
+            nb_objects,
+            offset=offset,
+            frame_shape=frame_shape)
 
         scribbles_data = {'scribbles': scribbles, 'sequence': sequence}
 
@@ -323,3 +513,101 @@ class InteractiveScribblesRobot(object):
                       'scribbles for {} objects. Sequence {}.').format(
                           t, nb_objects, sequence))
         return scribbles_data
+
+    def interact_multiple(self,
+                          sequence,
+                          pred_masks,
+                          gt_masks,
+                          nb_objects=None,
+                          frames=None,
+                          top_k=None,
+                          max_workers=None):
+        """ Interaction of the Scribble robot on several frames at once.
+
+        The masks are converted and the metric to rank the frames is computed
+        only once for all the frames, which are then processed in parallel
+        by a pool of processes, as most of the generation of the scribbles
+        is pure Python and would not run in parallel on threads. The
+        scribbles of all the frames are returned in a single scribble.
+
+        # Arguments
+            sequence: String. Name of the sequence to interact with.
+            pred_masks: Numpy Array. Array with the prediction masks. It must
+                be an integer array with shape (B x H x W), with B being the
+                number of frames of the sequence.
+            gt_masks: Numpy Array. Array with the ground truth of the sequence.
+                It must have the same data type and shape as `pred_masks`.
+            nb_objects: Integer. Number of objects in the ground truth mask. If
+                `None` the value will be infered from `y_true`. Setting this
+                value will speed up the computation.
+            frames: List of Integers. Frames to generate the scribbles. If
+                `top_k` is also given, only the `top_k` worst frames among
+                them are annotated. Invalid frames indexes are ignored.
+            top_k: Integer. Number of frames, the ones with the worst jaccard,
+                to generate the scribbles. If neither `frames` nor `top_k`
+                are given, only the worst frame is annotated.
+            max_workers: Integer. Maximum number of processes used to process
+                the frames. If `None`, the number of CPUs is used. With 1, the
+                frames are processed on the current process.
+
+        # Returns
+            dict: Return a scribble (default representation) with the paths of
+                all the annotated frames.
+
+        # Raises
+            ValueError: if `top_k` is lower than 1.
+        """
+        robot_start = time.time()
+
+        if top_k is not None and top_k < 1:
+            raise ValueError('top_k must be higher than 0.')
+
+        predictions, annotations, nb_objects = self._prepare_masks(
+            pred_masks, gt_masks, nb_objects)
+        nb_frames = len(annotations)
+
+        if frames is None:
+            candidates = list(range(nb_frames))
+            top_k = top_k or 1
+        else:
+            candidates = sorted(
+                set(int(f) for f in frames if 0 <= f < nb_frames))
+
+        if top_k is None:
+            selected_frames = candidates
+        else:
+            jac = batched_jaccard(
+                annotations, predictions, nb_objects=nb_objects)
+            candidates = set(candidates)
+            selected_frames = [
+                f for f in jac.argsort(kind='stable') if f in candidates
+            ][:top_k]
+            logging.verbose(
+                'For sequence {} the worst frames are {}'.format(
+                    sequence, selected_frames), 2)
+
+        jobs = [(self, predictions[f], annotations[f], nb_objects)
+                for f in selected_frames]
+        if max_workers == 1 or len(selected_frames) < 2:
+            frames_scribbles = [_interact_frame_job(job) for job in jobs]
+        else:
+            processes = min(max_workers or multiprocessing.cpu_count(),
+                            len(jobs))
+            pool = multiprocessing.Pool(processes)
+            try:
+                frames_scribbles = pool.map(_interact_frame_job, jobs)
+            finally:
+                pool.close()
+                pool.join()
+
+        scribbles = [[] for _ in range(nb_frames)]
+        for f, frame_scribbles in zip(selected_frames, frames_scribbles):
+            scribbles[f] = frame_scribbles
+
+        scribbles_data = {'scribbles': scribbles, 'sequence': sequence}
+
+        t = time.time() - robot_start
+        logging.info(('The robot took {:.3f} s to generate the scribbles for '
+                      '{} frames and {} objects. Sequence {}.').format(
+                          t, len(selected_frames), nb_objects, sequence))
+        return scribbles_data
@@ -157,3 +157,100 @@ class TestInteractiveScribblesRobot(unittest.TestCase):
             x, y = path[:, 0], path[:, 1]
             inside = (x >= .2) & (x <= .4) & (y >= 1 / 3) & (y <= 2 / 3)
             assert not np.any(inside)
+
+    def test_interaction_multiple_top_k(self):
+        nb_frames, h, w = 10, 300, 500
+        gt_empty = np.zeros((nb_frames, h, w), dtype=np.int)
+        pred_empty = gt_empty.copy()
+        gt_empty[2, 100:200, 100:200] = 1
+        gt_empty[5, 100:200, 100:200] = 1
+        gt_empty[7, 100:200, 100:200] = 1
+        pred_empty[7, 100:200, 100:190] = 1
+
+        robot = InteractiveScribblesRobot()
+
+        scribble = robot.interact_multiple(
+            'test', pred_empty, gt_empty, top_k=2)
+        assert len(scribble['scribbles']) == nb_frames
+        assert annotated_frames(scribble) == [2, 5]
+
+        scribble = robot.interact_multiple(
+            'test', pred_empty, gt_empty, top_k=3, max_workers=1)
+        assert annotated_frames(scribble) == [2, 5, 7]
+
+        with pytest.raises(ValueError):
+            robot.interact_multiple('test', pred_empty, gt_empty, top_k=0)
+
+    def test_interaction_multiple_frames(self):
+        nb_frames, h, w = 10, 300, 500
+        gt_empty = np.zeros((nb_frames, h, w), dtype=np.int)
+        pred_empty = gt_empty.copy()
+        gt_empty[2, 100:200, 100:200] = 1
+        gt_empty[5, 100:200, 100:200] = 1
+        gt_empty[7, 100:200, 100:200] = 1
+
+        robot = InteractiveScribblesRobot()
+
+        scribble = robot.interact_multiple(
+            'test', pred_empty, gt_empty, frames=[7, 5, 20, -1])
+        assert annotated_frames(scribble) == [5, 7]
+
+        scribble = robot.interact_multiple(
+            'test', pred_empty, gt_empty, frames=[0, 2, 7], top_k=1)
+        assert annotated_frames(scribble) == [2]
+
+        single = robot.interact('test', pred_empty, gt_empty, frame=5)
+        multiple = robot.interact_multiple(
+            'test', pred_empty, gt_empty, frames=[5])
+        assert annotated_frames(single) == annotated_frames(multiple)
+        assert ([l['object_id'] for l in single['scribbles'][5]] ==
+                [l['object_id'] for l in multiple['scribbles'][5]])
+
+    def test_interaction_path_tolerance(self):
+        nb_frames, h, w = 10, 300, 500
+        gt_empty = np.zeros((nb_frames, h, w), dtype=np.int)
+        pred_empty = gt_empty.copy()
+        gt_empty[5, 100:200, 100:200] = 1
+
+        with pytest.raises(ValueError):
+            InteractiveScribblesRobot(path_tolerance=-1)
+
+        robot = InteractiveScribblesRobot(path_tolerance=1.)
+
+        scribble = robot.interact('test', pred_empty, gt_empty)
+        assert annotated_frames(scribble) == [5]
+        lines = scribble['scribbles'][5]
+        assert lines
+
+        for l in lines:
+            assert l['object_id'] == 1
+            path = np.asarray(l['path'])
+            assert 2 <= len(path) < robot.nb_points
+            x, y = path[:, 0], path[:, 1]
+            assert np.all((x >= .2) & (x <= .4))
+            assert np.all((y >= 1 / 3) & (y <= 2 / 3))
+
+    def test_interaction_frame_crop(self):
+        nb_frames, h, w = 10, 300, 500
+        gt_empty = np.zeros((nb_frames, h, w), dtype=np.uint8)
+        pred_empty = gt_empty.copy()
+        gt_empty[5, 100:200, 150:250] = 1
+        gt_empty[5, 220:280, 300:420] = 2
+        bboxes = {1: (150, 100, 250, 200), 2: (300, 220, 420, 280)}
+
+        robot = InteractiveScribblesRobot()
+        for crop in (False, True):
+            scribble = robot.interact_frame(
+                'test', pred_empty[5], gt_empty[5], 5, nb_frames, crop=crop)
+            assert len(scribble['scribbles']) == nb_frames
+            assert annotated_frames(scribble) == [5]
+            lines = scribble['scribbles'][5]
+            assert sorted(l['object_id'] for l in lines) == [1, 2]
+
+            # The paths are relative to the whole frame
+            for l in lines:
+                x0, y0, x1, y1 = bboxes[l['object_id']]
+                path = np.asarray(l['path']) * [w, h]
+                x, y = path[:, 0], path[:, 1]
+                assert np.all((x >= x0) & (x <= x1))
+                assert np.all((y >= y0) & (y <= y1))
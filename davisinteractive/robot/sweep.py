@@ -0,0 +1,245 @@
+""" Parameter sweep of the scribbles robot.
+
+Runs the `InteractiveScribblesRobot` with a grid of parameters over a set of
+recorded predictions reusing all the stages of the robot that do not depend on
+a given parameter:
+
+* The frame to annotate and the error masks are computed once per case.
+* The skeleton, the graph and the longest paths of all its trees
+    (#InteractiveScribblesRobot.skeleton_trees) are computed once for every
+    kernel radius (they do not depend on `min_nb_nodes`, `nb_points` or
+    `path_tolerance`).
+* The bezier curves (#InteractiveScribblesRobot.scribble_curves) are computed
+    once for every radius, `nb_points` and `path_tolerance`.
+
+The time reported for every configuration is the one it would take without
+reusing any stage, so the configurations can be compared.
+
+# Example
+```python
+from davisinteractive.robot.sweep import sweep_robot_parameters
+
+grid = {'kernel_size': [.15, .2], 'nb_points': [100, 1000]}
+cases = [('bear', bear_pred_masks), ('dog', 'path/to/dog_pred_masks.npy')]
+table = sweep_robot_parameters(grid, cases, davis_root='path/to/DAVIS')
+```
+"""
+from __future__ import absolute_import, division
+
+import itertools
+import multiprocessing
+import time
+
+import numpy as np
+import pandas as pd
+
+from .. import logging
+from ..dataset import Davis
+from ..evaluation.service import ROBOT_DEFAULT_PARAMETERS
+from ..metrics import batched_jaccard
+from .interactive_robot import InteractiveScribblesRobot
+
+__all__ = ['sweep_robot_parameters']
+
+
+def _expand_grid(parameter_grid):
+    """ Expand the parameter grid into a list of robot configurations.
+
+    The parameters not given take the value of `ROBOT_DEFAULT_PARAMETERS`.
+    """
+    if isinstance(parameter_grid, dict):
+        keys = sorted(parameter_grid)
+        values = [parameter_grid[k] for k in keys]
+        parameter_grid = [
+            dict(zip(keys, v)) for v in itertools.product(*values)
+        ]
+    configs = []
+    for params in parameter_grid:
+        unknown = set(params) - set(ROBOT_DEFAULT_PARAMETERS)
+        if unknown:
+            raise ValueError('Unknown robot parameters: {}'.format(
+                sorted(unknown)))
+        configs.append(dict(ROBOT_DEFAULT_PARAMETERS, **params))
+    if not configs:
+        raise ValueError('The parameter grid is empty')
+    return configs
+
+
+def _sweep_case(args):
+    """ Run all the configurations over a single case.
+
+    This function runs in a worker process, so it receives all its arguments
+    in a single tuple. It returns a list of rows, one per configuration.
+    """
+    case_idx, sequence, pred_masks, gt_masks, davis_root, configs = args
+
+    shared_start = time.time()
+    if gt_masks is None:
+        gt_masks = Davis(davis_root=davis_root).load_annotations(
+            sequence, dtype=np.uint8)
+    if not isinstance(pred_masks, np.ndarray):
+        pred_masks = np.load(str(pred_masks), mmap_mode='r')
+
+    predictions = np.asarray(pred_masks, dtype=np.int)
+    annotations = np.asarray(gt_masks, dtype=np.int)
+    obj_ids = np.unique(annotations)
+    nb_objects = int(np.sum((obj_ids > 0) & (obj_ids < 255)))
+    jac = batched_jaccard(annotations, predictions, nb_objects=nb_objects)
+    frame = int(jac.argmin())
+    pred, gt = predictions[frame], annotations[frame]
+    h, w = gt.shape
+    img_shape = np.asarray([w, h], dtype=np.float)
+
+    error_masks = []
+    for obj_id in range(nb_objects + 1):
+        error_mask = (gt == obj_id) & (pred != obj_id)
+        if error_mask.any():
+            error_masks.append((obj_id, error_mask))
+    shared_time = time.time() - shared_start
+
+    # Every cached stage keeps the time it took to compute it, to report
+    # the time of every configuration without the cache
+    # (obj_id, kernel_radius) -> ([(nb_nodes, longest_path)], time)
+    trees_cache = {}
+    # (obj_id, kernel_radius, nb_points, path_tolerance) -> ([curve], time)
+    curves_cache = {}
+
+    rows = []
+    for config_idx, config in enumerate(configs):
+        robot = InteractiveScribblesRobot(**config)
+        start_time = time.time()
+        uncached_time = shared_time
+        cache_hits, cache_misses = 0, 0
+        lines = []
+
+        for obj_id, error_mask in error_masks:
+            trees_key = (obj_id, robot.kernel_radius(error_mask))
+            if trees_key in trees_cache:
+                cache_hits += 1
+            else:
+                cache_misses += 1
+                stage_start = time.time()
+                trees = robot.skeleton_trees(error_mask)
+                trees_cache[trees_key] = (trees, time.time() - stage_start)
+            trees, trees_time = trees_cache[trees_key]
+
+            curves_key = trees_key + (robot.nb_points, robot.path_tolerance)
+            if curves_key not in curves_cache:
+                stage_start = time.time()
+                curves = robot.scribble_curves([p for _, p in trees])
+                curves = [c / img_shape for c in curves]
+                curves_cache[curves_key] = (curves,
+                                            time.time() - stage_start)
+            curves, curves_time = curves_cache[curves_key]
+            uncached_time += trees_time + curves_time
+
+            lines += [
+                c for (nb_nodes, _), c in zip(trees, curves)
+                if nb_nodes >= robot.min_nb_nodes
+            ]
+
+        row = {
+            'config': config_idx,
+            'case': case_idx,
+            'sequence': sequence,
+            'frame': frame,
+            'time': uncached_time,
+            'sweep_time': time.time() - start_time,
+            'shared_time': shared_time,
+            'cache_hits': cache_hits,
+            'cache_misses': cache_misses,
+            'nb_lines': len(lines),
+            'total_points': sum(len(l) for l in lines),
+        }
+        rows.append(row)
+
+    logging.verbose(
+        'Swept {} configurations for case {} ({}) in {:.3f} s'.format(
+            len(configs), case_idx, sequence,
+            sum(r['sweep_time'] for r in rows) + shared_time), 1)
+    return rows
+
+
+def sweep_robot_parameters(parameter_grid,
+                           cases,
+                           davis_root=None,
+                           processes=None,
+                           aggregate=True):
+    """ Evaluate a grid of robot parameters over a set of predictions.
+
+    # Arguments
+        parameter_grid: Dictionary or List of Dictionaries. If a dictionary is
+            given, the keys are the robot parameters and the values the list
+            of values to sweep, and all its combinations are evaluated. If a
+            list is given, every element is a configuration to evaluate. The
+            parameters not given take the value of `ROBOT_DEFAULT_PARAMETERS`.
+        cases: List of Tuples. Every case is a tuple `(sequence, pred_masks)`
+            or `(sequence, pred_masks, gt_masks)`. `pred_masks` can be a Numpy
+            Array or a path to a `.npy` file. If `gt_masks` is not given, the
+            ground truth is loaded from `davis_root`.
+        davis_root: String or Path. Path to the DAVIS dataset root directory.
+        processes: Integer. Number of worker processes, each of them running
+            all the configurations of a case. By default, the number of CPUs
+            available.
+        aggregate: Boolean. Whether to aggregate the results per
+            configuration or to return a row per configuration and case.
+
+    # Returns
+        Pandas DataFrame: Table with the parameters of every configuration,
+            the time spent computing them and statistics of the generated
+            scribbles. `time` is the time the robot takes to generate the
+            scribbles with the configuration, including the stages reused
+            from other configurations, and `sweep_time` the time actually
+            spent on the configuration by the sweep. `shared_time` is the
+            time spent on the stages shared by all the configurations
+            (loading the masks, selecting the frame and computing the error
+            masks), which is part of `time`. When aggregated, the columns
+            `time`, `sweep_time`, `nb_lines` and `total_points` are the totals
+            over all the cases, `time_per_case` is the mean time per case and
+            `points_per_line` the mean number of points of every line.
+    """
+    configs = _expand_grid(parameter_grid)
+
+    jobs = []
+    for case_idx, case in enumerate(cases):
+        if len(case) == 2:
+            (sequence, pred_masks), gt_masks = case, None
+        else:
+            sequence, pred_masks, gt_masks = case
+        jobs.append((case_idx, sequence, pred_masks, gt_masks, davis_root,
+                     configs))
+
+    logging.info('Sweeping {} robot configurations over {} cases'.format(
+        len(configs), len(jobs)))
+    if processes == 1:
+        results = [_sweep_case(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_sweep_case, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    df = pd.DataFrame([row for rows in results for row in rows])
+    params = pd.DataFrame(configs)
+    params.index.name = 'config'
+    params = params.reset_index()
+
+    if not aggregate:
+        return params.merge(df, on='config')
+
+    summary = df.groupby('config').agg({
+        'case': 'count',
+        'time': 'sum',
+        'sweep_time': 'sum',
+        'shared_time': 'sum',
+        'cache_hits': 'sum',
+        'cache_misses': 'sum',
+        'nb_lines': 'sum',
+        'total_points': 'sum',
+    }).rename(columns={'case': 'nb_cases'})
+    summary['time_per_case'] = summary['time'] / summary['nb_cases']
+    summary['points_per_line'] = (
+        summary['total_points'] / summary['nb_lines'].replace(0, np.nan))
+    return params.merge(summary.reset_index(), on='config')
@@ -0,0 +1,82 @@
+from __future__ import absolute_import, division
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pytest
+
+from davisinteractive.common import Path
+from davisinteractive.robot.sweep import sweep_robot_parameters
+
+
+def _case(nb_frames=4, h=240, w=320):
+    gt = np.zeros((nb_frames, h, w), dtype=np.int)
+    gt[1, 50:150, 50:150] = 1
+    gt[1, 160:220, 200:300] = 2
+    pred = np.zeros_like(gt)
+    pred[1, 50:150, 50:100] = 1
+    return pred, gt
+
+
+class TestSweepRobotParameters(unittest.TestCase):
+
+    def test_sweep(self):
+        pred, gt = _case()
+        grid = {
+            'kernel_size': [.1, .2],
+            'nb_points': [50, 1000],
+            'min_nb_nodes': [4, 1000]
+        }
+
+        table = sweep_robot_parameters(
+            grid, [('test', pred, gt)], processes=1)
+        assert len(table) == 8
+        for c in [
+                'kernel_size', 'nb_points', 'min_nb_nodes', 'max_kernel_radius',
+                'path_tolerance', 'time', 'sweep_time', 'shared_time',
+                'nb_lines', 'total_points', 'points_per_line', 'cache_hits',
+                'cache_misses'
+        ]:
+            assert c in table
+
+        # Only the first configuration for every kernel size computes the
+        # skeletons of the two objects
+        assert table['cache_misses'].sum() == 2 * 2
+        assert table['cache_hits'].sum() == 6 * 2
+        # The time of the configurations includes the reused stages
+        assert np.all(table.time >= table.shared_time)
+
+        large_nodes = table[table.min_nb_nodes == 1000]
+        assert np.all(large_nodes.nb_lines == 0)
+        small_nodes = table[table.min_nb_nodes == 4]
+        assert np.all(small_nodes.nb_lines > 0)
+        np.testing.assert_array_equal(
+            small_nodes.points_per_line.values,
+            small_nodes.total_points.values / small_nodes.nb_lines.values)
+
+    def test_sweep_processes(self):
+        pred, gt = _case()
+        pred_file = Path(tempfile.mkdtemp()) / 'pred.npy'
+        np.save(str(pred_file), pred)
+
+        grid = [{'path_tolerance': None}, {'path_tolerance': 1.}]
+        cases = [('test', pred, gt), ('test', pred_file, gt)]
+        table = sweep_robot_parameters(
+            grid, cases, processes=2, aggregate=False)
+        assert len(table) == 4
+        assert sorted(table.case.unique()) == [0, 1]
+        assert np.all(table.frame == 1)
+
+        simplified = table[table.path_tolerance == 1.]
+        original = table[table.path_tolerance.isna()]
+        assert simplified.total_points.sum() < original.total_points.sum()
+        os.remove(str(pred_file))
+
+    def test_invalid(self):
+        pred, gt = _case()
+        with pytest.raises(ValueError):
+            sweep_robot_parameters({'unknown': [1]}, [('test', pred, gt)])
+        with pytest.raises(ValueError):
+            sweep_robot_parameters([], [('test', pred, gt)])
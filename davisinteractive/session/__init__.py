@@ -1,3 +1,4 @@
 from __future__ import absolute_import
 
+from .async_session import AsyncDavisInteractiveSession
 from .session import DavisInteractiveSession
@@ -0,0 +1,121 @@
+from __future__ import absolute_import, division
+
+import asyncio
+import functools
+import time
+
+from .session import DavisInteractiveSession
+
+__all__ = ['AsyncDavisInteractiveSession']
+
+
+class AsyncDavisInteractiveSession:
+    """ Asyncio counterpart of #DavisInteractiveSession.
+
+    All the methods of the session are coroutines and the blocking work (the
+    connector requests, the evaluation of the masks and the generation of
+    the scribbles) runs on an executor, so the event loop is never blocked.
+    Several sessions can run concurrently on the same event loop sharing the
+    executor threads. The time of the prediction ends when the masks are
+    submitted, before the submission waits for a thread of the executor.
+
+    # Example
+    ```python
+    async with AsyncDavisInteractiveSession(davis_root='path/to/DAVIS') as sess:
+        async for sequence, scribbles, new_sequence in sess.scribbles_iterator():
+            pred_masks = await model.predict(sequence, scribbles)
+            await sess.submit_masks(pred_masks)
+    ```
+
+    # Arguments
+        *args, **kwargs: Arguments to create the #DavisInteractiveSession.
+        executor: `concurrent.futures.Executor`. Executor where the blocking
+            calls are run. By default, the default executor of the event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.executor = kwargs.pop('executor', None)
+        self.session = DavisInteractiveSession(*args, **kwargs)
+
+    def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self.executor,
+                                    functools.partial(func, *args, **kwargs))
+
+    async def __aenter__(self):
+        await self._run(self.session.__enter__)
+        return self
+
+    async def __aexit__(self, type_, value, traceback):
+        await self._run(self.session.__exit__, type_, value, traceback)
+
+    async def next(self):
+        """ See #DavisInteractiveSession.next. """
+        return await self._run(self.session.next)
+
+    async def get_scribbles(self, only_last=False, read_only=False):
+        """ See #DavisInteractiveSession.get_scribbles. """
+        return await self._run(
+            self.session.get_scribbles,
+            only_last=only_last,
+            read_only=read_only)
+
+    async def get_scribbles_mask(self, read_only=False):
+        """ See #DavisInteractiveSession.get_scribbles_mask. """
+        return await self._run(
+            self.session.get_scribbles_mask, read_only=read_only)
+
+    async def scribbles_iterator(self,
+                                 only_last=False,
+                                 read_only=False,
+                                 batch_size=None):
+        """ Asynchronously iterate over all the samples and iterations to
+        evaluate.
+
+        # Arguments
+            only_last, read_only: Passed to
+                #AsyncDavisInteractiveSession.get_scribbles.
+            batch_size: Integer. Number of samples to evaluate at the same
+                time. The masks of a batch must be submitted with
+                #AsyncDavisInteractiveSession.submit_masks_batch. See
+                #DavisInteractiveSession.scribbles_iterator.
+
+        # Yields
+        `(string, dict, bool)`: See
+            #DavisInteractiveSession.scribbles_iterator.
+        """
+        if batch_size is not None:
+            batches = self.session.scribbles_iterator(
+                only_last=only_last,
+                read_only=read_only,
+                batch_size=batch_size)
+            while True:
+                batch = await self._run(next, batches, None)
+                if batch is None:
+                    return
+                yield batch
+        while await self.next():
+            yield await self.get_scribbles(
+                only_last=only_last, read_only=read_only)
+
+    async def submit_masks(self, pred_masks,
+                           next_scribble_frame_candidates=None):
+        """ See #DavisInteractiveSession.submit_masks. """
+        await self._run(self.session._submit_masks, pred_masks,
+                        next_scribble_frame_candidates, time.time())
+
+    async def submit_masks_batch(self,
+                                 pred_masks,
+                                 next_scribble_frame_candidates=None):
+        """ See #DavisInteractiveSession.submit_masks_batch. """
+        await self._run(self.session._submit_masks_batch, pred_masks,
+                        next_scribble_frame_candidates, time.time())
+
+    async def get_report(self, since=0):
+        """ See #DavisInteractiveSession.get_report. """
+        return await self._run(self.session.get_report, since=since)
+
+    async def get_global_summary(self, save_file=None):
+        """ See #DavisInteractiveSession.get_global_summary. """
+        return await self._run(
+            self.session.get_global_summary, save_file=save_file)
@@ -0,0 +1,146 @@
+from __future__ import absolute_import, division
+
+import asyncio
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from davisinteractive.common import Path, patch
+from davisinteractive.dataset import Davis
+from davisinteractive.session import AsyncDavisInteractiveSession
+from davisinteractive.session.session_test import dataset
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncDavisInteractiveSession(unittest.TestCase):
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_concurrent(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        async def evaluate():
+            async with AsyncDavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    max_nb_interactions=3,
+                    report_save_dir=tempfile.mkdtemp(),
+                    max_time=None) as session:
+                count = 0
+                async for seq, scribble, new_seq in session.scribbles_iterator(
+                ):
+                    assert seq == 'bear'
+                    assert new_seq == (count == 0)
+                    assert scribble['sequence'] == 'bear'
+                    await asyncio.sleep(0)
+                    await session.submit_masks(np.ones((2, 480, 854)))
+                    count += 1
+                assert count == 3
+                report = await session.get_report()
+                summary = await session.get_global_summary()
+            return session, report, summary
+
+        async def evaluate_concurrently():
+            return await asyncio.gather(evaluate(), evaluate())
+
+        results = _run(evaluate_concurrently())
+
+        keys = set()
+        for session, report, summary in results:
+            assert not session.session.running
+            assert report.shape == (3 * 2, 10)
+            assert (report.session_id == session.session.session_key).all()
+            assert 'auc' in summary
+            keys.add(session.session.session_key)
+        assert len(keys) == 2
+
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_submit_without_scribbles(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        async def evaluate():
+            async with AsyncDavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    report_save_dir=tempfile.mkdtemp()) as session:
+                assert await session.next()
+                await session.submit_masks(np.ones((2, 480, 854)))
+
+        with pytest.raises(RuntimeError):
+            _run(evaluate())
+
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_batch(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        async def evaluate():
+            async with AsyncDavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    max_nb_interactions=2,
+                    report_save_dir=tempfile.mkdtemp(),
+                    max_time=None) as session:
+                count = 0
+                async for batch in session.scribbles_iterator(batch_size=2):
+                    await session.submit_masks_batch(
+                        [np.ones((2, 480, 854)) for _ in batch])
+                    count += 1
+                assert count == 4
+                return await session.get_report()
+
+        report = _run(evaluate())
+        assert report.shape == (2 * 2 * 2 * 1 + 2 * 2 * 2, 10)
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_timing_excludes_executor_queue(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        async def evaluate():
+            async with AsyncDavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    max_nb_interactions=1,
+                    report_save_dir=tempfile.mkdtemp(),
+                    executor=executor,
+                    max_time=None) as session:
+                async for _ in session.scribbles_iterator(read_only=True):
+                    mask = await session.get_scribbles_mask()
+                    assert mask.shape == (2, 480, 854)
+                    # Keep the only thread of the executor busy, so the
+                    # submission is queued
+                    busy = asyncio.get_event_loop().run_in_executor(
+                        executor, time.sleep, .5)
+                    await session.submit_masks(np.ones((2, 480, 854)))
+                    await busy
+                return await session.get_report()
+
+        report = _run(evaluate())
+        assert report.timing.max() < .5
+        assert mock_davis.call_count == 0
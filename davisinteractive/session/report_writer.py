@@ -0,0 +1,176 @@
+from __future__ import absolute_import, division
+
+import pickle
+import time
+
+import pandas as pd
+
+from .. import logging
+from ..common import Path
+
+__all__ = ['ReportWriter']
+
+
+class ReportWriter:
+    """ Incremental writer of the session report.
+
+    During the evaluation, the report is checkpointed to a temporal log file
+    where only the rows added since the last flush are appended. When the
+    evaluation finishes, the log is compacted into the final report, which is
+    always stored as a CSV file.
+
+    # Arguments
+        report_save_dir: String or Path. Directory where the report is stored.
+        report_name: String. Name of the report file without extension.
+        report_format: String. Format of the temporal log. `csv` stores it as
+            a CSV file with the same table as the final report, while `pickle`
+            appends every flushed chunk of rows as a pickled DataFrame, which
+            is faster to write.
+        flush_interactions: Integer. Flush the report every given number of
+            steps (calls to `DavisInteractiveSession.next`). If `None`, it is
+            only flushed based on `flush_seconds`.
+        flush_seconds: Float. Flush the report when the given number of
+            seconds have passed since the last flush. If `None`, it is only
+            flushed based on `flush_interactions`.
+
+    # Raises
+        ValueError: if the format is not valid or neither `flush_interactions`
+            nor `flush_seconds` are given.
+    """
+
+    FORMATS = ('csv', 'pickle')
+    _EXTENSIONS = {'csv': 'tmp.csv', 'pickle': 'tmp.pkl'}
+
+    def __init__(self,
+                 report_save_dir,
+                 report_name,
+                 report_format='csv',
+                 flush_interactions=1,
+                 flush_seconds=None):
+        if report_format not in self.FORMATS:
+            raise ValueError('report_format must be one of: {}'.format(
+                self.FORMATS))
+        if flush_interactions is None and flush_seconds is None:
+            raise ValueError('Either flush_interactions or flush_seconds must '
+                             'be specified')
+        self.report_save_dir = Path(report_save_dir)
+        self.report_name = report_name
+        self.report_format = report_format
+        self.flush_interactions = flush_interactions
+        self.flush_seconds = flush_seconds
+
+        self.nb_rows = 0
+        self.nb_pending_steps = 0
+        self.last_flush_time = time.time()
+
+    @property
+    def tmp_filename(self):
+        """ Path of the temporal log file. """
+        return self.report_save_dir.joinpath('%s.%s' % (
+            self.report_name, self._EXTENSIONS[self.report_format]))
+
+    @property
+    def filename(self):
+        """ Path of the final report file. """
+        return self.report_save_dir.joinpath('%s.csv' % self.report_name)
+
+    def step(self):
+        """ Register a new step of the evaluation.
+
+        # Returns
+            bool: Whether the report should be flushed.
+        """
+        self.nb_pending_steps += 1
+        if (self.flush_interactions is not None and
+                self.nb_pending_steps >= self.flush_interactions):
+            return True
+        if (self.flush_seconds is not None and
+                time.time() - self.last_flush_time >= self.flush_seconds):
+            return True
+        return False
+
+    def flush(self, report, since=0):
+        """ Append to the log the rows of the report not flushed yet.
+
+        # Arguments
+            report: Pandas DataFrame. Current report of the session, or only
+                its rows from position `since` on. The rows already flushed
+                are expected to be at the beginning of it.
+            since: Integer. Position on the report of the first row given.
+                Pass `nb_rows` to give only the rows not flushed yet, so the
+                whole report does not have to be read on every flush.
+        """
+        if since > self.nb_rows:
+            raise ValueError('The rows from {} to {} of the report are '
+                             'missing'.format(self.nb_rows, since))
+        new_rows = report.iloc[self.nb_rows - since:]
+        if self.report_format == 'csv':
+            header = self.nb_rows == 0
+            mode = 'w' if header else 'a'
+            new_rows.to_csv(self.tmp_filename, mode=mode, header=header)
+        else:
+            mode = 'wb' if self.nb_rows == 0 else 'ab'
+            with self.tmp_filename.open(mode) as fp:
+                pickle.dump(new_rows, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.nb_rows += len(new_rows)
+        self.nb_pending_steps = 0
+        self.last_flush_time = time.time()
+        logging.verbose(
+            'Flushed {} rows of the report to {}'.format(
+                len(new_rows), self.tmp_filename), 2)
+
+    def restore(self, report):
+        """ Start the log again with the rows of a previous report.
+
+        # Arguments
+            report: Pandas DataFrame. Report restored on the session. Its rows
+                are written as the beginning of the log.
+        """
+        self.nb_rows = 0
+        self.flush(report)
+
+    def read(self):
+        """ Read the report stored on the log.
+
+        # Returns
+            Pandas DataFrame: Report stored on the log.
+        """
+        if self.report_format == 'csv':
+            return pd.read_csv(
+                self.tmp_filename, index_col=0, float_precision='round_trip')
+
+        chunks = []
+        with self.tmp_filename.open('rb') as fp:
+            while True:
+                try:
+                    chunks.append(pickle.load(fp))
+                except EOFError:
+                    break
+                except pickle.UnpicklingError:
+                    logging.warning('The last chunk of the report log {} is '
+                                    'truncated. Ignoring it.'.format(
+                                        self.tmp_filename))
+                    break
+        return pd.concat(chunks)
+
+    def finish(self, report, since=0):
+        """ Flush the last rows and compact the log into the final report.
+
+        # Arguments
+            report: Pandas DataFrame. Final report of the session, or only
+                its rows from position `since` on.
+            since: Integer. See #ReportWriter.flush.
+
+        # Returns
+            Path: Path of the final report.
+        """
+        self.flush(report, since=since)
+        if self.report_format == 'csv':
+            # The log already has the same table as the final report
+            self.tmp_filename.replace(self.filename)
+        else:
+            self.read().to_csv(self.filename)
+            # Remove the temporal file
+            self.tmp_filename.unlink()
+        return self.filename
@@ -0,0 +1,115 @@
+from __future__ import absolute_import, division
+
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+import pytest
+
+from davisinteractive.common import Path
+from davisinteractive.session.report_writer import ReportWriter
+from davisinteractive.storage import LocalStorage
+
+
+def _report(nb_rows):
+    df = pd.DataFrame(columns=LocalStorage.COLUMNS)
+    for i in range(nb_rows):
+        df.loc[i] = ['session', 'bear', 1, i + 1, 1, 0, .1 * i, .2, .15, 1.5]
+    return df
+
+
+class TestReportWriter(unittest.TestCase):
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            ReportWriter(tempfile.mkdtemp(), 'report', report_format='xls')
+        with pytest.raises(ValueError):
+            ReportWriter(
+                tempfile.mkdtemp(),
+                'report',
+                flush_interactions=None,
+                flush_seconds=None)
+
+    def test_flush_interactions(self):
+        writer = ReportWriter(
+            tempfile.mkdtemp(), 'report', flush_interactions=3)
+        assert not writer.step()
+        assert not writer.step()
+        assert writer.step()
+        writer.flush(_report(0))
+        assert not writer.step()
+
+    def test_flush_seconds(self):
+        writer = ReportWriter(
+            tempfile.mkdtemp(),
+            'report',
+            flush_interactions=None,
+            flush_seconds=.1)
+        assert not writer.step()
+        time.sleep(.15)
+        assert writer.step()
+
+    def test_csv(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        writer = ReportWriter(tmp_dir, 'report')
+        assert writer.tmp_filename == tmp_dir / 'report.tmp.csv'
+
+        writer.flush(_report(0))
+        assert writer.tmp_filename.exists()
+        assert writer.read().shape == (0, 10)
+
+        writer.flush(_report(2))
+        writer.flush(_report(5))
+        assert writer.nb_rows == 5
+        df = writer.read()
+        assert df.shape == (5, 10)
+        assert list(df.index) == list(range(5))
+        assert list(df.interaction) == [1, 2, 3, 4, 5]
+
+        filename = writer.finish(_report(7))
+        assert filename == tmp_dir / 'report.csv'
+        assert not writer.tmp_filename.exists()
+        df = pd.read_csv(filename, index_col=0)
+        assert df.shape == (7, 10)
+        pd.testing.assert_frame_equal(df, _report(7), check_dtype=False)
+
+    def test_pickle(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        writer = ReportWriter(tmp_dir, 'report', report_format='pickle')
+        assert writer.tmp_filename == tmp_dir / 'report.tmp.pkl'
+
+        writer.flush(_report(0))
+        writer.flush(_report(3))
+        writer.flush(_report(4))
+        pd.testing.assert_frame_equal(writer.read(), _report(4))
+
+        filename = writer.finish(_report(6))
+        assert not writer.tmp_filename.exists()
+        df = pd.read_csv(filename, index_col=0)
+        pd.testing.assert_frame_equal(df, _report(6), check_dtype=False)
+
+    def test_flush_since(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        writer = ReportWriter(tmp_dir, 'report')
+        writer.flush(_report(3))
+        writer.flush(_report(5).iloc[3:], since=3)
+        assert writer.nb_rows == 5
+        with pytest.raises(ValueError):
+            writer.flush(_report(8).iloc[6:], since=6)
+
+        filename = writer.finish(_report(7).iloc[5:], since=5)
+        df = pd.read_csv(filename, index_col=0)
+        pd.testing.assert_frame_equal(df, _report(7), check_dtype=False)
+
+    def test_restore(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        writer = ReportWriter(tmp_dir, 'report', report_format='pickle')
+        writer.flush(_report(4))
+
+        writer = ReportWriter(tmp_dir, 'report', report_format='pickle')
+        writer.restore(_report(2))
+        assert writer.nb_rows == 2
+        pd.testing.assert_frame_equal(writer.read(), _report(2))
+        writer.flush(_report(3))
+        pd.testing.assert_frame_equal(writer.read(), _report(3))
@@ -0,0 +1,89 @@
+""" Selection and ordering of the samples evaluated by a session. """
+from __future__ import absolute_import, division
+
+import random
+from collections import OrderedDict
+
+__all__ = ['shard_samples', 'group_by_sequence', 'cache_reuse_ratio']
+
+
+def shard_samples(samples, shard, num_shards):
+    """ Select the samples of a shard of the evaluation.
+
+    The samples are sorted and split into `num_shards` contiguous blocks of
+    the same size (up to one sample of difference), so the shards are
+    disjoint, cover all the samples and do not depend on the order the
+    samples are given. Contiguous blocks keep the scribbles of a sequence on
+    the same shard as far as possible.
+
+    # Arguments
+        samples: List of Tuples. Pairs of sequence name and scribble index.
+        shard: Integer. Index of the shard, between 0 and `num_shards - 1`.
+        num_shards: Integer. Total number of shards.
+
+    # Returns
+        List of Tuples: Samples of the given shard.
+
+    # Raises
+        ValueError: if the shard is not valid.
+    """
+    if num_shards < 1:
+        raise ValueError('num_shards must be higher than 0.')
+    if not 0 <= shard < num_shards:
+        raise ValueError('shard must be between 0 and {}'.format(num_shards -
+                                                                  1))
+    samples = sorted(tuple(s) for s in samples)
+    start = len(samples) * shard // num_shards
+    end = len(samples) * (shard + 1) // num_shards
+    return samples[start:end]
+
+
+def group_by_sequence(samples, shuffle=False):
+    """ Order the samples keeping the ones of the same sequence together.
+
+    Evaluating the samples of a sequence consecutively lets every cache that
+    depends on the sequence (the ground truth annotations on the evaluation
+    side, or the model state and features on the user side) be reused. With
+    `shuffle`, the order of the sequences and the order of the samples within
+    every sequence are randomized, which keeps the evaluation order random at
+    the sequence level.
+
+    # Arguments
+        samples: List of Tuples. Pairs of sequence name and scribble index.
+        shuffle: Boolean. Whether to randomize the order.
+
+    # Returns
+        List of Tuples: Samples grouped by sequence. Without `shuffle`, the
+            sequences keep the order of their first sample.
+    """
+    groups = OrderedDict()
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(tuple(sample))
+    groups = list(groups.values())
+    if shuffle:
+        random.shuffle(groups)
+        for group in groups:
+            random.shuffle(group)
+    return [sample for group in groups for sample in group]
+
+
+def cache_reuse_ratio(samples):
+    """ Ratio of samples evaluated right after a sample of the same sequence.
+
+    This is the ratio of samples that find the per sequence caches warm when
+    only the data of the last sequence is kept. Grouping the samples by
+    sequence maximizes it to `1 - nb_sequences / nb_samples`, while a full
+    shuffle leaves it close to 0 when there are many sequences.
+
+    # Arguments
+        samples: List of Tuples. Pairs of sequence name and scribble index,
+            in the order they are evaluated.
+
+    # Returns
+        Float: Ratio between 0 and 1.
+    """
+    if not samples:
+        return 0.
+    nb_reused = sum(
+        prev[0] == sample[0] for prev, sample in zip(samples, samples[1:]))
+    return nb_reused / len(samples)
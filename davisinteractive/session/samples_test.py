@@ -0,0 +1,71 @@
+from __future__ import absolute_import, division
+
+import random
+import unittest
+
+import pytest
+
+from davisinteractive.session.samples import (cache_reuse_ratio,
+                                               group_by_sequence, shard_samples)
+
+
+class TestShardSamples(unittest.TestCase):
+
+    SAMPLES = [('bear', 1), ('bear', 2), ('bear', 3), ('dog', 1), ('dog', 2),
+               ('tennis', 1), ('tennis', 2)]
+
+    def test_disjoint(self):
+        shuffled = list(self.SAMPLES)
+        random.shuffle(shuffled)
+        shards = [shard_samples(shuffled, i, 3) for i in range(3)]
+        assert [len(s) for s in shards] == [2, 2, 3]
+        assert sum(shards, []) == self.SAMPLES
+        assert shards[0] == [('bear', 1), ('bear', 2)]
+
+    def test_more_shards_than_samples(self):
+        shards = [shard_samples(self.SAMPLES[:2], i, 4) for i in range(4)]
+        assert sum(shards, []) == self.SAMPLES[:2]
+        assert sum(len(s) == 0 for s in shards) == 2
+
+    def test_lists(self):
+        samples = [['dog', 1], ['bear', 1]]
+        assert shard_samples(samples, 0, 1) == [('bear', 1), ('dog', 1)]
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            shard_samples(self.SAMPLES, 0, 0)
+        with pytest.raises(ValueError):
+            shard_samples(self.SAMPLES, 3, 3)
+        with pytest.raises(ValueError):
+            shard_samples(self.SAMPLES, -1, 3)
+
+
+class TestGroupBySequence(unittest.TestCase):
+
+    SAMPLES = [('bear', 1), ('dog', 1), ('bear', 2), ('tennis', 1), ('dog', 2),
+               ('bear', 3)]
+
+    def test_group(self):
+        samples = group_by_sequence(self.SAMPLES)
+        assert samples == [('bear', 1), ('bear', 2), ('bear', 3), ('dog', 1),
+                           ('dog', 2), ('tennis', 1)]
+
+    def test_shuffle(self):
+        random.seed(1234)
+        orders = set()
+        for _ in range(20):
+            samples = group_by_sequence(self.SAMPLES, shuffle=True)
+            assert sorted(samples) == sorted(self.SAMPLES)
+            sequences = [s for s, _ in samples]
+            # Every sequence is a single contiguous run
+            runs = [s for i, s in enumerate(sequences)
+                    if i == 0 or sequences[i - 1] != s]
+            assert sorted(runs) == ['bear', 'dog', 'tennis']
+            orders.add(tuple(samples))
+        assert len(orders) > 1
+
+    def test_cache_reuse_ratio(self):
+        assert cache_reuse_ratio([]) == 0.
+        assert cache_reuse_ratio(self.SAMPLES) == 0.
+        grouped = group_by_sequence(self.SAMPLES, shuffle=True)
+        assert cache_reuse_ratio(grouped) == 1. - 3. / 6.
@@ -5,18 +5,93 @@ import json
 import os
 import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
 from .. import logging
 from ..common import Path
 from ..connector.fabric import ServerConnectionFabric
 from ..dataset import Davis
-from ..utils.scribbles import fuse_scribbles
+from ..storage import AbstractStorage
+from ..utils.scribbles import (draw_scribbles, freeze_scribbles,
+                               fuse_scribbles, scribbles2mask)
+from ..utils.timing import record_time
+from .report_writer import ReportWriter
+from .samples import cache_reuse_ratio, group_by_sequence, shard_samples
 
 __all__ = ['DavisInteractiveSession']
 
 
+class _SampleState:
+    """ State of a sample being evaluated.
+
+    It keeps the scribbles given for the sample and their read-only view and
+    mask, which are updated incrementally with every new scribble. It is
+    used by both the sequential and the batched modes.
+    """
+
+    def __init__(self, sample_idx, sequence, scribble_idx):
+        self.sample_idx = sample_idx
+        self.sequence = sequence
+        self.scribble_idx = scribble_idx
+        self.interaction_nb = 0
+        self.start_time = time.time()
+        self.interaction_start_time = None
+        self.timings = None
+        self.scribbles = None
+        self.last_scribble = None
+        self.scribbles_view = None
+        self.scribbles_mask = None
+
+    def set_initial_scribbles(self, scribbles):
+        self.scribbles = scribbles
+        self.last_scribble = scribbles
+
+    def get_scribbles(self, only_last=False, read_only=False):
+        """ Scribbles to give to the user. See
+        #DavisInteractiveSession.get_scribbles.
+        """
+        if read_only and only_last:
+            return freeze_scribbles(self.last_scribble)
+        elif read_only:
+            if self.scribbles_view is None:
+                self.scribbles_view = freeze_scribbles(self.scribbles)
+            return self.scribbles_view
+        elif only_last:
+            return deepcopy(self.last_scribble)
+        # Create a copy to not pass a reference
+        return deepcopy(self.scribbles)
+
+    def get_scribbles_mask(self, shape, read_only=False):
+        """ Mask of the scribbles with the given (H x W) `shape`. See
+        #DavisInteractiveSession.get_scribbles_mask.
+        """
+        if self.scribbles_mask is None:
+            self.scribbles_mask = scribbles2mask(
+                self.scribbles, shape, dtype=np.int8)
+        if read_only:
+            mask = self.scribbles_mask.view()
+            mask.flags.writeable = False
+            return mask
+        return self.scribbles_mask.copy()
+
+    def add_scribble(self, last_scribble):
+        """ Add the scribble returned by the robot. """
+        self.last_scribble = last_scribble
+        self.scribbles = fuse_scribbles(self.scribbles, last_scribble)
+        if self.scribbles_view is not None:
+            # Only the new paths are converted on the read-only view
+            self.scribbles_view = fuse_scribbles(self.scribbles_view,
+                                                 last_scribble)
+        if self.scribbles_mask is not None:
+            # Only the new paths are drawn on the mask
+            draw_scribbles(self.scribbles_mask, last_scribble)
+
+
 class DavisInteractiveSession:
     """ Class which allows to interface with the evaluation.
 
@@ -33,6 +108,14 @@ class DavisInteractiveSession:
             performed against a remote server, this parameter is ignored
             and the subset will be given by the remote server.
         shuffle: Boolean. Shuffle the samples when evaluating.
+        group_by_sequence: Boolean. Evaluate the samples of the same sequence
+            consecutively. With `shuffle`, the order of the sequences and the
+            order of the samples within each sequence are randomized, instead
+            of the order of all the samples. This maximizes the reuse of any
+            per sequence cache, both on the evaluation and on the user's
+            model, at the cost of randomizing the order only at the sequence
+            level. It also applies to the samples given by a remote server,
+            which are always shuffled. Default False.
         max_time: Integer. Maximum time to evaluate a sample (a sequence with
             a certain set of initial scribbles). This time should be set per
             object as it adapts to the number of objects internally. If
@@ -47,53 +130,207 @@ class DavisInteractiveSession:
             be stored during the evaluation. By default is the current working
             directory. A temporal file will be storing snapshots of the results
             on this same directory with a suffix `.tmp`.
+        report_format: String. Format of the temporal report file. With `csv`
+            (default) the temporal file has the same table as the final
+            report. With `pickle` the new rows are appended as binary chunks,
+            which is faster. The final report is always stored as a CSV file.
+        report_flush_interactions: Integer. Number of interactions between
+            every update of the temporal report file. If `None`, the updates
+            are only based on `report_flush_seconds`. Default 1. Only the
+            rows added since the last update are read and written, so the
+            cost of an update does not grow with the report.
+        report_flush_seconds: Float. Maximum number of seconds between every
+            update of the temporal report file. By default, it is not used.
+        prefetch: Boolean. Whether to load the scribbles of the next sample
+            and warm up the evaluation data of the current and the next
+            sequences in a background thread while the user's model is
+            working. Default False.
+        async_submit: Boolean. Whether to submit the masks asynchronously.
+            If `True`, `submit_masks` returns immediately and the evaluation
+            of the masks and the generation of the next scribble are done in
+            a background thread. The next call to `get_scribbles` waits for
+            the result only if it needs the new scribble. The timing of the
+            interactions is not affected. Default False.
+        checkpoint: String or Path. Path to a checkpoint file to resume the
+            session if it is interrupted. If the file does not exist, a new
+            session is started and its state (session key, order of the
+            samples and completed samples) is saved to it every time a sample
+            is completed, together with the temporal report file. If it
+            exists, the session is resumed: the results of the completed
+            samples are restored from the temporal report and the evaluation
+            continues from the first incomplete sample. The report of a
+            resumed session is stored on the same file as the original one.
+            Only available on local evaluation.
+        save_timings: Boolean. Whether to store the time spent on every phase
+            of the interactions (see
+            #DavisInteractiveSession.get_timings) on the report directory
+            when the evaluation finishes, on a file with the same name as the
+            report and suffix `.timings.csv`. Default False.
+        shard: Integer. Index of the shard of samples to evaluate, between 0
+            and `num_shards - 1`. The samples are split deterministically in
+            `num_shards` disjoint shards (see
+            #davisinteractive.session.samples.shard_samples), so several
+            workers can evaluate a subset each. The global summary of a
+            shard only covers its own samples: the reports of all the shards
+            must be merged with #davisinteractive.evaluation.merge to obtain
+            the summary of the whole subset. Only available on local
+            evaluation.
+        num_shards: Integer. Total number of shards. Must be given with
+            `shard`.
+        shared_service: Boolean. Whether to share the evaluation service with
+            the other local sessions of the process with the same subset,
+            DAVIS root, limits and metric, instead of creating a new one for
+            this session. The files of the dataset are only checked once and
+            the cached data is reused by all of them. Only used on local
+            evaluation. Default False.
+        downsample: Integer. Factor by which the resolution of the
+            evaluation is reduced, for faster evaluations during development
+            (for instance 2 to evaluate at 240p). The masks can be submitted
+            either at full or at the reduced resolution and the scribbles are
+            returned as usual. The results are only an approximation of the
+            ones at full resolution, so the name of the report includes the
+            resolution (e.g. `result_<date>_240p.csv`). Only available on
+            local evaluation. Default 1.
+        resolution: String. Resolution of the DAVIS dataset to evaluate, for
+            instance `Full-Resolution` to evaluate the masks at the original
+            size of the videos (1080p and higher). The annotations of the
+            resolution must be in `davis_root`. The metrics are computed by
+            chunks of frames and tiles to bound the memory used, and the name
+            of the report includes the resolution. The masks must be submitted
+            at the size of the annotations. By default 480p. Only available on
+            local evaluation.
+        spill_dir: String or Path. Directory where the storage of the
+            evaluation service spills the results of the finished sessions,
+            to bound the memory of long running processes evaluating many
+            sessions with `shared_service` (see
+            #davisinteractive.storage.local.LocalStorage). The report of a
+            spilled session is still available. By default, the results are
+            kept in memory. Only used on local evaluation.
+        session_ttl: Float. Seconds after which the storage spills the
+            results of an idle session. Requires `spill_dir`. Only used on
+            local evaluation.
     """
 
+    TIMING_PHASES = ('get_scribble', 'copy', 'model', 'submit',
+                     'load_annotations', 'metrics', 'storage', 'robot',
+                     'encode', 'request', 'report')
+
     def __init__(self,
                  host='localhost',
                  user_key=None,
                  davis_root=None,
                  subset='val',
                  shuffle=False,
+                 group_by_sequence=False,
                  max_time=None,
                  max_nb_interactions=5,
                  metric_to_optimize='J_AND_F',
-                 report_save_dir=None):
+                 report_save_dir=None,
+                 report_format='csv',
+                 report_flush_interactions=1,
+                 report_flush_seconds=None,
+                 prefetch=False,
+                 async_submit=False,
+                 checkpoint=None,
+                 save_timings=False,
+                 shard=None,
+                 num_shards=None,
+                 shared_service=False,
+                 downsample=1,
+                 resolution=None,
+                 spill_dir=None,
+                 session_ttl=None):
         self.davis_root = davis_root
+        self.downsample = downsample
+        self.resolution = resolution
+        self._davis = None
 
         self.subset = subset
         self.shuffle = shuffle
+        self.group_by_sequence = group_by_sequence
         self.max_time = min(max_time,
                             10 * 60) if max_time is not None else max_time
         self.max_nb_interactions = min(
             max_nb_interactions,
             16) if max_nb_interactions is not None else max_nb_interactions
         self.metric_to_optimize = metric_to_optimize
+        if (shard is None) != (num_shards is None):
+            raise ValueError('shard and num_shards must be given together')
+        if num_shards is not None and not 0 <= shard < num_shards:
+            raise ValueError('shard must be between 0 and num_shards - 1')
+        if num_shards is not None and host != 'localhost':
+            raise ValueError(
+                'The sharded evaluation is only available on local evaluation')
+        self.shard = shard
+        self.num_shards = num_shards
 
         self.running_model = False
         self.running = True
 
+        # Load the state of the session to resume
+        if checkpoint and host != 'localhost':
+            raise ValueError(
+                'The checkpoints are only available on local evaluation')
+        self.checkpoint = Path(checkpoint) if checkpoint else None
+        self._checkpoint_state = None
+        if self.checkpoint is not None and self.checkpoint.exists():
+            with open(str(self.checkpoint)) as fp:
+                self._checkpoint_state = json.load(fp)
+            report_format = self._checkpoint_state['report_format']
+            logging.info('Resuming session from {}'.format(self.checkpoint))
+        self._completed_samples = set()
+
         # User and session key
         self.user_key = user_key
-        self.session_key = binascii.hexlify(os.urandom(32)).decode()
+        if self._checkpoint_state is not None:
+            self.session_key = self._checkpoint_state['session_key']
+        else:
+            self.session_key = binascii.hexlify(os.urandom(32)).decode()
         self.connector = ServerConnectionFabric.get_connector(
-            host, self.user_key, self.session_key)
+            host,
+            self.user_key,
+            self.session_key,
+            shared_service=shared_service,
+            spill_dir=spill_dir,
+            session_ttl=session_ttl)
 
         self.samples = None
         self.sample_idx = None
-        self.interaction_nb = None
-        self.sample_start_time = None
-        self.sample_scribbles = None
-        self.sample_last_scribble = None
-        self.interaction_start_time = None
+        self._sample = None
 
         self.report_save_dir = report_save_dir or os.getcwd()
         self.report_save_dir = Path(self.report_save_dir)
         # Crete the directory if does not exists
         if not self.report_save_dir.exists():
             self.report_save_dir.mkdir(parents=True)
-        self.report_name = 'result_%s' % datetime.now().strftime(
-            '%Y%m%d_%H%M%S')
+        if self._checkpoint_state is not None:
+            self.report_name = self._checkpoint_state['report_name']
+        else:
+            self.report_name = 'result_%s' % datetime.now().strftime(
+                '%Y%m%d_%H%M%S')
+            if downsample != 1 or resolution is not None:
+                self.report_name += '_' + Davis.resolution_tag(
+                    downsample, resolution)
+        self.report_writer = ReportWriter(
+            self.report_save_dir,
+            self.report_name,
+            report_format=report_format,
+            flush_interactions=report_flush_interactions,
+            flush_seconds=report_flush_seconds)
+
+        self.prefetch = prefetch
+        self._prefetch_executor = None
+        self._prefetched_scribbles = {}
+
+        self.async_submit = async_submit
+        self._submit_executor = None
+        self._pending_submission = None
+
+        self._batch = None
+        self._batch_start_time = None
+
+        self.save_timings = save_timings
+        self._timings = []
 
         self.global_summary = {}
 
@@ -104,8 +341,17 @@ class DavisInteractiveSession:
             self.max_time,
             self.max_nb_interactions,
             davis_root=self.davis_root,
-            metric_to_optimize=self.metric_to_optimize)
-        if self.shuffle:
+            metric_to_optimize=self.metric_to_optimize,
+            downsample=self.downsample,
+            resolution=self.resolution)
+        if self.num_shards is not None:
+            samples = shard_samples(samples, self.shard, self.num_shards)
+            logging.info('Evaluating shard {} of {}'.format(
+                self.shard, self.num_shards))
+        if self.group_by_sequence:
+            logging.verbose('Grouping samples by sequence', 1)
+            samples = group_by_sequence(samples, shuffle=self.shuffle)
+        elif self.shuffle:
             logging.verbose('Shuffling samples', 1)
             random.shuffle(samples)
         self.samples = samples
@@ -119,12 +365,171 @@ class DavisInteractiveSession:
             raise ValueError(
                 'Both max_time and max_nb_interactions can not be None')
 
+        if self._checkpoint_state is not None:
+            self._restore_checkpoint()
+        elif self.checkpoint is not None:
+            self._save_checkpoint()
+        logging.verbose(
+            'Ratio of samples following one of the same sequence: '
+            '{:.2f}'.format(self.cache_reuse_ratio), 1)
+
         self.sample_idx = -1
-        self.interaction_nb = -1
+        self._sample = None
+
+        if self.prefetch:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        if self.async_submit:
+            self._submit_executor = ThreadPoolExecutor(max_workers=1)
         return self
 
     def __exit__(self, type_, value, traceback):
-        pass
+        if self._submit_executor is not None:
+            self._submit_executor.shutdown(wait=True)
+            self._submit_executor = None
+            self._pending_submission = None
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True)
+            self._prefetch_executor = None
+            self._prefetched_scribbles = {}
+
+    @property
+    def cache_reuse_ratio(self):
+        """ Ratio of samples evaluated right after a sample of the same
+        sequence, for which the per sequence caches are warm (see
+        #davisinteractive.session.samples.cache_reuse_ratio).
+        """
+        return cache_reuse_ratio(self.samples or [])
+
+    @property
+    def interaction_nb(self):
+        """ Number of interactions submitted for the current sample. """
+        return -1 if self._sample is None else self._sample.interaction_nb
+
+    @property
+    def sample_scribbles(self):
+        """ All the scribbles given for the current sample. """
+        return None if self._sample is None else self._sample.scribbles
+
+    @property
+    def sample_last_scribble(self):
+        """ Last scribble given for the current sample. """
+        return None if self._sample is None else self._sample.last_scribble
+
+    def _finish(self):
+        """ Finish the evaluation and store the final report. """
+        self.global_summary = self.connector.post_finish()
+        with record_time(self._last_timings(), 'report'):
+            self._flush_report(finish=True)
+        self.running = False
+        if self.checkpoint is not None:
+            self._save_checkpoint()
+        if self.save_timings:
+            self.get_timings().to_csv(
+                self.report_save_dir.joinpath(
+                    '%s.timings.csv' % self.report_name))
+
+    def _last_timings(self):
+        return self._timings[-1] if self._timings else None
+
+    def _settings(self):
+        settings = {
+            'subset': self.subset,
+            'max_time': self.max_time,
+            'max_nb_interactions': self.max_nb_interactions,
+            'metric_to_optimize': self.metric_to_optimize,
+            'shard': self.shard,
+            'num_shards': self.num_shards,
+        }
+        if self.downsample != 1:
+            settings['downsample'] = self.downsample
+        if self.resolution is not None:
+            settings['resolution'] = self.resolution
+        return settings
+
+    def _save_checkpoint(self):
+        """ Save the state of the session on the checkpoint file.
+
+        The file is replaced atomically, so an interruption while saving it
+        keeps the previous checkpoint.
+        """
+        state = {
+            'session_key': self.session_key,
+            'report_name': self.report_name,
+            'report_format': self.report_writer.report_format,
+            'settings': self._settings(),
+            'samples': [list(s) for s in self.samples],
+            'completed_samples': sorted(self._completed_samples),
+        }
+        tmp_file = self.checkpoint.with_name(self.checkpoint.name + '.tmp')
+        with open(str(tmp_file), 'w') as fp:
+            json.dump(state, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        tmp_file.replace(self.checkpoint)
+        logging.verbose('Saved checkpoint to {}'.format(self.checkpoint), 2)
+
+    def _restore_checkpoint(self):
+        """ Restore the samples and results of the session to resume. """
+        state = self._checkpoint_state
+        if state['settings'] != self._settings():
+            raise ValueError(
+                'The settings of the session {} do not match the ones of the '
+                'checkpoint {}'.format(self._settings(), state['settings']))
+        self.samples = [tuple(s) for s in state['samples']]
+        self._completed_samples = set(state['completed_samples'])
+
+        # Only the results of the completed samples are kept, the incomplete
+        # ones are evaluated again from the beginning
+        writer = self.report_writer
+        if writer.tmp_filename.exists():
+            report = writer.read()
+        elif writer.filename.exists():
+            report = pd.read_csv(
+                writer.filename, index_col=0, float_precision='round_trip')
+        else:
+            report = pd.DataFrame(columns=AbstractStorage.COLUMNS)
+        completed = set(self.samples[i] for i in self._completed_samples)
+        keep = [(seq, idx) in completed
+                for seq, idx in zip(report['sequence'], report['scribble_idx'])]
+        report = report.loc[keep]
+        self.connector.restore_report(report)
+        writer.restore(self.get_report())
+
+        logging.info('Resumed session with {} of {} samples completed'.format(
+            len(self._completed_samples), len(self.samples)))
+
+    def _complete_sample(self, sample_idx):
+        """ Mark a sample as completed and save the checkpoint. """
+        self._completed_samples.add(sample_idx)
+        if self.checkpoint is None:
+            return
+        # The results of the sample must be on the report before saving it
+        self._wait_submission()
+        self._flush_report()
+        self._save_checkpoint()
+
+    def _warm_up_sequence(self, sequence):
+        try:
+            self.connector.prefetch_sequence(sequence)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning('Prefetch of sequence {} failed: {}'.format(
+                sequence, e))
+
+    def _prefetch_samples(self, sample_idx):
+        """ Prefetch the given sample and the following one.
+
+        The scribbles are fetched and the evaluation data of the sequence is
+        warmed up on a background thread.
+        """
+        for idx in (sample_idx, sample_idx + 1):
+            if idx >= len(self.samples) or idx in self._prefetched_scribbles:
+                continue
+            sequence, scribble_idx = self.samples[idx]
+            if idx > sample_idx:
+                self._prefetched_scribbles[idx] = (
+                    self._prefetch_executor.submit(self.connector.get_scribble,
+                                                   sequence, scribble_idx))
+            self._prefetch_executor.submit(self._warm_up_sequence, sequence)
 
     def next(self):
         """ Iterate to the next iteration/sample of the evaluation process.
@@ -143,57 +548,34 @@ class DavisInteractiveSession:
         # the next sequence and so on
 
         c_time = time.time()
-
-        # sample_change = self.sample_idx < 0
-        sample_change = self.sample_idx < 0
-        if self.max_nb_interactions:
-            change_because_interaction = self.interaction_nb >= self.max_nb_interactions
-            sample_change |= change_because_interaction
-            if change_because_interaction:
-                logging.info('Maximum number of interaction have been reached.')
-        if self.max_time and self.sample_start_time:
-            seq, _ = self.samples[self.sample_idx]
-            nb_objects = Davis.dataset[seq]['num_objects']
-            max_time = self.max_time * nb_objects
-            change_because_timing = (c_time - self.sample_start_time) > max_time
-            sample_change |= change_because_timing
-            if change_because_timing:
-                logging.info('Maximum time per sample has been reached.')
+        sample_change = (self._sample is None or
+                         self._sample_finished(self._sample, c_time))
 
         if sample_change:
+            if self._sample is not None:
+                self._complete_sample(self._sample.sample_idx)
             self.sample_idx += 1
             self.sample_idx = max(self.sample_idx, 0)
-            self.interaction_nb = 0
-            self.sample_start_time = time.time()
-            self.sample_scribbles = None
-            self.sample_last_scribble = None
+            # Skip the samples completed before resuming the session
+            while self.sample_idx in self._completed_samples:
+                self.sample_idx += 1
+            self._sample = None
+            if self.sample_idx < len(self.samples):
+                self._sample = self._start_sample(self.sample_idx)
 
         end = self.sample_idx >= len(self.samples)
-        if not end and sample_change:
-            seq, _ = self.samples[self.sample_idx]
-            logging.info('Start evaluation for sequence %s' % seq)
 
         # Save report on final version if the evaluation ends
         if end:
-            self.global_summary = self.connector.post_finish()
-            df = self.get_report()
-            report_filename = self.report_save_dir.joinpath(
-                '%s.csv' % self.report_name)
-            df.to_csv(report_filename)
-            # Remove the temporal file
-            tmp_report_filename = self.report_save_dir.joinpath(
-                '%s.tmp.csv' % self.report_name)
-            tmp_report_filename.unlink()
-            self.running = False
-        else:
-            df = self.get_report()
-            tmp_report_filename = self.report_save_dir.joinpath(
-                '%s.tmp.csv' % self.report_name)
-            df.to_csv(tmp_report_filename)
+            self._wait_submission()
+            self._finish()
+        elif self.report_writer.step():
+            with record_time(self._last_timings(), 'report'):
+                self._flush_report()
 
         return not end
 
-    def get_scribbles(self, only_last=False):
+    def get_scribbles(self, only_last=False, read_only=False):
         """ Ask for the next scribble
 
         There is the possibility to ask for only the last scribble. By default,
@@ -206,6 +588,15 @@ class DavisInteractiveSession:
 
         # Arguments
             only_last: Boolean.
+            read_only: Boolean. By default, a deep copy of the scribbles is
+                returned. If `True`, a read-only view of them is returned
+                instead (see
+                #davisinteractive.utils.scribbles.freeze_scribbles), where
+                the paths are read-only Numpy Arrays. The view is updated
+                incrementally, so no copy of the previous paths is made on
+                every interaction. Use
+                #davisinteractive.utils.scribbles.thaw_scribbles to obtain a
+                modifiable copy.
 
         # Returns
             (string, dict, bool): Returns the name of the sequence of the
@@ -218,29 +609,42 @@ class DavisInteractiveSession:
                 'You can not call get_scribbles twice without submitting the '
                 'masks first')
 
-        sequence, scribble_idx = self.samples[self.sample_idx]
-        new_sequence = False
-        if self.interaction_nb == 0 and self.sample_scribbles is None:
-            self.sample_scribbles = self.connector.get_scribble(
-                sequence, scribble_idx)
-            self.sample_last_scribble = self.sample_scribbles
-            new_sequence = True
+        # Wait for the scribble of the previous submission of this sample
+        self._wait_submission(only_current_sample=True)
 
-        self.interaction_start_time = time.time()
+        sequence, scribbles, new_sequence = self._give_scribbles(
+            self._sample, only_last=only_last, read_only=read_only)
         self.running_model = True
-
-        if only_last:
-            scribbles = self.sample_last_scribble
-        else:
-            scribbles = self.sample_scribbles
-
-        # Create a copy to not pass a reference
-        scribbles = deepcopy(scribbles)
-
         logging.info('Giving scribble to the user')
 
         return sequence, scribbles, new_sequence
 
+    def _give_scribbles(self, state, only_last=False, read_only=False):
+        """ Scribbles of a sample to give to the user, loading its initial
+        scribble on the first interaction. """
+        state.timings = {
+            'sequence': state.sequence,
+            'scribble_idx': state.scribble_idx,
+            'interaction': state.interaction_nb + 1,
+        }
+        new_sequence = state.scribbles is None
+        if new_sequence:
+            with record_time(state.timings, 'get_scribble'):
+                prefetched = self._prefetched_scribbles.pop(
+                    state.sample_idx, None)
+                if prefetched is not None:
+                    scribbles = prefetched.result()
+                else:
+                    scribbles = self.connector.get_scribble(
+                        state.sequence, state.scribble_idx)
+            state.set_initial_scribbles(scribbles)
+
+        state.interaction_start_time = time.time()
+        with record_time(state.timings, 'copy'):
+            scribbles = state.get_scribbles(
+                only_last=only_last, read_only=read_only)
+        return state.sequence, scribbles, new_sequence
+
     def scribbles_iterator(self, *args, **kwargs):
         """ Iterate over all the samples and iterations to evaluate.
 
@@ -255,7 +659,31 @@ class DavisInteractiveSession:
             # Predict with model
         ```
 
+        If `batch_size` is given, several samples are evaluated at the same
+        time and a list with an entry for every sample in the batch is
+        yielded. The masks of all of them must be submitted together with
+        #DavisInteractiveSession.submit_masks_batch:
+
+        ```python
+        for batch in sess.scribbles_iterator(batch_size=8):
+            sequences, scribbles, new_sequences = zip(*batch)
+            # Predict the batch with model
+            sess.submit_masks_batch(pred_masks)
+        ```
+
+        A sample leaves the batch when it reaches the maximum number of
+        interactions or time, and its place is taken by the next sample, so
+        the last batches can be smaller. The interactions are submitted
+        synchronously in this mode.
+
         # Arguments
+            batch_size: Integer. Number of samples to evaluate at the same
+                time. By default, samples are evaluated one by one. The
+                samples in the batch share the time of the prediction: the
+                timing reported for every sample is the time of the batch
+                divided by the number of samples in it. As the AUC is
+                computed over the time, it is not comparable with the one of
+                a sequential evaluation of the same model.
             *args, **kwargs: This arguments will be passed internally to
                 #DavisInteractiveSession.get_scribbles method.
 
@@ -263,70 +691,357 @@ class DavisInteractiveSession:
         `(string, dict, bool)`: Yields the name of the sequence of the
                 current sample, the scribbles of the current sample and a
                 boolean indicating if it is the first iteration of the given
-                sample, respectively.
+                sample, respectively. In batched mode, a list of them is
+                yielded.
+
+        # Raises
+            ValueError: if `batch_size` is lower than 1 or it is given to a
+                session submitting the masks asynchronously.
         """
+        batch_size = kwargs.pop('batch_size', None)
+        if batch_size is not None:
+            if batch_size < 1:
+                raise ValueError('batch_size must be higher than 0.')
+            if self.async_submit:
+                raise ValueError('batch_size can not be used with '
+                                 'async_submit')
+            for batch in self._batch_iterator(batch_size, *args, **kwargs):
+                yield batch
+            return
         while self.next():
             yield self.get_scribbles(*args, **kwargs)
 
+    def _sample_timed_out(self, state, current_time):
+        if not self.max_time:
+            return False
+        nb_objects = Davis.dataset[state.sequence]['num_objects']
+        return (current_time - state.start_time) > self.max_time * nb_objects
+
+    def _sample_finished(self, state, current_time):
+        """ Whether a sample has reached the maximum number of interactions
+        or the maximum time. """
+        if (self.max_nb_interactions and
+                state.interaction_nb >= self.max_nb_interactions):
+            logging.info('Maximum number of interaction have been reached.')
+            return True
+        if self._sample_timed_out(state, current_time):
+            logging.info('Maximum time per sample has been reached.')
+            return True
+        return False
+
+    def _start_sample(self, sample_idx):
+        """ Start the evaluation of a sample. """
+        sequence, scribble_idx = self.samples[sample_idx]
+        logging.info('Start evaluation for sequence %s' % sequence)
+        if self._prefetch_executor is not None:
+            self._prefetch_samples(sample_idx)
+        return _SampleState(sample_idx, sequence, scribble_idx)
+
+    def _batch_iterator(self, batch_size, only_last=False, read_only=False):
+        if self.sample_idx is not None and self.sample_idx >= 0:
+            raise RuntimeError('The batched mode can not be used once the '
+                               'evaluation has started sample by sample')
+
+        next_sample_idx = 0
+        active = []
+        while True:
+            # Remove the finished samples and fill the batch with new ones
+            c_time = time.time()
+            finished = [
+                state for state in active
+                if self._sample_finished(state, c_time)
+            ]
+            for state in finished:
+                self._complete_sample(state.sample_idx)
+            active = [s for s in active if s not in finished]
+            while len(active) < batch_size and next_sample_idx < len(
+                    self.samples):
+                if next_sample_idx not in self._completed_samples:
+                    active.append(self._start_sample(next_sample_idx))
+                next_sample_idx += 1
+            self.sample_idx = next_sample_idx - 1
+
+            if not active:
+                self._finish()
+                return
+            if self.report_writer.step():
+                with record_time(self._last_timings(), 'report'):
+                    self._flush_report()
+
+            batch = [
+                self._give_scribbles(
+                    state, only_last=only_last, read_only=read_only)
+                for state in active
+            ]
+            logging.info('Giving a batch of {} scribbles to the user'.format(
+                len(batch)))
+
+            self._batch = active
+            self._batch_start_time = time.time()
+            self.running_model = True
+            yield batch
+
+            if self.running_model:
+                raise RuntimeError('The masks of the batch must be submitted '
+                                   'before asking for the next batch')
+
+    def submit_masks_batch(self,
+                           pred_masks,
+                           next_scribble_frame_candidates=None):
+        """ Submit the predicted masks of all the samples in the batch.
+
+        Only available when iterating with
+        `DavisInteractiveSession.scribbles_iterator(batch_size=...)`.
+
+        # Arguments
+            pred_masks: List of Numpy arrays or Numpy array with the
+                predicted masks of every sample in the batch, in the same
+                order they were given. See
+                #DavisInteractiveSession.submit_masks.
+            next_scribble_frame_candidates: List with an optional list of
+                frame candidates per sample. See
+                #DavisInteractiveSession.submit_masks.
+
+        # Raises
+            RuntimeError: if there is not any batch waiting for the masks.
+            ValueError: if the number of masks does not match the size of
+                the batch.
+        """
+        self._submit_masks_batch(pred_masks, next_scribble_frame_candidates,
+                                 time.time())
+
+    def _submit_masks_batch(self, pred_masks, next_scribble_frame_candidates,
+                            time_end):
+        """ Submit the predicted masks of a batch whose prediction ended at
+        `time_end`. """
+        if not self.running_model or self._batch is None:
+            raise RuntimeError('You must have iterated a batch before '
+                               'submiting the masks')
+        if len(pred_masks) != len(self._batch):
+            raise ValueError('Expected {} predicted masks and {} were '
+                             'given'.format(len(self._batch), len(pred_masks)))
+        if next_scribble_frame_candidates is None:
+            next_scribble_frame_candidates = [None] * len(self._batch)
+        elif len(next_scribble_frame_candidates) != len(self._batch):
+            raise ValueError('Expected {} lists of frame candidates'.format(
+                len(self._batch)))
+
+        self.running_model = False
+        batch_timing = time_end - self._batch_start_time
+        self._batch_start_time = None
+        logging.info(
+            'The model took {:.3f} seconds to predict a batch of {}'.format(
+                batch_timing, len(self._batch)))
+        # The prediction time is shared among all the samples of the batch
+        timing = batch_timing / len(self._batch)
+
+        for state, masks, candidates in zip(self._batch, pred_masks,
+                                            next_scribble_frame_candidates):
+            self._submit_sample(state, masks, timing, time_end, candidates)
+        self._batch = None
+
     def submit_masks(self, pred_masks, next_scribble_frame_candidates=None):
         """ Submit the predicted masks.
 
         # Arguments
             pred_masks: Numpy array with the predicted mask for
                 the current sample. The array must be of `dtype=np.int` and
-                of size equal to the 480p resolution of the DAVIS
-                dataset.
+                of size equal to the resolution of the DAVIS dataset being
+                evaluated (480p by default, see the `resolution` argument).
+                With `downsample`, it can also be of the reduced size. If
+                the session submits asynchronously, the array is
+                read in a background thread so it must not be modified after
+                submitting it.
             next_scribble_frame_candidates: List of Integers. Optional value
                 specifying the possible frames from which generate the next
                 scribble. If values given, the next scribble will be performed
                 in the frame where the evaluation metric scores the least on
                 the list of given frames. Invalid frames indexes are ignored.
         """
+        self._submit_masks(pred_masks, next_scribble_frame_candidates,
+                           time.time())
+
+    def _submit_masks(self, pred_masks, next_scribble_frame_candidates,
+                      time_end):
+        """ Submit the predicted masks of a prediction that ended at
+        `time_end`. """
         if not self.running_model:
             raise RuntimeError('You must have called .get_scribbles before '
                                'submiting the masks')
 
-        time_end = time.time()
-        self.interaction_nb += 1
         self.running_model = False
-
-        seq, _ = self.samples[self.sample_idx]
-        nb_objects = Davis.dataset[seq]['num_objects']
-        if self.max_time:
-            max_t = self.max_time * nb_objects
-            if (time_end - self.sample_start_time) > max_t:
-                logging.warning(
-                    ("This submission has been done after the timeout which "
-                     "was {}s. This submission won't be evaluated"
-                    ).format(max_t))
-                return
-
-        timing = time_end - self.interaction_start_time
-        self.interaction_start_time = None
+        timing = time_end - self._sample.interaction_start_time
         logging.info(
             'The model took {:.3f} seconds to make a prediction'.format(timing))
+        self._submit_sample(self._sample, pred_masks, timing, time_end,
+                            next_scribble_frame_candidates)
+
+    def _submit_sample(self, state, pred_masks, timing, time_end,
+                       next_scribble_frame_candidates):
+        """ Submit the masks of an interaction of a sample and add the
+        scribble returned by the robot to it. """
+        state.interaction_nb += 1
+        state.interaction_start_time = None
+        timings, state.timings = state.timings, None
+        timings['model'] = timing
+        self._timings.append(timings)
+
+        if self._sample_timed_out(state, time_end):
+            logging.warning(
+                ("The submission for sample {} has been done after the "
+                 "timeout which was {}s. This submission won't be evaluated"
+                ).format(
+                    state.sample_idx, self.max_time *
+                    Davis.dataset[state.sequence]['num_objects']))
+            return
 
-        sequence, scribble_idx = self.samples[self.sample_idx]
+        if self._submit_executor is not None:
+            # Surface any error of the previous submission before queuing
+            self._wait_submission()
+            future = self._submit_executor.submit(
+                self._post_masks, state.sequence, state.scribble_idx,
+                pred_masks, timing, state.interaction_nb,
+                next_scribble_frame_candidates, timings)
+            self._pending_submission = (state, future)
+            return
 
-        self.sample_last_scribble = self.connector.post_predicted_masks(
-            sequence,
-            scribble_idx,
-            pred_masks,
-            timing,
-            self.interaction_nb,
-            next_scribble_frame_candidates=next_scribble_frame_candidates)
-        self.sample_scribbles = fuse_scribbles(self.sample_scribbles,
-                                               self.sample_last_scribble)
+        last_scribble = self._post_masks(
+            state.sequence, state.scribble_idx, pred_masks, timing,
+            state.interaction_nb, next_scribble_frame_candidates, timings)
+        state.add_scribble(last_scribble)
+
+    def _post_masks(self, sequence, scribble_idx, pred_masks, timing,
+                    interaction, next_scribble_frame_candidates, timings):
+        with record_time(timings, 'submit'):
+            return self.connector.post_predicted_masks(
+                sequence,
+                scribble_idx,
+                pred_masks,
+                timing,
+                interaction,
+                next_scribble_frame_candidates=next_scribble_frame_candidates,
+                timings=timings)
+
+    def _wait_submission(self, only_current_sample=False):
+        """ Wait for the pending asynchronous submission, if any.
+
+        # Arguments
+            only_current_sample: Boolean. Only wait if the pending submission
+                belongs to the current sample.
+        """
+        if self._pending_submission is None:
+            return
+        state, future = self._pending_submission
+        if only_current_sample and state is not self._sample:
+            return
+        self._pending_submission = None
+        state.add_scribble(future.result())
+
+    def get_scribbles_mask(self, read_only=False):
+        """ Gives the mask of all the scribbles of the current sample.
+
+        The mask is the same as the one obtained with
+        #davisinteractive.utils.scribbles.scribbles2mask from the scribbles
+        returned by #DavisInteractiveSession.get_scribbles, but it is kept
+        by the session and only the paths of every new scribble are drawn on
+        it after submitting the masks. It must be called after
+        #DavisInteractiveSession.get_scribbles. Not available in the batched
+        mode.
+
+        # Arguments
+            read_only: Boolean. By default a copy of the mask is returned. If
+                `True`, a read-only view of the mask kept by the session is
+                returned instead, which avoids the copy but it is updated by
+                the session on the next interactions.
+
+        # Returns
+            ndarray: Array of `dtype=np.int8` and shape (B x H x W), with the
+                size of the frames at the evaluated resolution (reduced by
+                `downsample` if it is given), with the
+                object id of every pixel annotated by the scribbles and -1 for
+                the rest of the pixels.
 
-    def get_report(self):
+        # Raises
+            RuntimeError: if the scribbles of the current sample have not
+                been given yet.
+        """
+        self._wait_submission(only_current_sample=True)
+        if self.sample_scribbles is None:
+            raise RuntimeError('You must have called .get_scribbles before '
+                               'asking for the scribbles mask')
+        w, h = self._image_size(self._sample.sequence)
+        return self._sample.get_scribbles_mask((h, w), read_only=read_only)
+
+    def _image_size(self, sequence):
+        """ Size of the frames of a sequence at the evaluated resolution. """
+        if self.resolution is None:
+            # Same rounding as #Davis.image_size
+            w, h = Davis.dataset[sequence]['image_size']
+            return -(-w // self.downsample), -(-h // self.downsample)
+        if self._davis is None:
+            self._davis = Davis(
+                davis_root=self.davis_root, resolution=self.resolution)
+        return self._davis.image_size(sequence, downsample=self.downsample)
+
+    def get_report(self, since=0):
         """ Gives the current report of the evaluation
 
+        # Arguments
+            since: Integer. Only give the rows of the report from this
+                position on, e.g. the ones added since the last call.
+
         # Returns
             pd.DataFrame: Dataframe with the current evaluation results. This
                 DataFrame contains the same table as the store on
                 `report_save_dir`.
         """
-        return self.connector.get_report()
+        return self.connector.get_report(since=since)
+
+    def _flush_report(self, finish=False):
+        """ Write to the temporal report file the rows added since the
+        last update, or store the final report if `finish`. """
+        since = self.report_writer.nb_rows
+        new_rows = self.get_report(since=since)
+        if finish:
+            return self.report_writer.finish(new_rows, since=since)
+        self.report_writer.flush(new_rows, since=since)
+        return None
+
+    def get_timings(self):
+        """ Gives the time spent on every phase of the interactions.
+
+        Every row corresponds to an interaction and every column to the wall
+        time in seconds spent on a phase:
+
+        * `get_scribble`: loading the initial scribble of the sample.
+        * `copy`: copying the scribbles given to the user. This time is also
+            part of the `model` time, as the time of the interaction starts
+            before the copy.
+        * `model`: the user's model, from the scribbles being given until the
+            masks are submitted (the `timing` of the report).
+        * `submit`: the whole submission of the masks to the connector, which
+            includes the following phases when evaluating locally:
+            `load_annotations`, `metrics` (computing the Jaccard and the
+            F-measure), `storage` and `robot` (generating the next scribble),
+            or `encode` and `request` against a remote server.
+        * `report`: retrieving the report and writing it to disk after the
+            interaction.
+
+        In batched mode, only the `model` and submission phases are recorded
+        and the `model` time is the one of the batch divided by its size.
+
+        # Returns
+            Pandas DataFrame: Table with the columns `sequence`,
+                `scribble_idx` and `interaction` followed by the phases.
+                Phases not run on an interaction have a value of 0.
+        """
+        columns = ['sequence', 'scribble_idx', 'interaction']
+        df = pd.DataFrame(self._timings)
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+        phases = [p for p in self.TIMING_PHASES if p in df]
+        phases += sorted(set(df.columns) - set(columns) - set(phases))
+        return df[columns + phases].fillna(0.)
 
     def get_global_summary(self, save_file=None):
         """ Gives a summary from the current session.
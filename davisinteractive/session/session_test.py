@@ -3,6 +3,7 @@ from __future__ import absolute_import, division
 import json
 import os
 import tempfile
+import threading
 import time
 import unittest
 from functools import wraps
@@ -10,11 +11,15 @@ from functools import wraps
 import numpy as np
 import pandas as pd
 import pytest
+from PIL import Image
 from davisinteractive.common import Path, patch
 from davisinteractive.connector.local import LocalConnector
 from davisinteractive.dataset import Davis
+from davisinteractive.evaluation import clear_services
 from davisinteractive.session import DavisInteractiveSession
-from davisinteractive.utils.scribbles import annotated_frames, is_empty
+from davisinteractive.utils.scribbles import (FrozenScribbles,
+                                               annotated_frames, is_empty,
+                                               scribbles2mask, thaw_scribbles)
 
 EMPTY_SCRIBBLE = {
     'scribbles': [[] for _ in range(69)],
@@ -163,6 +168,95 @@ class TestDavisInteractiveSession(unittest.TestCase):
 
         assert mock_davis.call_count == 0
 
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_report_pickle(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        tmp_dir = Path(tempfile.mkdtemp())
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=5,
+                report_save_dir=tmp_dir,
+                report_format='pickle',
+                report_flush_interactions=2,
+                max_time=None) as session:
+            count = 0
+
+            temp_log = tmp_dir / ("%s.tmp.pkl" % session.report_name)
+            final_csv = tmp_dir / ("%s.csv" % session.report_name)
+
+            with patch.object(
+                    session.connector,
+                    'get_report',
+                    wraps=session.connector.get_report) as mock_get_report:
+                while session.next():
+                    assert not final_csv.exists()
+                    if count > 0:
+                        assert temp_log.exists()
+                        df = session.report_writer.read()
+                        # Flushed on every second call to next
+                        flushed = count if count % 2 else count - 1
+                        assert len(df) == 2 * flushed
+
+                    session.get_scribbles()
+                    pred_masks = np.zeros((2, 480, 854))
+                    session.submit_masks(pred_masks)
+                    count += 1
+
+            assert count == 5
+            # Every flush only reads the rows added since the previous one
+            assert [c[1]['since'] for c in mock_get_report.call_args_list
+                   ] == [0, 2, 6]
+            assert final_csv.exists()
+            assert not temp_log.exists()
+            df = pd.read_csv(final_csv, index_col=0)
+            assert df.shape == (5 * 2, 10)
+            pd.testing.assert_frame_equal(
+                df, session.get_report(), check_dtype=False)
+
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_read_only(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=3,
+                report_save_dir=tempfile.mkdtemp(),
+                max_time=None) as session:
+            count = 0
+            previous = None
+
+            while session.next():
+                seq, scribble, new_seq = session.get_scribbles(read_only=True)
+                assert isinstance(scribble, FrozenScribbles)
+                assert thaw_scribbles(scribble) == session.sample_scribbles
+                if count == 0:
+                    with dataset_dir.joinpath('Scribbles', 'bear',
+                                              '001.json').open() as fp:
+                        sc = json.load(fp)
+                        assert sc == thaw_scribbles(scribble)
+                else:
+                    # Previous paths are shared with the previous view
+                    assert (scribble['scribbles'][0][0] is
+                            previous['scribbles'][0][0])
+                    assert len(annotated_frames(scribble)) >= 1
+                previous = scribble
+
+                pred_masks = np.zeros((2, 480, 854))
+                session.submit_masks(pred_masks)
+                count += 1
+
+            assert count == 3
+
+        assert mock_davis.call_count == 0
+
     @dataset('train', bear={'num_frames': 2, 'num_scribbles': 2})
     @patch.object(Davis, '_download_scribbles', return_value=None)
     def test_integration_multiple(self, mock_davis):
@@ -278,6 +372,159 @@ class TestDavisInteractiveSession(unittest.TestCase):
         summary = session.get_global_summary(save_file=global_summary_file)
         self.assertTrue(os.path.exists(global_summary_file))
 
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_batch(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=4,
+                report_save_dir=tempfile.mkdtemp(),
+                max_time=None) as session:
+            count = 0
+
+            for batch in session.scribbles_iterator(batch_size=2):
+                sequences, scribbles, new_seqs = zip(*batch)
+                if count < 4:
+                    assert sequences == ('bear', 'bear')
+                    assert new_seqs == (count == 0, count == 0)
+                else:
+                    assert sequences == ('tennis',)
+                    assert new_seqs == (count == 4,)
+                if count == 0:
+                    for scribble_idx, scribble in enumerate(scribbles, 1):
+                        with dataset_dir.joinpath(
+                                'Scribbles', 'bear',
+                                '{:03d}.json'.format(scribble_idx)).open() as fp:
+                            assert json.load(fp) == scribble
+                assert not any(is_empty(s) for s in scribbles)
+
+                with pytest.raises(ValueError):
+                    session.submit_masks_batch([np.ones((2, 480, 854))] * 3)
+
+                pred_masks = [np.ones((2, 480, 854)) for _ in batch]
+                session.submit_masks_batch(pred_masks)
+
+                count += 1
+
+            assert count == 8
+            df = session.get_report()
+
+        assert mock_davis.call_count == 0
+
+        assert df.shape == (2 * 4 * 2 * 1 + 4 * 2 * 2, 10)
+        nb_interactions = df.groupby(['sequence',
+                                      'scribble_idx'])['interaction'].max()
+        assert (nb_interactions == 4).all()
+        assert len(nb_interactions) == 3
+        assert 'auc' in session.get_global_summary()
+
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_resume(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        report_dir = Path(tempfile.mkdtemp())
+        checkpoint = report_dir / 'checkpoint.json'
+
+        def create_session(**kwargs):
+            return DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=2,
+                report_save_dir=report_dir,
+                shuffle=True,
+                checkpoint=checkpoint,
+                max_time=None,
+                **kwargs)
+
+        # Interrupt the session on the second interaction of the second sample
+        count = 0
+        with pytest.raises(KeyboardInterrupt):
+            with create_session() as session:
+                for _ in session.scribbles_iterator():
+                    if count == 3:
+                        raise KeyboardInterrupt()
+                    session.submit_masks(np.ones((2, 480, 854)))
+                    count += 1
+        samples = session.samples
+        with checkpoint.open() as fp:
+            state = json.load(fp)
+        assert state['session_key'] == session.session_key
+        assert state['completed_samples'] == [0]
+        assert len(session.report_writer.read()) == len(session.get_report())
+        # Rows per interaction of every sequence: frames x objects
+        nb_rows = {'bear': 2 * 1, 'tennis': 2 * 2}
+
+        with pytest.raises(ValueError):
+            with create_session(metric_to_optimize='J'):
+                pass
+        with pytest.raises(ValueError):
+            create_session(host='https://example.com', user_key='user')
+
+        with create_session(report_format='pickle') as resumed:
+            assert resumed.samples == samples
+            assert resumed.session_key == session.session_key
+            assert resumed.report_name == session.report_name
+            assert resumed.report_writer.report_format == 'csv'
+            # Only the results of the completed sample are restored
+            assert resumed.get_report().shape == (2 * nb_rows[samples[0][0]],
+                                                  10)
+
+            count = 0
+            for seq, _, new_seq in resumed.scribbles_iterator():
+                assert seq == samples[1 + count // 2][0]
+                assert new_seq == (count % 2 == 0)
+                resumed.submit_masks(np.ones((2, 480, 854)))
+                count += 1
+            assert count == 4
+
+        df = pd.read_csv(resumed.report_writer.filename, index_col=0)
+        assert df.shape == (2 * 2 * 2 * 1 + 2 * 2 * 2, 10)
+        assert (df.session_id == session.session_key).all()
+        assert 'auc' in resumed.get_global_summary()
+        with checkpoint.open() as fp:
+            assert json.load(fp)['completed_samples'] == [0, 1, 2]
+
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_batch_not_submitted(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                report_save_dir=tempfile.mkdtemp(),
+                max_time=None) as session:
+            with pytest.raises(ValueError):
+                next(session.scribbles_iterator(batch_size=0))
+            with pytest.raises(RuntimeError):
+                session.submit_masks_batch([np.ones((2, 480, 854))])
+            with pytest.raises(RuntimeError):
+                for _ in session.scribbles_iterator(batch_size=2):
+                    pass
+
     @dataset(
         'train',
         bear={
@@ -396,6 +643,216 @@ class TestDavisInteractiveSession(unittest.TestCase):
 
         assert mock_davis.call_count == 0
 
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_prefetch(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        with patch.object(
+                LocalConnector,
+                'get_scribble',
+                autospec=True,
+                side_effect=LocalConnector.get_scribble) as mock_get_scribble:
+            with DavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    max_nb_interactions=2,
+                    report_save_dir=tempfile.mkdtemp(),
+                    prefetch=True,
+                    max_time=None) as session:
+                count = 0
+
+                for seq, scribble, new_seq in session.scribbles_iterator():
+                    assert new_seq == (count % 2 == 0)
+                    sample_seq, scribble_idx = session.samples[count // 2]
+                    assert seq == sample_seq
+                    if new_seq:
+                        with dataset_dir.joinpath(
+                                'Scribbles', seq,
+                                '{:03d}.json'.format(scribble_idx)).open() as fp:
+                            sc = json.load(fp)
+                            assert sc == scribble
+
+                    pred_masks = np.ones((2, 480, 854))
+                    session.submit_masks(pred_masks)
+                    count += 1
+
+                assert count == 6
+                service = session.connector.service
+                assert set(service.annotations_cache.keys()) == {
+                    'bear', 'tennis'
+                }
+
+            assert session._prefetch_executor is None
+            assert mock_get_scribble.call_count == 3
+
+        assert mock_davis.call_count == 0
+
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_group_by_sequence(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        for _ in range(5):
+            with DavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    shuffle=True,
+                    group_by_sequence=True,
+                    report_save_dir=tempfile.mkdtemp()) as session:
+                sequences = [s for s, _ in session.samples]
+                assert sequences in (['bear', 'bear', 'tennis'],
+                                     ['tennis', 'bear', 'bear'])
+                assert session.cache_reuse_ratio == 1. / 3.
+
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 2})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_scribbles_mask(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=3,
+                report_save_dir=tempfile.mkdtemp(),
+                async_submit=True,
+                max_time=None) as session:
+            with pytest.raises(RuntimeError):
+                session.get_scribbles_mask()
+
+            count = 0
+            views = []
+            with patch(
+                    'davisinteractive.session.session.scribbles2mask',
+                    wraps=scribbles2mask) as build_mask:
+                while session.next():
+                    _, scribbles, _ = session.get_scribbles()
+                    expected = scribbles2mask(scribbles, (480, 854))
+                    mask = session.get_scribbles_mask()
+                    assert mask.dtype == np.int8
+                    np.testing.assert_array_equal(mask, expected)
+
+                    view = session.get_scribbles_mask(read_only=True)
+                    np.testing.assert_array_equal(view, expected)
+                    with pytest.raises(ValueError):
+                        view[0, 0, 0] = 1
+                    mask[:] = 0
+                    np.testing.assert_array_equal(
+                        session.get_scribbles_mask(), expected)
+                    views.append(view.base)
+
+                    session.submit_masks(np.zeros((2, 480, 854)))
+                    count += 1
+            assert count == 6
+            # The mask is only built once per sample and then updated
+            assert build_mask.call_count == 2
+            assert views[0] is views[1] is views[2]
+            assert views[3] is views[4] is views[5]
+            assert views[2] is not views[3]
+
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_timings(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        report_dir = Path(tempfile.mkdtemp())
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=3,
+                report_save_dir=report_dir,
+                save_timings=True,
+                max_time=None) as session:
+            assert session.get_timings().empty
+            for _ in session.scribbles_iterator():
+                session.submit_masks(np.ones((2, 480, 854)))
+
+        df = session.get_timings()
+        assert list(df.columns) == [
+            'sequence', 'scribble_idx', 'interaction', 'get_scribble', 'copy',
+            'model', 'submit', 'load_annotations', 'metrics', 'storage',
+            'robot', 'report'
+        ]
+        assert list(df.interaction) == [1, 2, 3]
+        assert (df.sequence == 'bear').all()
+        assert df.get_scribble[0] > 0
+        assert (df.get_scribble[1:] == 0).all()
+        assert (df.report > 0).all()
+        phases = df[['load_annotations', 'metrics', 'storage', 'robot']]
+        assert (df.submit >= phases.sum(axis=1)).all()
+        report = session.get_report()
+        np.testing.assert_allclose(
+            df.model, report.groupby('interaction').timing.first())
+
+        saved = pd.read_csv(
+            report_dir.joinpath('%s.timings.csv' % session.report_name),
+            index_col=0)
+        assert saved.shape == df.shape
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 2})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_async_submit(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=3,
+                report_save_dir=tempfile.mkdtemp(),
+                async_submit=True,
+                max_time=None) as session:
+            with pytest.raises(ValueError):
+                next(session.scribbles_iterator(batch_size=2))
+            count = 0
+
+            while session.next():
+                seq, scribble, new_seq = session.get_scribbles()
+                assert new_seq == (count % 3 == 0)
+                assert seq == 'bear'
+                # Every submission of the sample adds a new scribble
+                nb_frames = len(annotated_frames(scribble))
+                assert nb_frames >= 1
+                if not new_seq:
+                    assert not is_empty(session.sample_last_scribble)
+
+                pred_masks = np.zeros((2, 480, 854))
+                session.submit_masks(pred_masks)
+                assert session._pending_submission is not None
+
+                count += 1
+
+            assert count == 6
+            assert session._pending_submission is None
+            df = session.get_report()
+            assert df.shape == (6 * 2, 10)
+            assert sorted(df['interaction'].unique()) == [1, 2, 3]
+
+        assert session._submit_executor is None
+        assert mock_davis.call_count == 0
+
     @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
     @patch.object(Davis, '_download_scribbles', return_value=None)
     def test_integration_single_timeout(self, mock_davis):
@@ -467,3 +924,214 @@ class TestDavisInteractiveSession(unittest.TestCase):
             assert ('bear', 2) in session.samples
             assert ('tennis', 1) in session.samples
         assert mock_davis.call_count == 0
+
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_shared_service(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        self.addCleanup(clear_services)
+
+        sessions = []
+        for shuffle in (False, True):
+            with DavisInteractiveSession(
+                    davis_root=dataset_dir,
+                    subset='train',
+                    shuffle=shuffle,
+                    max_nb_interactions=2,
+                    report_save_dir=tempfile.mkdtemp(),
+                    shared_service=True) as session:
+                while session.next():
+                    session.get_scribbles()
+                    session.submit_masks(np.zeros((2, 480, 854)))
+            sessions.append(session)
+
+        service = sessions[0].connector.service
+        assert sessions[1].connector.service is service
+        assert service.sequences_scribble_idx == [('bear', 1), ('bear', 2),
+                                                  ('tennis', 1)]
+        for session in sessions:
+            report = session.get_report()
+            assert report.shape == (2 * 2 * 2 * 1 + 2 * 2 * 2, 10)
+            assert set(report.session_id) == {session.session_key}
+        assert len(service.storage.report) == 2 * len(report)
+        summaries = [s.get_global_summary() for s in sessions]
+        assert summaries[0]['curve']['J_AND_F'] == \
+            summaries[1]['curve']['J_AND_F']
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_shared_service_spill(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        spill_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(clear_services)
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=2,
+                report_save_dir=tempfile.mkdtemp(),
+                shared_service=True,
+                spill_dir=spill_dir) as session:
+            storage = session.connector.service.storage
+            assert storage.spill_dir == spill_dir
+            while session.next():
+                session.get_scribbles()
+                session.submit_masks(np.zeros((2, 480, 854)))
+                assert storage.memory_usage()['nb_spilled_sessions'] == 0
+
+        # The session is spilled by post_finish and its report still given
+        stats = storage.memory_usage()
+        assert stats['nb_sessions'] == 0
+        assert stats['nb_spilled_sessions'] == 1
+        assert len(list(spill_dir.iterdir())) == 1
+        assert session.get_report().shape == (2 * 2, 10)
+
+        # Sessions with another storage configuration use another service
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=1,
+                report_save_dir=tempfile.mkdtemp(),
+                shared_service=True) as other:
+            assert other.connector.service.storage is not storage
+            assert other.connector.service.storage.spill_dir is None
+        assert mock_davis.call_count == 0
+
+    @dataset(
+        'train',
+        bear={
+            'num_frames': 2,
+            'num_scribbles': 2
+        },
+        tennis={
+            'num_frames': 2,
+            'num_scribbles': 1
+        })
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_concurrent_sessions(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        self.addCleanup(clear_services)
+        nb_sessions = 8
+
+        sessions, errors = [], []
+
+        def evaluate():
+            try:
+                with DavisInteractiveSession(
+                        davis_root=dataset_dir,
+                        subset='train',
+                        shuffle=True,
+                        max_nb_interactions=2,
+                        report_save_dir=tempfile.mkdtemp(),
+                        shared_service=True) as session:
+                    sessions.append(session)
+                    while session.next():
+                        session.get_scribbles()
+                        session.submit_masks(np.zeros((2, 480, 854)))
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=evaluate) for _ in range(nb_sessions)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors, errors
+        assert len(sessions) == nb_sessions
+
+        service = sessions[0].connector.service
+        nb_rows = 2 * 2 * 2 * 1 + 2 * 2 * 2
+        key = ['sequence', 'scribble_idx', 'interaction', 'object_id', 'frame']
+        for session in sessions:
+            assert session.connector.service is service
+            report = session.get_report()
+            assert len(report) == nb_rows
+            assert set(report.session_id) == {session.session_key}
+            assert not report.duplicated(subset=key).any()
+            assert session.get_global_summary()['curve']['J_AND_F'] == \
+                [0.] * 4
+        assert len(service.storage.report) == nb_sessions * nb_rows
+        annotated_frames = service.storage.annotated_frames
+        assert len(annotated_frames) == nb_sessions * 3 * 2
+        assert annotated_frames.groupby('session_id').size().tolist() == \
+            [3 * 2] * nb_sessions
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, '_download_scribbles', return_value=None)
+    def test_integration_downsample(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        tmp_dir = Path(tempfile.mkdtemp())
+
+        with DavisInteractiveSession(
+                davis_root=dataset_dir,
+                subset='train',
+                max_nb_interactions=2,
+                report_save_dir=tmp_dir,
+                downsample=2) as session:
+            assert session.report_name.endswith('_240p')
+            assert session.connector.service.downsample == 2
+            while session.next():
+                seq, scribbles, _ = session.get_scribbles()
+                assert len(scribbles['scribbles']) == 2
+                assert session.get_scribbles_mask().shape == (2, 240, 427)
+                pred_masks = np.zeros((2, 480, 854))
+                pred_masks[:, 100:400, 100:600] = 1
+                session.submit_masks(pred_masks)
+
+        assert tmp_dir.joinpath(session.report_name + '.csv').exists()
+        report = session.get_report()
+        assert report.shape == (2 * 2, 11)
+        assert (report.resolution == '240p').all()
+        assert report.jaccard.min() > 0
+        assert session.get_global_summary()['resolution'] == '240p'
+        assert mock_davis.call_count == 0
+
+    @dataset('train', bear={'num_frames': 2, 'num_scribbles': 1})
+    @patch.object(Davis, 'check_files', return_value=True)
+    def test_integration_full_resolution(self, mock_davis):
+        dataset_dir = Path(__file__).parent.joinpath('test_data', 'DAVIS')
+        davis_root = Path(tempfile.mkdtemp())
+        scribbles_dir = davis_root.joinpath(Davis.SCRIBBLES_SUBDIR, 'bear')
+        scribbles_dir.mkdir(parents=True)
+        scribbles_dir.joinpath('001.json').write_bytes(
+            dataset_dir.joinpath(Davis.SCRIBBLES_SUBDIR, 'bear',
+                                 '001.json').read_bytes())
+        annotations_dir = davis_root.joinpath(Davis.ANNOTATIONS_SUBDIR,
+                                              'Full-Resolution', 'bear')
+        annotations_dir.mkdir(parents=True)
+        annotation = np.zeros((200, 300), dtype=np.uint8)
+        annotation[50:150, 100:200] = 1
+        for f in range(2):
+            Image.fromarray(annotation).save(
+                str(annotations_dir / '{:05d}.png'.format(f)))
+
+        with DavisInteractiveSession(
+                davis_root=davis_root,
+                subset='train',
+                max_nb_interactions=2,
+                report_save_dir=tempfile.mkdtemp(),
+                resolution='Full-Resolution',
+                max_time=None) as session:
+            assert session.report_name.endswith('_Full-Resolution')
+            while session.next():
+                _, scribbles, _ = session.get_scribbles()
+                mask = session.get_scribbles_mask()
+                assert mask.shape == (2, 200, 300)
+                assert (mask == scribbles2mask(scribbles,
+                                               (200, 300))).all()
+                session.submit_masks(np.zeros((2, 200, 300)))
+            report = session.get_report()
+        assert report.shape == (2 * 2, 11)
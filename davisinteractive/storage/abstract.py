@@ -14,7 +14,13 @@ class AbstractStorage:
                                    jaccard):
         raise NotImplementedError('This is an abstract class')
 
-    def get_report(self, user_id=None, session_id=None):
+    def get_report(self, user_id=None, session_id=None, since=0):
+        raise NotImplementedError('This is an abstract class')
+
+    def restore_report(self, report):
+        raise NotImplementedError('This is an abstract class')
+
+    def finish_session(self, session_id):
         raise NotImplementedError('This is an abstract class')
 
     def get_annotated_frames(self, session_id, sequence, scribble_idx):
@@ -1,25 +1,203 @@
 from __future__ import absolute_import, division
 
+import collections
+import threading
+import time
+
 import numpy as np
 import pandas as pd
 
 from .. import logging
+from ..common import Path
 from ..dataset import Davis
 from .abstract import AbstractStorage
 
 
+class _ColumnBuffer(object):
+    """ Table stored as growable NumPy arrays, one for every column.
+
+    The capacity of the arrays is doubled when they are full, so appending
+    rows has an amortized constant cost. The table is only converted to a
+    DataFrame when it is read.
+
+    # Arguments
+        dtypes: List of Tuples. Name and data type of every column.
+        capacity: Integer. Initial number of rows allocated.
+    """
+
+    def __init__(self, dtypes, capacity=64):
+        self.columns = [c for c, _ in dtypes]
+        self._arrays = {c: np.empty(capacity, dtype=d) for c, d in dtypes}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self._arrays.values())
+
+    def append(self, nb, **values):
+        """ Append `nb` rows given the values of every column, either as
+        arrays of length `nb` or as scalars repeated on all the rows. """
+        size = self._size + nb
+        capacity = len(self._arrays[self.columns[0]])
+        if size > capacity:
+            capacity = max(2 * capacity, size)
+            for c, a in self._arrays.items():
+                grown = np.empty(capacity, dtype=a.dtype)
+                grown[:self._size] = a[:self._size]
+                self._arrays[c] = grown
+        for c in self.columns:
+            self._arrays[c][self._size:size] = values[c]
+        self._size = size
+
+    def to_frame(self, columns, start=0, **constants):
+        """ DataFrame with a copy of the rows from `start` on, with the
+        `columns` given and the `constants` as additional columns. The index
+        of the DataFrame is the position of the rows on the table. """
+        start = min(start, self._size)
+        data = {c: a[start:self._size] for c, a in self._arrays.items()}
+        for c, v in constants.items():
+            data[c] = np.full(self._size - start, v, dtype=object)
+        return pd.DataFrame(
+            data,
+            columns=columns,
+            index=pd.RangeIndex(start, self._size),
+            copy=True)
+
+
+class _SessionResults(object):
+    """ Results and annotated frames of a session.
+
+    The interactions stored are indexed by `(sequence, scribble_idx,
+    interaction)` and the frames annotated by `(sequence, scribble_idx)`, so
+    the checks do not have to scan the results.
+    """
+
+    REPORT_DTYPES = [('sequence', object), ('scribble_idx', np.int64),
+                     ('interaction', np.int64), ('object_id', np.int64),
+                     ('frame', np.int64), ('jaccard', np.float64),
+                     ('contour', np.float64), ('j_and_f', np.float64),
+                     ('timing', np.float64)]
+    ANNOTATED_FRAMES_DTYPES = [('sequence', object), ('scribble_idx',
+                                                      np.int64),
+                               ('frame', np.int64), ('override', np.bool_)]
+
+    def __init__(self):
+        self.report = _ColumnBuffer(self.REPORT_DTYPES)
+        self.annotated_frames = _ColumnBuffer(self.ANNOTATED_FRAMES_DTYPES)
+        self.interactions = set()
+        self.frames = collections.defaultdict(set)
+
+    def add_results(self, nb, **values):
+        self.report.append(nb, **values)
+        self.interactions.add((values['sequence'], int(values['scribble_idx']),
+                               int(values['interaction'])))
+
+    def add_annotated_frame(self, sequence, scribble_idx, frame, override):
+        self.annotated_frames.append(
+            1,
+            sequence=sequence,
+            scribble_idx=scribble_idx,
+            frame=frame,
+            override=override)
+        self.frames[(sequence, int(scribble_idx))].add(int(frame))
+
+    def restore(self, report, annotated_frames=None):
+        """ Add the rows of a report and of a table of annotated frames. """
+        self.report.append(
+            len(report), **{c: report[c].values
+                            for c in self.report.columns})
+        self.interactions.update(
+            (seq, int(s), int(i)) for seq, s, i in zip(
+                report.sequence, report.scribble_idx, report.interaction))
+        if annotated_frames is not None:
+            for row in annotated_frames.itertuples(index=False):
+                self.add_annotated_frame(row.sequence, row.scribble_idx,
+                                         row.frame, row.override)
+
+    def report_frame(self, session_id, since=0):
+        return self.report.to_frame(
+            AbstractStorage.COLUMNS, start=since, session_id=session_id)
+
+    def annotated_frames_frame(self, session_id):
+        return self.annotated_frames.to_frame(
+            LocalStorage.ANNOTATED_FRAMES_COLUMNS, session_id=session_id)
+
+
 class LocalStorage(AbstractStorage):
     """ Local storage of the results.
 
-    This class encapsulates the storage of the results into a pandas DataFrame.
+    This class stores the results in memory and returns them as a pandas
+    DataFrame. The results and the annotated frames of every session are
+    kept apart, so the same storage can be shared by several sessions, also
+    from different threads.
+
+    The results of every session are appended to growable NumPy arrays, one
+    per column, and indexed by sequence, scribble and interaction, so storing
+    an interaction does not depend on the number of results already stored.
+    The DataFrames are only built when the report is requested.
+
+    To bound the memory of a long running process, the sessions can be
+    spilled to disk when they finish (see #LocalStorage.finish_session) or
+    when they have been idle for some time. A spilled session is stored as a
+    compressed pickle file and removed from memory. Its report is still
+    returned by #LocalStorage.get_report and it is loaded back to memory if
+    new results are stored for it.
+
+    # Arguments
+        spill_dir: String or Path. Directory where the sessions are spilled.
+            If `None` (default), all the sessions are kept in memory.
+        session_ttl: Float. Seconds after which an idle session is spilled.
+            If `None` (default), only the finished sessions are spilled.
+            Requires `spill_dir`.
+
+    # Attributes
+        report: Pandas DataFrame. Results of all the sessions in memory.
+        annotated_frames: Pandas DataFrame. Annotated frames of all the
+            sessions in memory.
+
+    # Raises
+        ValueError: if `session_ttl` is given without `spill_dir`.
     """
 
-    def __init__(self):
-        self.report = pd.DataFrame(columns=self.COLUMNS)
-        logging.verbose('Report DataFrame created')
-        self.annotated_frames = pd.DataFrame(
-            columns=['sequence', 'scribble_idx', 'frame', 'override'])
-        logging.verbose('Annotated frames created')
+    ANNOTATED_FRAMES_COLUMNS = [
+        'session_id', 'sequence', 'scribble_idx', 'frame', 'override'
+    ]
+
+    def __init__(self, spill_dir=None, session_ttl=None):
+        if session_ttl is not None and spill_dir is None:
+            raise ValueError('session_ttl requires a spill_dir')
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.session_ttl = session_ttl
+        self._last_access = {}
+        self._spilled = {}
+
+        self._lock = threading.RLock()
+        self._sessions = collections.OrderedDict()
+        logging.verbose('Local storage created')
+
+    @property
+    def report(self):
+        with self._lock:
+            return self._concat_frames('report_frame')
+
+    @property
+    def annotated_frames(self):
+        with self._lock:
+            return self._concat_frames('annotated_frames_frame')
+
+    def _concat_frames(self, method):
+        frames = [
+            getattr(session, method)(session_id)
+            for session_id, session in self._sessions.items()
+        ]
+        if not frames:
+            return getattr(_SessionResults(), method)(None)
+        return pd.concat(frames, ignore_index=True)
 
     def store_interactions_results(self, user_id, session_id, sequence,
                                    scribble_idx, interaction, timing,
@@ -34,23 +212,22 @@ class LocalStorage(AbstractStorage):
             scribble_idx: Integer. Scribble index of the sample.
             interaction: Integer. Interaction number.
             timing: Float. Timing in seconds that lasted the interaction.
-            objects_idx: List of Integers. List of the objects identifiers that
-                match with the jaccard metric.
-            frames: List of Integers: List of frame index matching with the
-                jaccard metric.
-            jaccard: List of Floats: List of jaccard metric.
-            contour: List of Floats: List of contour metric.
+            objects_idx: List or Numpy Array of Integers. List of the objects
+                identifiers that match with the jaccard metric.
+            frames: List or Numpy Array of Integers: List of frame index
+                matching with the jaccard metric.
+            jaccard: List or Numpy Array of Floats: List of jaccard metric.
+            contour: List or Numpy Array of Floats: List of contour metric.
         """
-        # Check the data.
-        objects_idx = list(objects_idx)
-        frames = list(frames)
-        jaccard = list(jaccard)
-        contour = list(contour)
+        # Check the data. The arrays are not copied until they are stored.
+        objects_idx = np.ravel(objects_idx)
+        frames = np.ravel(frames)
+        jaccard = np.ravel(jaccard)
+        contour = np.ravel(contour)
         assert len(jaccard) == len(contour)
-        j_and_f = [.5 * j + .5 * f for j, f in zip(jaccard, contour)]
-        if (min(jaccard) < 0.) or (max(jaccard) > 1.):
+        if (jaccard.min() < 0.) or (jaccard.max() > 1.):
             raise ValueError('Jaccard values must be between 0 and 1')
-        if (min(contour) < 0.) or (max(contour) > 1.):
+        if (contour.min() < 0.) or (contour.max() > 1.):
             raise ValueError('Jaccard values must be between 0 and 1')
 
         nb = len(jaccard)
@@ -58,56 +235,77 @@ class LocalStorage(AbstractStorage):
             raise ValueError('`jaccard`, `frames` and `objects_idx` must '
                              'have the same length')
 
-        # Check previous entries
-        if self.report.loc[(self.report.sequence == sequence) &
-                           (self.report.scribble_idx == scribble_idx) &
-                           (self.report.interaction == interaction)].size > 0:
-            raise RuntimeError(('For {} and scribble {} already exist a '
-                                'result for interaction {}').format(
-                                    sequence, scribble_idx, interaction))
-        if interaction > 1 and self.report.loc[
-            (self.report.sequence == sequence) &
-            (self.report.scribble_idx == scribble_idx) &
-            (self.report.interaction == interaction - 1)].size == 0:
-            raise RuntimeError(('For {} and scribble {} does not exist a '
-                                'result for previous interaction {}').format(
-                                    sequence, scribble_idx, interaction - 1))
-
-        sample = {}
-        sample['session_id'] = [session_id] * nb
-        sample['sequence'] = [sequence] * nb
-        sample['scribble_idx'] = [scribble_idx] * nb
-        sample['interaction'] = [interaction] * nb
-        sample['timing'] = [timing] * nb
-        sample['object_id'] = objects_idx
-        sample['frame'] = frames
-        sample['jaccard'] = jaccard
-        sample['contour'] = contour
-        sample['j_and_f'] = j_and_f
-        sample = pd.DataFrame(data=sample, columns=self.COLUMNS)
-        self.report = pd.concat([self.report, sample], ignore_index=True)
+        with self._lock:
+            self._touch(session_id)
+            session = self._session(session_id)
+
+            # Check previous entries
+            if (sequence, scribble_idx, interaction) in session.interactions:
+                raise RuntimeError(('For {} and scribble {} already exist a '
+                                    'result for interaction {}').format(
+                                        sequence, scribble_idx, interaction))
+            if interaction > 1 and (sequence, scribble_idx, interaction -
+                                    1) not in session.interactions:
+                raise RuntimeError(
+                    ('For {} and scribble {} does not exist a '
+                     'result for previous interaction {}').format(
+                         sequence, scribble_idx, interaction - 1))
+
+            session.add_results(
+                nb,
+                sequence=sequence,
+                scribble_idx=scribble_idx,
+                interaction=interaction,
+                object_id=objects_idx,
+                frame=frames,
+                jaccard=jaccard,
+                contour=contour,
+                j_and_f=.5 * jaccard + .5 * contour,
+                timing=timing)
         logging.info('Successfully stored sample interaction entry')
 
         return True
 
-    def get_report(self, session_id=None, **kwargs):
+    def get_report(self, session_id=None, since=0, **kwargs):
         """ Return current report.
 
         # Arguments
             session_id: String. Session identifier
+            since: Integer. Only return the rows of the report from this
+                position on, e.g. the ones added since the last call. Only
+                these rows are copied, so reading the new results does not
+                depend on the size of the report.
 
         # Returns
-            Pandas DataFrame. Report in the form of the DataFrame.
+            Pandas DataFrame. Report in the form of the DataFrame. Its index
+                is the position of every row on the report.
         """
-        df = self.report
-        df = df.loc[df['session_id'] == session_id].reset_index(drop=True)
-        return df
+        with self._lock:
+            spill_file = self._spilled.get(session_id)
+            if spill_file is not None:
+                return pd.read_pickle(str(spill_file))['report'].iloc[since:]
+            session = self._sessions.get(session_id) or _SessionResults()
+            return session.report_frame(session_id, since=since)
+
+    def restore_report(self, report):
+        """ Restore the results of a previous evaluation.
+
+        # Arguments
+            report: Pandas DataFrame. Report with the results to restore, as
+                returned by `get_report`.
+        """
+        report = report.loc[:, self.COLUMNS]
+        with self._lock:
+            for session_id, df in report.groupby('session_id', sort=False):
+                self._touch(session_id)
+                self._session(session_id).restore(df)
+        logging.info('Restored {} entries of the report'.format(len(report)))
 
     def get_annotated_frames(self, session_id, sequence, scribble_idx):
         """Get the previous annotated frames for the given iteration.
 
         # Arguments
-            session_id: String. Ignored.
+            session_id: String. Session identifier.
             sequence: String. Sequence name.
             scribble_idx: Integer. Scribble index of the sample.
 
@@ -115,13 +313,12 @@ class LocalStorage(AbstractStorage):
             List of Integers. List of the frames that have been previously
                 annotated in the current iteration.
         """
-        del session_id
-
-        df = self.annotated_frames.copy()
-        prev_frames = df.loc[
-            (df['sequence'] == sequence) &
-            (df['scribble_idx'] == scribble_idx)]['frame'].values
-        prev_frames = np.unique(prev_frames)
+        with self._lock:
+            self._touch(session_id)
+            session = self._sessions.get(session_id)
+            prev_frames = set() if session is None else session.frames.get(
+                (sequence, scribble_idx), set())
+            prev_frames = sorted(prev_frames)
 
         if len(prev_frames) == Davis.dataset[sequence]['num_frames']:
             return tuple()
@@ -137,7 +334,7 @@ class LocalStorage(AbstractStorage):
         a scribble.
 
         # Arguments
-            session_id: String. Ignored.
+            session_id: String. Session identifier.
             sequence: String. Sequence name.
             scribble_idx: Integer. Scribble index of the sample.
             annotated_frame: Integer. Index of the frame of the next scribble
@@ -145,10 +342,92 @@ class LocalStorage(AbstractStorage):
             override: Boolean. Whether or not the annotated frame was override
                 by the user or not.
         """
-        del session_id
+        with self._lock:
+            self._touch(session_id)
+            self._session(session_id).add_annotated_frame(
+                sequence, scribble_idx, annotated_frame, override)
+
+    def finish_session(self, session_id):
+        """ Mark a session as finished, spilling it to disk if a `spill_dir`
+        is given.
+
+        # Arguments
+            session_id: String. Session identifier.
+        """
+        with self._lock:
+            if self.spill_dir is not None and session_id in self._last_access:
+                self._spill(session_id)
+            self._last_access.pop(session_id, None)
+
+    def memory_usage(self):
+        """ Usage of memory and disk of the stored sessions.
+
+        # Returns
+            Dictionary: Number of sessions in memory (`nb_sessions`) and
+                spilled to disk (`nb_spilled_sessions`), the number of rows
+                and bytes allocated in memory for the report (`report_rows`,
+                `report_bytes`) and for the annotated frames
+                (`annotated_frames_rows`, `annotated_frames_bytes`), and the
+                size of the spilled files (`spilled_bytes`).
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                'nb_sessions': len(self._last_access),
+                'nb_spilled_sessions': len(self._spilled),
+                'report_rows': sum(len(s.report) for s in sessions),
+                'report_bytes': sum(s.report.nbytes for s in sessions),
+                'annotated_frames_rows': sum(
+                    len(s.annotated_frames) for s in sessions),
+                'annotated_frames_bytes': sum(
+                    s.annotated_frames.nbytes for s in sessions),
+                'spilled_bytes': sum(
+                    f.stat().st_size for f in self._spilled.values()),
+            }
+
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionResults()
+        return session
+
+    def _touch(self, session_id):
+        """ Update the last access of a session, loading it back if it was
+        spilled and spilling the sessions idle for longer than the TTL. """
+        now = time.time()
+        if session_id in self._spilled:
+            self._unspill(session_id)
+        self._last_access[session_id] = now
+
+        if self.session_ttl is None:
+            return
+        idle = [
+            s for s, t in self._last_access.items()
+            if now - t > self.session_ttl
+        ]
+        for s in idle:
+            logging.verbose('Session {} idle for more than {}s'.format(
+                s, self.session_ttl), 2)
+            self._spill(s)
+            del self._last_access[s]
+
+    def _spill(self, session_id):
+        spill_file = self.spill_dir / '{}.pkl.gz'.format(session_id)
+        session = self._sessions.pop(session_id, None) or _SessionResults()
+        data = {
+            'report': session.report_frame(session_id),
+            'annotated_frames': session.annotated_frames_frame(session_id),
+        }
+        pd.to_pickle(data, str(spill_file), compression='gzip')
+        self._spilled[session_id] = spill_file
+        logging.verbose(
+            'Spilled session {} with {} entries to {}'.format(
+                session_id, len(data['report']), spill_file), 1)
 
-        new_row = pd.DataFrame(
-            [[sequence, scribble_idx, annotated_frame, override]],
-            columns=['sequence', 'scribble_idx', 'frame', 'override'])
-        self.annotated_frames = pd.concat([self.annotated_frames, new_row],
-                                          ignore_index=True)
+    def _unspill(self, session_id):
+        spill_file = self._spilled.pop(session_id)
+        data = pd.read_pickle(str(spill_file))
+        self._session(session_id).restore(data['report'],
+                                          data['annotated_frames'])
+        spill_file.unlink()
+        logging.verbose('Loaded spilled session {}'.format(session_id), 1)
@@ -1,7 +1,11 @@
+import tempfile
+import time
 import unittest
 
 import numpy as np
+import pandas as pd
 import pytest
+from davisinteractive.common import Path
 from davisinteractive.storage import LocalStorage
 
 
@@ -59,6 +63,27 @@ class TestLocalStorage(unittest.TestCase):
             user_id, session_id, sequence, scribble_idx, interaction + 1,
             timing, objects_idx, frames, jaccard, contour)
 
+    def test_restore_report(self):
+        storage = LocalStorage()
+        storage.store_interactions_results('empty', '12345', 'test', 1, 1, 1.,
+                                           [1, 2], [0, 0], [.1, .2], [.3, .4])
+        report = storage.get_report(session_id='12345')
+
+        restored = LocalStorage()
+        restored.restore_report(report)
+        df = restored.get_report(session_id='12345')
+        assert df.shape == (2, 10)
+        assert list(df.jaccard) == [.1, .2]
+
+        # The results continue from the restored interactions
+        assert restored.store_interactions_results(
+            'empty', '12345', 'test', 1, 2, 1., [1, 2], [0, 0], [.1, .2],
+            [.3, .4])
+        with pytest.raises(RuntimeError):
+            restored.store_interactions_results('empty', '12345', 'test', 1,
+                                                1, 1., [1, 2], [0, 0],
+                                                [.1, .2], [.3, .4])
+
     def test_annotated_frames(self):
         session_id = 'unused'
         sequence = 'bmx-trees'
@@ -84,3 +109,128 @@ class TestLocalStorage(unittest.TestCase):
         annotated_frames = storage.get_annotated_frames(session_id, sequence,
                                                         scribble_idx)
         self.assertEqual(annotated_frames, tuple())
+
+    def test_report_since(self):
+        storage = LocalStorage()
+        for interaction in (1, 2):
+            storage.store_interactions_results(
+                'empty', '12345', 'test', 1, interaction, 1., [1, 2], [0, 0],
+                [.1, .2], [.3, .4])
+        report = storage.get_report(session_id='12345')
+
+        new_rows = storage.get_report(session_id='12345', since=2)
+        pd.testing.assert_frame_equal(new_rows, report.iloc[2:])
+        assert list(new_rows.index) == [2, 3]
+        assert list(new_rows.interaction) == [2, 2]
+        assert storage.get_report(session_id='12345', since=4).empty
+        assert storage.get_report(session_id='12345', since=10).empty
+
+    def test_multiple_sessions(self):
+        storage = LocalStorage()
+        for session_id in ('session1', 'session2'):
+            assert storage.store_interactions_results(
+                'empty', session_id, 'test', 1, 1, 1., [1, 2], [0, 0],
+                [.1, .2], [.3, .4])
+            storage.store_annotated_frame(session_id, 'bmx-trees', 1,
+                                          int(session_id[-1]), False)
+        with pytest.raises(RuntimeError):
+            storage.store_interactions_results('empty', 'session3', 'test',
+                                               1, 2, 1., [1, 2], [0, 0],
+                                               [.1, .2], [.3, .4])
+
+        assert len(storage.get_report(session_id='session1')) == 2
+        assert len(storage.get_report(session_id='session2')) == 2
+        assert storage.get_annotated_frames('session1', 'bmx-trees', 1) == (1,)
+        assert storage.get_annotated_frames('session2', 'bmx-trees', 1) == (2,)
+        assert storage.get_annotated_frames('session3', 'bmx-trees', 1) == ()
+
+    def test_spill_finished_sessions(self):
+        with pytest.raises(ValueError):
+            LocalStorage(session_ttl=10)
+
+        spill_dir = Path(tempfile.mkdtemp()) / 'spill'
+        storage = LocalStorage(spill_dir=spill_dir)
+        for session_id in ('session1', 'session2'):
+            storage.store_interactions_results('empty', session_id, 'test', 1,
+                                               1, 1., [1, 2], [0, 0],
+                                               [.1, .2], [.3, .4])
+            storage.store_annotated_frame(session_id, 'bear', 1, 0, False)
+        report = storage.get_report(session_id='session1')
+        usage = storage.memory_usage()
+        assert usage['nb_sessions'] == 2
+        assert usage['report_rows'] == 4
+        assert usage['spilled_bytes'] == 0
+
+        storage.finish_session('session1')
+        usage = storage.memory_usage()
+        assert usage['nb_sessions'] == 1
+        assert usage['nb_spilled_sessions'] == 1
+        assert usage['report_rows'] == 2
+        assert usage['annotated_frames_rows'] == 1
+        assert usage['spilled_bytes'] > 0
+        assert (spill_dir / 'session1.pkl.gz').exists()
+        assert set(storage.report.session_id) == {'session2'}
+        assert storage.get_report(session_id='session1').equals(report)
+        assert storage.get_report(
+            session_id='session1', since=1).equals(report.iloc[1:])
+
+        # New results load the session back to memory
+        assert storage.store_interactions_results(
+            'empty', 'session1', 'test', 1, 2, 1., [1, 2], [0, 0], [.1, .2],
+            [.3, .4])
+        assert not (spill_dir / 'session1.pkl.gz').exists()
+        assert len(storage.get_report(session_id='session1')) == 4
+        assert storage.get_annotated_frames('session1', 'bear', 1) == (0,)
+        assert storage.memory_usage()['nb_spilled_sessions'] == 0
+
+    def test_spill_idle_sessions(self):
+        storage = LocalStorage(spill_dir=tempfile.mkdtemp(), session_ttl=.05)
+        storage.store_interactions_results('empty', 'session1', 'test', 1, 1,
+                                           1., [1, 2], [0, 0], [.1, .2],
+                                           [.3, .4])
+        time.sleep(.1)
+        storage.store_interactions_results('empty', 'session2', 'test', 1, 1,
+                                           1., [1, 2], [0, 0], [.1, .2],
+                                           [.3, .4])
+        usage = storage.memory_usage()
+        assert usage['nb_sessions'] == 1
+        assert usage['nb_spilled_sessions'] == 1
+        assert len(storage.get_report(session_id='session1')) == 2
+        assert len(storage.get_report(session_id='session2')) == 2
+
+    def test_store_arrays(self):
+        storage = LocalStorage()
+        nb_interactions, nb_rows = 100, 10
+        objects_idx, frames = np.meshgrid(np.arange(2) + 1, np.arange(5))
+        for i in range(1, nb_interactions + 1):
+            jaccard = np.full((5, 2), i / nb_interactions)
+            storage.store_interactions_results(
+                'empty', 'session', 'bear', 1, i, .5, objects_idx.ravel(),
+                frames.ravel(), jaccard.ravel(), (1 - jaccard).ravel())
+            storage.store_annotated_frame('session', 'bear', 1, i % 3, False)
+        with pytest.raises(RuntimeError):
+            storage.store_interactions_results(
+                'empty', 'session', 'bear', 1, 50, .5, objects_idx.ravel(),
+                frames.ravel(), jaccard.ravel(), jaccard.ravel())
+
+        report = storage.get_report(session_id='session')
+        assert list(report.columns) == storage.COLUMNS
+        assert len(report) == nb_interactions * nb_rows
+        assert report.interaction.tolist() == list(
+            np.repeat(np.arange(1, nb_interactions + 1), nb_rows))
+        assert report.object_id.tolist() == [1, 2] * 5 * nb_interactions
+        assert np.allclose(report.j_and_f, .5)
+        assert report.jaccard.dtype == np.float64
+        assert report.frame.dtype == np.int64
+        assert set(report.session_id) == {'session'}
+
+        # The report is a copy of the stored results
+        report.loc[:, 'jaccard'] = 0
+        assert storage.get_report(session_id='session').jaccard.max() == 1
+
+        assert storage.get_annotated_frames('session', 'bear', 1) == (0, 1, 2)
+        assert len(storage.annotated_frames) == nb_interactions
+        usage = storage.memory_usage()
+        assert usage['report_rows'] == nb_interactions * nb_rows
+        assert usage['annotated_frames_rows'] == nb_interactions
+        assert usage['report_bytes'] > 0
@@ -1,3 +1,3 @@
 from __future__ import absolute_import
 
-from . import mask, operations, scribbles, visualization
+from . import mask, operations, scribbles, timing, visualization
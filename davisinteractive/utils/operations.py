@@ -104,3 +104,62 @@ def bresenham(points):
     new_points = np.concatenate(new_points, axis=0)
 
     return new_points
+
+
+def simplify_path(points, tolerance):
+    """ Simplify a path with the Ramer-Douglas-Peucker algorithm.
+
+    More info: https://en.wikipedia.org/wiki/Ramer–Douglas–Peucker_algorithm
+
+    # Arguments
+        points: ndarray. Array of points with shape (N, 2) with N being the
+            number of points and the second dimension representing the
+            (x, y) coordinates.
+        tolerance: Float. Maximum distance allowed between the points removed
+            and the simplified path. It is expressed in the same units as
+            `points`.
+
+    # Returns
+        ndarray: Array of shape (M, 2) with M <= N with the points kept from
+            the original path. The first and last points are always kept.
+    """
+    points = np.asarray(points, dtype=np.float)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError(
+            '`points` should be two dimensional and have shape: (N, 2)')
+    if tolerance < 0:
+        raise ValueError('`tolerance` must be a non negative value')
+
+    nb_points = len(points)
+    if nb_points < 3:
+        return points
+
+    keep = np.zeros(nb_points, dtype=np.bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, nb_points - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Distance of the inner points to the segment between start and end
+        a, b = points[start], points[end]
+        segment = b - a
+        inner = points[start + 1:end] - a
+        length = segment.dot(segment)
+        if length == 0:
+            projection = np.zeros(len(inner))
+        else:
+            projection = np.clip(inner.dot(segment) / length, 0., 1.)
+        distance = np.linalg.norm(
+            inner - projection[:, None] * segment, axis=1)
+
+        idx = distance.argmax()
+        if distance[idx] > tolerance:
+            idx += start + 1
+            keep[idx] = True
+            stack.append((start, idx))
+            stack.append((idx, end))
+
+    return points[keep]
@@ -0,0 +1,52 @@
+from __future__ import absolute_import, division
+
+import unittest
+
+import numpy as np
+import pytest
+
+from .operations import bezier_curve, simplify_path
+
+
+class TestSimplifyPath(unittest.TestCase):
+
+    def test_straight_line(self):
+        points = np.c_[np.linspace(0, 100, 50), np.linspace(0, 50, 50)]
+
+        simplified = simplify_path(points, 0.5)
+        assert simplified.shape == (2, 2)
+        np.testing.assert_array_equal(simplified[0], points[0])
+        np.testing.assert_array_equal(simplified[-1], points[-1])
+
+    def test_tolerance(self):
+        control_points = np.asarray([[0, 0], [50, 200], [200, -100],
+                                     [300, 100]])
+        points = bezier_curve(control_points, 1000)
+
+        for tolerance in [0., .5, 1., 4.]:
+            simplified = simplify_path(points, tolerance)
+            assert len(simplified) <= len(points)
+            # Every original point must lie close to the simplified path
+            for p in points:
+                a, b = simplified[:-1], simplified[1:]
+                segment = b - a
+                length = (segment**2).sum(axis=1)
+                t = ((p - a) * segment).sum(axis=1) / np.maximum(length, 1e-12)
+                t = np.clip(t, 0, 1)
+                distance = np.linalg.norm(a + t[:, None] * segment - p, axis=1)
+                assert distance.min() <= tolerance + 1e-9
+
+        assert len(simplify_path(points, 1.)) < len(points) / 10
+
+    def test_small_paths(self):
+        points = np.asarray([[0., 0.], [1., 1.]])
+        np.testing.assert_array_equal(simplify_path(points, 1.), points)
+
+        points = np.asarray([[0., 0.], [5., 5.], [0., 0.]])
+        np.testing.assert_array_equal(simplify_path(points, 1.), points)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            simplify_path(np.zeros((10, 3)), 1.)
+        with pytest.raises(ValueError):
+            simplify_path(np.zeros((10, 2)), -1.)
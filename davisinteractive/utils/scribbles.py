@@ -2,6 +2,11 @@ from __future__ import absolute_import, division
 
 import numpy as np
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 from .operations import bezier_curve
 from .operations import bresenham as bresenham_function
 
@@ -11,7 +16,8 @@ def scribbles2mask(scribbles,
                    bezier_curve_sampling=False,
                    nb_points=1000,
                    bresenham=True,
-                   default_value=-1):
+                   default_value=-1,
+                   dtype=np.int):
     """ Convert the scribbles data into a mask.
 
     # Arguments
@@ -25,6 +31,9 @@ def scribbles2mask(scribbles,
             scribbles lines.
         default_value: Integer. Default value for the pixels which do not belong
             to any scribble.
+        dtype: Numpy dtype. Type of the returned array. A compact type like
+            `np.int8` can be used as long as it can hold the object ids and
+            the default value.
 
     # Returns
         ndarray: Array with the mask of the scribbles with the index of the
@@ -41,9 +50,46 @@ def scribbles2mask(scribbles,
 
     nb_frames = len(scribbles['scribbles'])
     masks = np.full(
-        (nb_frames,) + output_resolution, default_value, dtype=np.int)
+        (nb_frames,) + tuple(output_resolution), default_value, dtype=dtype)
+
+    return draw_scribbles(
+        masks,
+        scribbles,
+        bezier_curve_sampling=bezier_curve_sampling,
+        nb_points=nb_points,
+        bresenham=bresenham)
 
-    size_array = np.asarray(output_resolution[::-1], dtype=np.float) - 1
+
+def draw_scribbles(masks,
+                   scribbles,
+                   bezier_curve_sampling=False,
+                   nb_points=1000,
+                   bresenham=True):
+    """ Draw the scribbles into an existing mask.
+
+    The paths are drawn in place in the same order as #scribbles2mask, so
+    drawing the scribbles of every interaction as they are returned gives the
+    same mask as converting all the scribbles fused together at once.
+
+    # Arguments
+        masks: ndarray. Mask with shape (B x H x W) where the scribbles are
+            drawn in place.
+        scribbles: Dictionary. Scribbles in the default format.
+        bezier_curve_sampling: Boolean. Weather to sample first the returned
+            scribbles using bezier curve or not.
+        nb_points: Integer. If `bezier_curve_sampling` is `True` set the number
+            of points to sample from the bezier curve.
+        bresenham: Boolean. Whether to compute bresenham algorithm for the
+            scribbles lines.
+
+    # Returns
+        ndarray: The given mask.
+    """
+    nb_frames = len(scribbles['scribbles'])
+    if nb_frames != len(masks):
+        raise ValueError('The scribbles have {} frames and the mask {}'.format(
+            nb_frames, len(masks)))
+    size_array = np.asarray(masks.shape[:0:-1], dtype=np.float) - 1
 
     for f in range(nb_frames):
         sp = scribbles['scribbles'][f]
@@ -53,7 +99,7 @@ def scribbles2mask(scribbles,
             path = np.asarray(path, dtype=np.float)
             if bezier_curve_sampling:
                 path = bezier_curve(path, nb_points=nb_points)
-            path *= size_array
+            path = path * size_array
             path = path.astype(np.int)
 
             if bresenham:
@@ -90,13 +136,18 @@ def scribbles2points(scribbles_data, output_resolution=None):
 
     for frame, s in enumerate(scribbles):
         for l in s:
-            # p = l['path']
-            coordinates = [[frame] + point for point in l['path']]
-            paths += coordinates
-            object_ids += [l['object_id']] * len(l['path'])
-
-    paths = np.asarray(paths, dtype=np.float)
-    object_ids = np.asarray(object_ids, dtype=np.int)
+            path = np.asarray(l['path'], dtype=np.float).reshape(-1, 2)
+            frames = np.full((len(path), 1), frame, dtype=np.float)
+            paths.append(np.concatenate((frames, path), axis=1))
+            object_ids.append(
+                np.full(len(path), l['object_id'], dtype=np.int))
+
+    if paths:
+        paths = np.concatenate(paths, axis=0)
+        object_ids = np.concatenate(object_ids, axis=0)
+    else:
+        paths = np.empty((0, 3), dtype=np.float)
+        object_ids = np.empty((0,), dtype=np.int)
 
     if output_resolution:
         h, w = output_resolution
@@ -115,7 +166,9 @@ def fuse_scribbles(scribbles_a, scribbles_b):
         scribbles_b: Dictionary. Default representation of scribbles B.
 
     # Returns
-        dict: Returns a dictionary with scribbles A and B fused.
+        dict: Returns a dictionary with scribbles A and B fused. If
+            `scribbles_a` is read-only (see #freeze_scribbles) a new read-only
+            view is returned, otherwise `scribbles_a` is modified in place.
     """
 
     if scribbles_a['sequence'] != scribbles_b['sequence']:
@@ -123,6 +176,14 @@ def fuse_scribbles(scribbles_a, scribbles_b):
     if len(scribbles_a['scribbles']) != len(scribbles_b['scribbles']):
         raise ValueError('Scribbles does not have the same number of frames')
 
+    if isinstance(scribbles_a, FrozenScribbles):
+        # Read-only scribbles can not be modified so a new view is created
+        # sharing the paths of both scribbles.
+        scribbles_b = freeze_scribbles(scribbles_b)
+        frames = tuple(a + b for a, b in zip(scribbles_a['scribbles'],
+                                             scribbles_b['scribbles']))
+        return FrozenScribbles(scribbles_a, scribbles=frames)
+
     scribbles = dict(scribbles_a)
     nb_frames = len(scribbles['scribbles'])
 
@@ -132,6 +193,89 @@ def fuse_scribbles(scribbles_a, scribbles_b):
     return scribbles
 
 
+class FrozenScribbles(Mapping):
+    """ Read-only mapping used to represent immutable scribbles.
+
+    It compares equal to a dictionary with the same items. To obtain a
+    modifiable copy use #thaw_scribbles.
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._data)
+
+    def __reduce__(self):
+        return type(self), (self._data,)
+
+
+def _freeze_path(path_data):
+    if isinstance(path_data, FrozenScribbles):
+        return path_data
+    path = np.array(path_data['path'], dtype=np.float).reshape(-1, 2)
+    path.setflags(write=False)
+    return FrozenScribbles(path_data, path=path)
+
+
+def freeze_scribbles(scribbles_data):
+    """ Create a read-only view of the scribbles.
+
+    The frames are represented as tuples and every path as a read-only Numpy
+    Array of shape (N x 2), so the view can be shared without copying it.
+    Paths already frozen are reused, so freezing the fusion of a frozen
+    scribble with a new one only converts the points of the new scribble.
+
+    # Arguments
+        scribbles_data (dict): Scribble in the default format.
+
+    # Returns
+        FrozenScribbles: Read-only view of the scribbles.
+    """
+    if isinstance(scribbles_data, FrozenScribbles):
+        return scribbles_data
+    frames = tuple(
+        tuple(_freeze_path(p)
+              for p in frame)
+        for frame in scribbles_data['scribbles'])
+    return FrozenScribbles(scribbles_data, scribbles=frames)
+
+
+def thaw_scribbles(scribbles_data):
+    """ Create a modifiable copy of the scribbles in the default format.
+
+    # Arguments
+        scribbles_data (dict): Scribble in the default format or a read-only
+            view created with #freeze_scribbles.
+
+    # Returns
+        dict: Copy of the scribbles in the default format, with the paths as
+            lists of points.
+    """
+    scribbles = []
+    for frame in scribbles_data['scribbles']:
+        paths = []
+        for p in frame:
+            path_data = dict(p)
+            path_data['path'] = np.asarray(p['path']).tolist()
+            paths.append(path_data)
+        scribbles.append(paths)
+    scribbles_copy = dict(scribbles_data)
+    scribbles_copy['scribbles'] = scribbles
+    return scribbles_copy
+
+
 def is_empty(scribbles_data):
     """ Checks whether the given scribble has any non-empty line.
 
@@ -5,9 +5,10 @@ import unittest
 import numpy as np
 import pytest
 
-from .scribbles import (annotated_frames, annotated_frames_object,
-                        fuse_scribbles, is_empty, scribbles2mask,
-                        scribbles2points)
+from .scribbles import (FrozenScribbles, annotated_frames,
+                        annotated_frames_object, draw_scribbles,
+                        freeze_scribbles, fuse_scribbles, is_empty,
+                        scribbles2mask, scribbles2points, thaw_scribbles)
 
 
 class TestScribbles2Mask(unittest.TestCase):
@@ -128,6 +129,65 @@ class TestScribbles2Mask(unittest.TestCase):
         assert np.all(mask[1, :, 0] == 1)
         assert np.all(mask[1, :, 1:] == 0)
 
+    def test_dtype(self):
+        scribbles_data = {
+            'scribbles': [[], [{
+                'path': [[0, 0], [0, 1]],
+                'object_id': 1,
+                'start_time': 0,
+                'end_time': 1000
+            }]],
+            'sequence':
+            'test'
+        }
+        mask = scribbles2mask(scribbles_data, (100, 150), dtype=np.int8)
+        assert mask.dtype == np.int8
+        np.testing.assert_array_equal(mask,
+                                      scribbles2mask(scribbles_data,
+                                                     (100, 150)))
+
+
+class TestDrawScribbles(unittest.TestCase):
+
+    def _scribble(self, frame, path, object_id):
+        scribbles = [[], [], []]
+        scribbles[frame].append({
+            'path': path,
+            'object_id': object_id,
+            'start_time': 0,
+            'end_time': 1000
+        })
+        return {'scribbles': scribbles, 'sequence': 'test'}
+
+    def test_incremental(self):
+        interactions = [
+            self._scribble(0, [[0, 0], [1, 1]], 1),
+            self._scribble(1, [[.2, .5], [.8, .5]], 2),
+            self._scribble(0, [[1, 0], [0, 1]], 2),
+        ]
+        mask = np.full((3, 40, 60), -1, dtype=np.int8)
+        fused = thaw_scribbles(interactions[0])
+        draw_scribbles(mask, interactions[0])
+        for scribble in interactions[1:]:
+            fused = fuse_scribbles(fused, thaw_scribbles(scribble))
+            assert draw_scribbles(mask, scribble) is mask
+            np.testing.assert_array_equal(mask,
+                                          scribbles2mask(fused, (40, 60)))
+        assert set(np.unique(mask[0])) == {-1, 1, 2}
+        assert (mask[2] == -1).all()
+
+    def test_frozen(self):
+        scribble = self._scribble(2, [[0, 0], [1, 1]], 1)
+        mask = draw_scribbles(
+            np.zeros((3, 10, 10), dtype=np.int8), freeze_scribbles(scribble))
+        np.testing.assert_array_equal(
+            mask, scribbles2mask(scribble, (10, 10), default_value=0))
+
+    def test_wrong_nb_frames(self):
+        with pytest.raises(ValueError):
+            draw_scribbles(
+                np.zeros((2, 10, 10)), self._scribble(0, [[0, 0]], 1))
+
 
 class TestScribbles2Points(unittest.TestCase):
 
@@ -380,3 +440,74 @@ class TestAnnotatedFramesObject(unittest.TestCase):
         assert annotated_frames_object(scribble, 1) == [1]
         assert annotated_frames_object(scribble, 2) == [4, 5]
         assert annotated_frames_object(scribble, 3) == [4]
+
+
+class TestFreezeScribbles(unittest.TestCase):
+
+    SCRIBBLE = {
+        'scribbles': [[], [{
+            'path': [[0, 0], [0, 0.1], [.5, .5]],
+            'object_id': 1,
+            'start_time': 0,
+            'end_time': 1000
+        }], []],
+        'sequence':
+        'test',
+    }
+
+    def test_freeze(self):
+        frozen = freeze_scribbles(self.SCRIBBLE)
+        assert isinstance(frozen, FrozenScribbles)
+        assert frozen['sequence'] == 'test'
+        assert isinstance(frozen['scribbles'], tuple)
+        assert len(frozen['scribbles']) == 3
+        path = frozen['scribbles'][1][0]['path']
+        assert isinstance(path, np.ndarray)
+        assert path.shape == (3, 2)
+        assert not path.flags.writeable
+        with pytest.raises(ValueError):
+            path[0, 0] = 1.
+        with pytest.raises(TypeError):
+            frozen['sequence'] = 'other'
+        with pytest.raises(TypeError):
+            frozen['scribbles'][1][0]['object_id'] = 2
+        assert freeze_scribbles(frozen) is frozen
+
+        assert not is_empty(frozen)
+        assert annotated_frames(frozen) == [1]
+        assert annotated_frames_object(frozen, 1) == [1]
+        np.testing.assert_array_equal(
+            scribbles2mask(frozen, (10, 10)),
+            scribbles2mask(self.SCRIBBLE, (10, 10)))
+        for x, y in zip(
+                scribbles2points(frozen, output_resolution=(10, 10)),
+                scribbles2points(self.SCRIBBLE, output_resolution=(10, 10))):
+            np.testing.assert_array_equal(x, y)
+
+    def test_thaw(self):
+        frozen = freeze_scribbles(self.SCRIBBLE)
+        thawed = thaw_scribbles(frozen)
+        assert isinstance(thawed, dict)
+        assert thawed == self.SCRIBBLE
+        thawed['scribbles'][1][0]['path'][0][0] = 1.
+        assert frozen['scribbles'][1][0]['path'][0, 0] == 0.
+
+    def test_fuse_frozen(self):
+        frozen = freeze_scribbles(self.SCRIBBLE)
+        new_scribble = {
+            'scribbles': [[{
+                'path': [[.1, .1], [.2, .2]],
+                'object_id': 2,
+                'start_time': 0,
+                'end_time': 1000
+            }], [], []],
+            'sequence': 'test',
+        }
+        fused = fuse_scribbles(frozen, new_scribble)
+        assert isinstance(fused, FrozenScribbles)
+        assert annotated_frames(fused) == [0, 1]
+        assert annotated_frames(frozen) == [1]
+        # The previous paths are shared, not copied
+        assert fused['scribbles'][1][0] is frozen['scribbles'][1][0]
+        assert thaw_scribbles(fused) == fuse_scribbles(
+            thaw_scribbles(self.SCRIBBLE), new_scribble)
@@ -0,0 +1,32 @@
+from __future__ import absolute_import, division
+
+import time
+from contextlib import contextmanager
+
+__all__ = ['record_time']
+
+
+@contextmanager
+def record_time(timings, phase):
+    """ Measure the wall time spent on a block of code.
+
+    # Example
+    ```python
+    timings = {}
+    with record_time(timings, 'robot'):
+        robot.interact(...)
+    ```
+
+    # Arguments
+        timings: Dictionary or None. Dictionary where the time is accumulated
+            on the key `phase`. If `None`, nothing is recorded.
+        phase: String. Name of the phase measured.
+    """
+    if timings is None:
+        yield
+        return
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.) + time.time() - start_time
@@ -0,0 +1,33 @@
+from __future__ import absolute_import, division
+
+import time
+import unittest
+
+import pytest
+
+from davisinteractive.utils.timing import record_time
+
+
+class TestRecordTime(unittest.TestCase):
+
+    def test_accumulate(self):
+        timings = {}
+        with record_time(timings, 'phase'):
+            time.sleep(.01)
+        assert timings['phase'] >= .01
+        first = timings['phase']
+        with record_time(timings, 'phase'):
+            time.sleep(.01)
+        assert timings['phase'] >= first + .01
+        assert list(timings) == ['phase']
+
+    def test_error(self):
+        timings = {}
+        with pytest.raises(ValueError):
+            with record_time(timings, 'phase'):
+                raise ValueError()
+        assert 'phase' in timings
+
+    def test_disabled(self):
+        with record_time(None, 'phase'):
+            pass